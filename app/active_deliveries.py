@@ -0,0 +1,121 @@
+"""
+Registre en mémoire des livraisons actives (tableau de bord des livreurs)
+
+Le registre est chargé depuis la base au premier accès, puis tenu à jour
+par les endpoints qui créent, démarrent, terminent ou annulent une livraison.
+Il est propre au processus : il est rechargé au plus tard après max_age
+secondes pour refléter les écritures des autres processus.
+"""
+from app.models.db_models import DeliveryDB
+from app.location_buffer import location_buffer
+from app.eta import eta_engine
+from flask import g
+from datetime import datetime
+import threading
+import time
+
+ACTIVE_STATUSES = ('assigned', 'in_transit')
+
+
+class ActiveDeliveryRegistry:
+    """Documents des livraisons assigned/in_transit, indexés par identifiant"""
+
+    def __init__(self, max_age=30):
+        """
+        Initialise un registre vide, chargé au premier accès
+
+        Args:
+            max_age: Durée en secondes après laquelle le registre est rechargé
+        """
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._deliveries = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        """Charge les livraisons actives (index ix_deliveries_status_created_at)"""
+        deliveries_db = DeliveryDB.query.filter(
+            DeliveryDB.status.in_(ACTIVE_STATUSES)
+        ).order_by(DeliveryDB.created_at, DeliveryDB.id).all()
+
+        self._deliveries = {
+            delivery.id: delivery.to_dict(include_order=False)
+            for delivery in deliveries_db
+        }
+        self._loaded_at = time.monotonic()
+
+    def snapshot(self, driver=None):
+        """
+        Retourne les livraisons actives, sans requête tant que le registre est frais
+
+        Args:
+            driver: Ne garder que les livraisons de ce livreur, ou None
+
+        Returns:
+            list: Documents des livraisons, par ordre de création
+        """
+        with self._lock:
+            if self._deliveries is None or time.monotonic() - self._loaded_at > self.max_age:
+                self._load()
+            documents = [
+                dict(document) for document in self._deliveries.values()
+                if driver is None or document['driver_name'] == driver
+            ]
+
+        # Positions plus récentes en attente dans le tampon d'écriture différée, puis ETA à jour
+        return [eta_engine.overlay(location_buffer.overlay(document)) for document in documents]
+
+    def record(self, delivery_db):
+        """
+        Reporte l'état d'une livraison après le commit qui l'a modifiée
+
+        Dans un POST /batch, le registre est invalidé à la fin du batch :
+        ses opérations peuvent encore être annulées.
+
+        Args:
+            delivery_db: Livraison à jour
+        """
+        if g.get('batch_savepoint') is not None:
+            g.active_deliveries_dirty = True
+            return
+
+        with self._lock:
+            if self._deliveries is None:
+                return
+            if delivery_db.status in ACTIVE_STATUSES:
+                self._deliveries[delivery_db.id] = delivery_db.to_dict(include_order=False)
+            else:
+                self._deliveries.pop(delivery_db.id, None)
+
+    def record_positions(self, pings):
+        """
+        Reporte des positions validées en base
+
+        Args:
+            pings: Pings normalisés (voir app.locations.parse_ping)
+        """
+        if g.get('batch_savepoint') is not None:
+            g.active_deliveries_dirty = True
+            return
+
+        with self._lock:
+            if self._deliveries is None:
+                return
+            for ping in pings:
+                document = self._deliveries.get(ping['delivery_id'])
+                if document is None:
+                    continue
+                current = document['location_updated_at']
+                if current is not None and ping['ts'] < datetime.fromisoformat(current):
+                    continue
+                document['current_latitude'] = ping['lat']
+                document['current_longitude'] = ping['lon']
+                document['location_updated_at'] = ping['ts'].isoformat()
+
+    def invalidate(self):
+        """Force le rechargement du registre au prochain accès"""
+        with self._lock:
+            self._deliveries = None
+
+
+active_deliveries = ActiveDeliveryRegistry()
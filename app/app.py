@@ -1,38 +1,176 @@
 """
 Application Flask principale pour l'API de livraison de pizzas
+
+L'import de ce module ne fait aucune E/S : l'application est créée par
+create_app(), le schéma et les données initiales par `flask init-db` et
+`flask seed`.
 """
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Blueprint, current_app, request, jsonify, render_template, g, stream_with_context, send_from_directory
 from flask_cors import CORS
 from flask_migrate import Migrate
-from app.models import Pizza, Order, Delivery
-from app.database import db, init_db
-from app.models.db_models import PizzaDB, OrderDB, OrderPizzaDB, DeliveryDB
-from datetime import datetime
+from werkzeug.exceptions import HTTPException
+from app.models import Pizza, Order
+from app.config import get_config
+from app.database import db, init_db, create_schema, commit_session, rollback_session
+from app.models.db_models import PizzaDB, OrderDB, DeliveryDB, PizzaToppingDB, ToppingDB
+from app.pagination import paginate, parse_limit
+from app.fieldsets import FieldSelection
+from app.catalog_cache import catalog_cache, bump_catalog_version
+from app.locations import parse_ping, apply_pings, MAX_PINGS_PER_REQUEST
+from app.tracks import append_points, iter_track, parse_since, to_epoch_ms
+from app.location_buffer import location_buffer
+from app.active_deliveries import active_deliveries
+from app.seeds.synthetic import generate_dataset, DEFAULT_CHUNK_SIZE
+from app.exports import parse_bound, iter_orders_ndjson, iter_deliveries_csv
+from app.sales_rollups import sales_snapshot, record_sales, rebuild_sales_rollups, revenue_report, GRANULARITIES
+from app.delivery_stats import delivery_stats, DEFAULT_TARGET_MINUTES
+from app.eta import eta_engine, parse_destination
+from app.metrics import init_metrics, request_metrics
+from app.profiling import init_profiling, request_profiler
+from datetime import datetime, timedelta
+import click
+import json
 import os
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Routes, gestionnaires d'erreurs et commandes CLI de l'application
+api = Blueprint('api', __name__, cli_group=None)
+
+migrate = Migrate()
+
+# Relations pouvant être demandées via expand=
+ORDER_EXPANSIONS = ('pizzas',)
+DELIVERY_EXPANSIONS = ('order', 'order.pizzas')
+
+# Statuts acceptés par GET /deliveries?status=
+DELIVERY_STATUSES = ('assigned', 'in_transit', 'delivered', 'cancelled')
+
+# Clés d'une commande calculées à partir de ses pizzas
+ORDER_PIZZA_KEYS = ('pizzas',)
+
+# Opérations acceptées par POST /batch
+BATCH_METHODS = ('GET', 'POST', 'PATCH', 'DELETE')
+MAX_BATCH_OPERATIONS = 500
+
+# Nombre de points envoyés par fragment dans GET /deliveries/<id>/track
+TRACK_STREAM_BATCH = 512
+
+# Période par défaut et nombre maximal de créneaux de GET /analytics/revenue
+REVENUE_DEFAULT_WINDOWS = {'hour': timedelta(days=2), 'day': timedelta(days=30)}
+REVENUE_MAX_BUCKETS = 10000
+
+# Période par défaut de GET /analytics/deliveries
+DELIVERY_STATS_DEFAULT_WINDOW = timedelta(days=7)
+
+
+def create_app(config=None):
+    """
+    Crée et configure l'application Flask
+
+    Aucune connexion à la base n'est ouverte ici.
+
+    Args:
+        config: Classe ou nom de profil de configuration (PIZZA_CONFIG par défaut)
+
+    Returns:
+        Flask: Application configurée
+    """
+    app = Flask(__name__,
+                template_folder=os.path.join(BASE_DIR, 'templates'),
+                static_folder=os.path.join(BASE_DIR, 'static'))
+
+    if config is None or isinstance(config, str):
+        config = get_config(config)
+    app.config.from_object(config)
+
+    # Activer CORS pour permettre les requêtes depuis le navigateur
+    CORS(app)
+
+    # Initialiser la base de données
+    init_db(app)
+
+    # Initialiser Flask-Migrate pour les migrations
+    migrate.init_app(app, db, directory=os.path.join(BASE_DIR, 'migrations'))
+
+    app.register_blueprint(api)
+    init_metrics(app)
+    init_profiling(app)
+
+    if app.config['LOCATION_WRITE_BEHIND']:
+        location_buffer.start(app, app.config['LOCATION_FLUSH_INTERVAL_MS'])
+
+    return app
+
+
+# ==================== CLI COMMANDS ====================
+
+@api.cli.command('init-db')
+def init_db_command():
+    """Crée les tables manquantes (une base neuve est marquée comme migrée)"""
+    if create_schema():
+        from flask_migrate import stamp
+        stamp()
+        print("✅ Base de données créée et marquée à la dernière migration")
+    else:
+        print("✅ Tables manquantes créées (utiliser `flask db upgrade` pour migrer une base existante)")
+
 
-app = Flask(__name__,
-            template_folder=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates'),
-            static_folder=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static'))
+@api.cli.command('seed')
+@click.option('--force', is_flag=True, help="Peupler même si la base contient déjà des données")
+def seed_command(force):
+    """Peuple la base avec les pizzas et commandes de démonstration"""
+    from app.seeds import is_database_empty, seed_all
 
-# Configuration de la base de données SQLite
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, '..', 'pizza_delivery.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if not force and not is_database_empty():
+        print("📊 Base de données déjà peuplée - Aucune action nécessaire")
+        return
 
-# Activer CORS pour permettre les requêtes depuis le navigateur
-CORS(app)
+    print("🌱 Peuplement de la base de données...")
+    stats = seed_all()
+    rebuild_sales_rollups()
+    print(f"\n📊 Peuplement terminé :")
+    print(f"   - {stats['pizzas']} pizzas ajoutées")
+    print(f"   - {stats['orders']} commandes ajoutées")
 
-# Initialiser la base de données
-init_db(app)
 
-# Initialiser Flask-Migrate pour les migrations
-migrate = Migrate(app, db)
+@api.cli.command('generate-dataset')
+@click.option('--orders', type=int, default=100000, show_default=True, help="Nombre de commandes")
+@click.option('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, show_default=True,
+              help="Commandes insérées par transaction")
+@click.option('--days', type=int, default=365, show_default=True, help="Période couverte en jours")
+@click.option('--seed', type=int, default=None, help="Graine aléatoire (jeu reproductible)")
+def generate_dataset_command(orders, chunk_size, days, seed):
+    """Génère un jeu de données synthétique pour les tests de charge"""
+    def progress(stats):
+        print(f"   {stats['orders']}/{orders} commandes", end='\r', flush=True)
+
+    print(f"🏭 Génération de {orders} commandes...")
+    stats = generate_dataset(orders, chunk_size=chunk_size, days=days, seed=seed, progress=progress)
+    rebuild_sales_rollups()
+    print(f"\n✅ {stats['orders']} commandes, {stats['order_pizzas']} lignes et "
+          f"{stats['deliveries']} livraisons en {stats['seconds']} s")
+
+
+@api.cli.command('repair-order-totals')
+def repair_order_totals_command():
+    """Recalcule en masse les totaux dénormalisés des commandes"""
+    count = OrderDB.recompute_totals()
+    rebuild_sales_rollups()
+    print(f"✅ Totaux recalculés pour {count} commandes")
+
+
+@api.cli.command('rebuild-sales-rollups')
+def rebuild_sales_rollups_command():
+    """Recalcule en masse les agrégats de ventes horaires et journaliers"""
+    stats = rebuild_sales_rollups()
+    print(f"✅ {stats['sales_rollups']} agrégats de ventes et "
+          f"{stats['pizza_sales_rollups']} agrégats par pizza recalculés")
 
 
 # ==================== WEB INTERFACE ====================
 
-@app.route('/')
+@api.route('/')
 def index():
     """Page d'accueil de l'application web de commande"""
     return render_template('index.html')
@@ -40,15 +178,65 @@ def index():
 
 # ==================== HEALTH CHECK ====================
 
-@app.route('/health', methods=['GET'])
+@api.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de santé de l'API"""
     return jsonify({"status": "healthy", "message": "Pizza API is running"}), 200
 
 
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Métriques du processus au format texte Prometheus"""
+    if not current_app.config.get('METRICS_ENABLED'):
+        return jsonify({"error": "Metrics are disabled"}), 404
+
+    return current_app.response_class(request_metrics.render(),
+                                      mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ==================== PROFILING ENDPOINTS ====================
+
+PROFILE_FILES = {'prof': 'application/octet-stream', 'folded': 'text/plain'}
+
+
+@api.route('/profiles', methods=['GET'])
+def list_profiles():
+    """Liste les profils enregistrés (jeton administrateur requis)"""
+    profiler = request_profiler()
+    if not profiler.is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Admin token required"}), 403
+
+    profiles = profiler.list_profiles()
+    return jsonify({"profiles": profiles, "count": len(profiles)}), 200
+
+
+@api.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Métadonnées et fonctions les plus coûteuses d'un profil"""
+    profiler = request_profiler()
+    if not profiler.is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Admin token required"}), 403
+
+    return send_from_directory(profiler.directory, f'{profile_id}.json', mimetype='application/json')
+
+
+@api.route('/profiles/<profile_id>/<kind>', methods=['GET'])
+def download_profile(profile_id, kind):
+    """Télécharge un profil : kind=prof (cProfile) ou folded (piles pour flamegraph)"""
+    profiler = request_profiler()
+    if not profiler.is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Admin token required"}), 403
+
+    if kind not in PROFILE_FILES:
+        return jsonify({"error": f"Invalid profile kind. Must be one of {list(PROFILE_FILES)}"}), 400
+
+    return send_from_directory(profiler.directory, f'{profile_id}.{kind}',
+                               mimetype=PROFILE_FILES[kind], as_attachment=True)
+
+
 # ==================== PIZZA ENDPOINTS ====================
 
-@app.route('/pizzas', methods=['POST'])
+@api.route('/pizzas', methods=['POST'])
 def create_pizza():
     """Crée une nouvelle pizza"""
     try:
@@ -73,84 +261,83 @@ def create_pizza():
         # Sauvegarder dans la base de données
         pizza_db = PizzaDB.from_pizza_object(pizza)
         db.session.add(pizza_db)
-        db.session.commit()
+        bump_catalog_version()
+        commit_session()
 
         return jsonify(pizza_db.to_dict()), 201
 
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/pizzas/<pizza_id>', methods=['GET'])
+@api.route('/pizzas/<pizza_id>', methods=['GET'])
 def get_pizza(pizza_id):
-    """Récupère une pizza par son ID"""
+    """Récupère une pizza par son ID (champs filtrables via fields=)"""
+    try:
+        selection = FieldSelection.from_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     pizza_db = PizzaDB.query.get(pizza_id)
 
     if not pizza_db:
         return jsonify({"error": "Pizza not found"}), 404
     
-    return jsonify(pizza_db.to_dict()), 200
+    return jsonify(selection.apply(pizza_db.to_dict())), 200
 
 
-@app.route('/pizzas', methods=['GET'])
+@api.route('/pizzas', methods=['GET'])
 def get_all_pizzas():
-    """Récupère le catalogue de pizzas"""
-    # Récupérer seulement les pizzas du catalogue (sans commandes associées)
+    """Récupère le catalogue de pizzas (paginé par curseur, filtrable par garniture)"""
     catalog_type = request.args.get('type', 'catalog')
 
     if catalog_type == 'catalog':
-        # Pizzas du catalogue uniquement
-        pizzas_db = PizzaDB.query.outerjoin(PizzaDB.orders).filter(
-            PizzaDB.orders == None
-        ).all()
+        # Pizzas du catalogue uniquement (colonne indexée in_catalog)
+        query = PizzaDB.query.filter(PizzaDB.in_catalog == True)
     else:
         # Toutes les pizzas
-        pizzas_db = PizzaDB.query.all()
+        query = PizzaDB.query
 
-    pizzas_list = [pizza.to_dict() for pizza in pizzas_db]
+    topping = request.args.get('topping')
+    if topping:
+        # Recherche indexée dans la table normalisée des garnitures
+        query = query.join(PizzaToppingDB, PizzaToppingDB.pizza_id == PizzaDB.id).join(
+            ToppingDB, ToppingDB.id == PizzaToppingDB.topping_id
+        ).filter(ToppingDB.name == topping)
 
-    return jsonify({"pizzas": pizzas_list, "count": len(pizzas_list)}), 200
+    try:
+        selection = FieldSelection.from_args(request.args)
+        limit = parse_limit(request.args.get('limit'))
+        pizzas_db, next_cursor = paginate(query, PizzaDB, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
+    pizzas_list = [selection.apply(pizza.to_dict()) for pizza in pizzas_db]
 
-@app.route('/pizzas/catalog', methods=['GET'])
-def get_pizza_catalog():
-    """Récupère le catalogue de pizzas groupé par nom avec toutes les tailles"""
-    # Récupérer toutes les pizzas du catalogue
-    pizzas_db = PizzaDB.query.outerjoin(PizzaDB.orders).filter(
-        PizzaDB.orders == None
-    ).order_by(PizzaDB.name, PizzaDB.size).all()
-
-    # Grouper par nom de pizza
-    catalog = {}
-    for pizza in pizzas_db:
-        pizza_dict = pizza.to_dict()
-        name = pizza_dict['name']
+    return jsonify({"pizzas": pizzas_list, "count": len(pizzas_list), "next_cursor": next_cursor}), 200
 
-        if name not in catalog:
-            catalog[name] = {
-                'name': name,
-                'toppings': pizza_dict['toppings'],
-                'sizes': []
-            }
 
-        catalog[name]['sizes'].append({
-            'id': pizza_dict['pizza_id'],
-            'size': pizza_dict['size'],
-            'price': pizza_dict['price'],
-            'currency': pizza_dict['currency']
-        })
+@api.route('/pizzas/catalog', methods=['GET'])
+def get_pizza_catalog():
+    """Récupère le catalogue de pizzas groupé par nom avec toutes les tailles"""
+    # Instantané pré-sérialisé, reconstruit uniquement quand la version change
+    version, body = catalog_cache.get()
 
-    catalog_list = list(catalog.values())
+    response = current_app.response_class(body, status=200, mimetype='application/json')
+    if version is not None:
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
 
-    return jsonify({"catalog": catalog_list, "count": len(catalog_list)}), 200
+    return response
 
 
 # ==================== ORDER ENDPOINTS ====================
 
-@app.route('/orders', methods=['POST'])
+@api.route('/orders', methods=['POST'])
 def create_order():
     """Crée une nouvelle commande"""
     try:
@@ -172,36 +359,100 @@ def create_order():
         # Sauvegarder dans la base de données
         order_db = OrderDB.from_order_object(order)
         db.session.add(order_db)
-        db.session.commit()
+        commit_session()
 
         return jsonify(order_db.to_dict()), 201
 
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/orders/<order_id>', methods=['GET'])
+@api.route('/orders/<order_id>', methods=['GET'])
 def get_order(order_id):
-    """Récupère une commande par son ID"""
-    order_db = OrderDB.query.get(order_id)
+    """Récupère une commande par son ID (fields= et expand=pizzas)"""
+    try:
+        selection = FieldSelection.from_args(request.args, ORDER_EXPANSIONS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    include_pizzas = selection.expands('pizzas', ORDER_PIZZA_KEYS)
+    order_db = OrderDB.query.options(
+        *OrderDB.eager_options(include_pizzas)
+    ).filter_by(id=order_id).first()
 
     if not order_db:
         return jsonify({"error": "Order not found"}), 404
     
-    return jsonify(order_db.to_dict()), 200
+    return jsonify(selection.apply(order_db.to_dict(include_pizzas=include_pizzas))), 200
 
 
-@app.route('/orders', methods=['GET'])
+@api.route('/orders', methods=['GET'])
 def get_all_orders():
-    """Récupère toutes les commandes"""
-    orders_db = OrderDB.query.all()
-    orders_list = [order.to_dict() for order in orders_db]
+    """Récupère les commandes (paginées par curseur, fields= et expand=pizzas)"""
+    try:
+        selection = FieldSelection.from_args(request.args, ORDER_EXPANSIONS)
+        include_pizzas = selection.expands('pizzas', ORDER_PIZZA_KEYS)
+
+        # Chargement anticipé : nombre de requêtes constant quel que soit le volume
+        query = OrderDB.query.options(*OrderDB.eager_options(include_pizzas))
+
+        limit = parse_limit(request.args.get('limit'))
+        orders_db, next_cursor = paginate(query, OrderDB, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    orders_list = [
+        selection.apply(order.to_dict(include_pizzas=include_pizzas))
+        for order in orders_db
+    ]
+
+    return jsonify({"orders": orders_list, "count": len(orders_list), "next_cursor": next_cursor}), 200
+
+
+def _export_filters(valid_statuses):
+    """
+    Lit les filtres since=, until= et status= d'un export
+
+    Returns:
+        tuple: (since, until, statuts ou None)
+
+    Raises:
+        ValueError: Si une date ou un statut est invalide
+    """
+    since = parse_bound(request.args['since']) if request.args.get('since') else None
+    until = parse_bound(request.args['until']) if request.args.get('until') else None
+
+    statuses = request.args.get('status')
+    if statuses:
+        statuses = statuses.split(',')
+        invalid = [status for status in statuses if status not in valid_statuses]
+        if invalid:
+            raise ValueError(f"Invalid status. Must be one of {list(valid_statuses)}")
 
-    return jsonify({"orders": orders_list, "count": len(orders_list)}), 200
+    return since, until, statuses or None
 
 
-@app.route('/orders/<order_id>/pizzas', methods=['POST'])
+@api.route('/orders/export', methods=['GET'])
+def export_orders():
+    """Exporte les commandes en NDJSON, en streaming (since=, until=, status=)"""
+    try:
+        selection = FieldSelection.from_args(request.args, ORDER_EXPANSIONS)
+        since, until, statuses = _export_filters(Order.VALID_STATUSES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    generate = iter_orders_ndjson(
+        since=since,
+        until=until,
+        statuses=statuses,
+        selection=selection,
+        include_pizzas=selection.expands('pizzas', ORDER_PIZZA_KEYS)
+    )
+    return current_app.response_class(stream_with_context(generate), mimetype='application/x-ndjson')
+
+
+@api.route('/orders/<order_id>/pizzas', methods=['POST'])
 def add_pizza_to_order(order_id):
     """Ajoute une pizza à une commande (référence une pizza du catalogue)"""
     order_db = OrderDB.query.get(order_id)
@@ -222,22 +473,23 @@ def add_pizza_to_order(order_id):
         pizza_id = data['pizza_id']
         pizza_db = PizzaDB.query.get(pizza_id)
 
-        if not pizza_db:
+        if not pizza_db or not pizza_db.in_catalog:
             return jsonify({"error": "Pizza not found in catalog"}), 404
 
-        # Créer la liaison order <-> pizza
-        order_pizza = OrderPizzaDB(order_id=order_id, pizza_id=pizza_db.id)
-        db.session.add(order_pizza)
-        db.session.commit()
+        # Créer la liaison order <-> pizza et mettre à jour les totaux
+        sales = sales_snapshot(order_db)
+        order_db.add_pizza(pizza_db)
+        record_sales(sales, order_db)
+        commit_session()
 
         return jsonify(order_db.to_dict()), 200
 
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/orders/<order_id>/pizzas/<int:pizza_index>', methods=['DELETE'])
+@api.route('/orders/<order_id>/pizzas/<int:pizza_index>', methods=['DELETE'])
 def remove_pizza_from_order(order_id, pizza_index):
     """Retire une pizza d'une commande"""
     order_db = OrderDB.query.get(order_id)
@@ -250,13 +502,15 @@ def remove_pizza_from_order(order_id, pizza_index):
     
     # Supprimer la liaison à l'index spécifié
     order_pizza_to_remove = order_db.pizzas[pizza_index]
-    db.session.delete(order_pizza_to_remove)
-    db.session.commit()
+    sales = sales_snapshot(order_db)
+    order_db.remove_pizza(order_pizza_to_remove)
+    record_sales(sales, order_db)
+    commit_session()
 
     return jsonify(order_db.to_dict()), 200
 
 
-@app.route('/orders/<order_id>/status', methods=['PATCH'])
+@api.route('/orders/<order_id>/status', methods=['PATCH'])
 def update_order_status(order_id):
     """Met à jour le statut d'une commande"""
     order_db = OrderDB.query.get(order_id)
@@ -277,25 +531,104 @@ def update_order_status(order_id):
 
         # Valider que la commande a au moins une pizza pour certains statuts
         if data['status'] in ["preparing", "ready", "out_for_delivery", "delivered"]:
-            if len(order_db.pizzas) == 0:
+            if order_db.item_count == 0:
                 return jsonify({"error": "Order must have at least one pizza to be valid"}), 400
 
+        sales = sales_snapshot(order_db)
         order_db.status = data['status']
-        db.session.commit()
+        record_sales(sales, order_db)
+        commit_session()
 
         return jsonify(order_db.to_dict()), 200
 
     except ValueError as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@api.route('/checkout', methods=['POST'])
+def checkout():
+    """Crée en une transaction la commande, ses pizzas, son statut et sa livraison"""
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        required_fields = ['customer_name', 'customer_address', 'pizza_ids']
+        for field in required_fields:
+            if field not in data:
+                return jsonify({"error": f"Missing required field: {field}"}), 400
+
+        pizza_ids = data['pizza_ids']
+        if not isinstance(pizza_ids, list) or not pizza_ids:
+            return jsonify({"error": "Order must have at least one pizza to be valid"}), 400
+        if not all(isinstance(pizza_id, str) for pizza_id in pizza_ids):
+            return jsonify({"error": "pizza_ids must be a list of pizza identifiers"}), 400
+
+        try:
+            destination = parse_destination(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Valider toutes les pizzas contre le catalogue en une seule requête
+        pizzas_by_id = {
+            pizza.id: pizza
+            for pizza in PizzaDB.query.filter(
+                PizzaDB.id.in_(set(pizza_ids)), PizzaDB.in_catalog == True
+            ).all()
+        }
+        if any(pizza_id not in pizzas_by_id for pizza_id in pizza_ids):
+            return jsonify({"error": "Pizza not found in catalog"}), 404
+
+        order = Order(
+            customer_name=data['customer_name'],
+            customer_address=data['customer_address']
+        )
+        order_db = OrderDB.from_order_object(order)
+        order_db.status = "preparing"
+        db.session.add(order_db)
+        db.session.flush()
+
+        order_db.add_pizzas([pizzas_by_id[pizza_id] for pizza_id in pizza_ids])
+        record_sales(None, order_db)
+
+        delivery_db = None
+        if data.get('driver_name'):
+            delivery_db = DeliveryDB(order_id=order_db.id, driver_name=data['driver_name'],
+                                     destination_latitude=destination[0],
+                                     destination_longitude=destination[1])
+            db.session.add(delivery_db)
+
+        db.session.flush()
+        result = {
+            "order": order_db.to_dict(),
+            "delivery": delivery_db.to_dict(include_order=False) if delivery_db else None
+        }
+        commit_session()
+        if delivery_db:
+            active_deliveries.record(delivery_db)
+            eta_engine.refresh_profile()
+            eta_engine.overlay(result['delivery'])
+
+        return jsonify(result), 201
+
+    except Exception as e:
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
 # ==================== DELIVERY ENDPOINTS ====================
 
-@app.route('/deliveries', methods=['POST'])
+def _delivery_document(delivery_db, include_order=True, include_pizzas=True):
+    """Document d'une livraison, avec son heure d'arrivée estimée (sans requête)"""
+    return eta_engine.overlay(delivery_db.to_dict(include_order, include_pizzas))
+
+
+@api.route('/deliveries', methods=['POST'])
 def create_delivery():
     """Crée une nouvelle livraison"""
     try:
@@ -309,6 +642,11 @@ def create_delivery():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
 
+        try:
+            destination = parse_destination(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         order_id = data['order_id']
         order_db = OrderDB.query.get(order_id)
 
@@ -323,40 +661,106 @@ def create_delivery():
         # Créer la livraison
         delivery_db = DeliveryDB(
             order_id=order_id,
-            driver_name=data['driver_name']
+            driver_name=data['driver_name'],
+            destination_latitude=destination[0],
+            destination_longitude=destination[1]
         )
         
         db.session.add(delivery_db)
-        db.session.commit()
+        commit_session()
+        active_deliveries.record(delivery_db)
+        eta_engine.refresh_profile()
 
-        return jsonify(delivery_db.to_dict()), 201
+        return jsonify(_delivery_document(delivery_db)), 201
 
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/deliveries/<delivery_id>', methods=['GET'])
+@api.route('/deliveries/<delivery_id>', methods=['GET'])
 def get_delivery(delivery_id):
-    """Récupère une livraison par son ID"""
-    delivery_db = DeliveryDB.query.get(delivery_id)
+    """Récupère une livraison par son ID (fields= et expand=order,order.pizzas)"""
+    try:
+        selection = FieldSelection.from_args(request.args, DELIVERY_EXPANSIONS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    include_order = selection.expands('order')
+    include_pizzas = selection.expands('order.pizzas')
+    delivery_db = DeliveryDB.query.options(
+        *DeliveryDB.eager_options(include_order, include_pizzas)
+    ).filter_by(id=delivery_id).first()
 
     if not delivery_db:
         return jsonify({"error": "Delivery not found"}), 404
     
-    return jsonify(delivery_db.to_dict()), 200
+    return jsonify(selection.apply(_delivery_document(delivery_db, include_order, include_pizzas))), 200
 
 
-@app.route('/deliveries', methods=['GET'])
+@api.route('/deliveries', methods=['GET'])
 def get_all_deliveries():
-    """Récupère toutes les livraisons"""
-    deliveries_db = DeliveryDB.query.all()
-    deliveries_list = [delivery.to_dict() for delivery in deliveries_db]
+    """Récupère les livraisons (paginées par curseur, status=, driver=, fields= et expand=order,order.pizzas)"""
+    try:
+        selection = FieldSelection.from_args(request.args, DELIVERY_EXPANSIONS)
+        include_order = selection.expands('order')
+        include_pizzas = selection.expands('order.pizzas')
+
+        # Chargement anticipé : nombre de requêtes constant quel que soit le volume
+        query = DeliveryDB.query.options(*DeliveryDB.eager_options(include_order, include_pizzas))
+
+        statuses = request.args.get('status')
+        if statuses:
+            statuses = statuses.split(',')
+            invalid = [status for status in statuses if status not in DELIVERY_STATUSES]
+            if invalid:
+                raise ValueError(f"Invalid status. Must be one of {list(DELIVERY_STATUSES)}")
+            query = query.filter(DeliveryDB.status.in_(statuses))
+
+        driver = request.args.get('driver')
+        if driver:
+            query = query.filter(DeliveryDB.driver_name == driver)
+
+        limit = parse_limit(request.args.get('limit'))
+        deliveries_db, next_cursor = paginate(query, DeliveryDB, limit, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    deliveries_list = [
+        selection.apply(_delivery_document(delivery, include_order, include_pizzas))
+        for delivery in deliveries_db
+    ]
+
+    return jsonify({"deliveries": deliveries_list, "count": len(deliveries_list), "next_cursor": next_cursor}), 200
+
 
+@api.route('/deliveries/export.csv', methods=['GET'])
+def export_deliveries_csv():
+    """Exporte les livraisons en CSV, en streaming (since=, until=, status=, driver=)"""
+    try:
+        since, until, statuses = _export_filters(DELIVERY_STATUSES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    generate = iter_deliveries_csv(
+        since=since,
+        until=until,
+        statuses=statuses,
+        driver=request.args.get('driver')
+    )
+    response = current_app.response_class(stream_with_context(generate), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=deliveries.csv'
+    return response
+
+
+@api.route('/deliveries/active', methods=['GET'])
+def get_active_deliveries():
+    """Tableau de bord : livraisons assigned/in_transit, servies depuis le registre en mémoire"""
+    deliveries_list = active_deliveries.snapshot(request.args.get('driver'))
     return jsonify({"deliveries": deliveries_list, "count": len(deliveries_list)}), 200
 
 
-@app.route('/deliveries/<delivery_id>/start', methods=['PATCH'])
+@api.route('/deliveries/<delivery_id>/start', methods=['PATCH'])
 def start_delivery(delivery_id):
     """Démarre une livraison"""
     delivery_db = DeliveryDB.query.get(delivery_id)
@@ -378,19 +782,21 @@ def start_delivery(delivery_id):
         # Mettre à jour le statut
         delivery_db.status = "in_transit"
         delivery_db.started_at = datetime.utcnow()
-        db.session.commit()
+        commit_session()
+        active_deliveries.record(delivery_db)
+        eta_engine.refresh_profile()
 
-        return jsonify(delivery_db.to_dict()), 200
+        return jsonify(_delivery_document(delivery_db)), 200
 
     except ValueError as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/deliveries/<delivery_id>/complete', methods=['PATCH'])
+@api.route('/deliveries/<delivery_id>/complete', methods=['PATCH'])
 def complete_delivery(delivery_id):
     """Complète une livraison"""
     delivery_db = DeliveryDB.query.get(delivery_id)
@@ -406,19 +812,22 @@ def complete_delivery(delivery_id):
         # Mettre à jour le statut
         delivery_db.status = "delivered"
         delivery_db.completed_at = datetime.utcnow()
-        db.session.commit()
+        commit_session()
+        active_deliveries.record(delivery_db)
+        delivery_stats.invalidate()
+        eta_engine.refresh_profile()
 
-        return jsonify(delivery_db.to_dict()), 200
+        return jsonify(_delivery_document(delivery_db)), 200
 
     except ValueError as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
 
-@app.route('/deliveries/<delivery_id>/location', methods=['PATCH'])
+@api.route('/deliveries/<delivery_id>/location', methods=['PATCH'])
 def update_delivery_location(delivery_id):
     """Met à jour la position GPS du livreur"""
     delivery_db = DeliveryDB.query.get(delivery_id)
@@ -437,19 +846,146 @@ def update_delivery_location(delivery_id):
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        try:
+            ping = parse_ping({'delivery_id': delivery_db.id,
+                               'lat': data['latitude'], 'lon': data['longitude']})
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if location_buffer.accepts_writes():
+            # Écriture différée : la position est écrite au prochain flush
+            location_buffer.put(ping)
+            return jsonify(_delivery_document(delivery_db)), 200
+
         # Mettre à jour la position
-        delivery_db.current_latitude = data['latitude']
-        delivery_db.current_longitude = data['longitude']
-        db.session.commit()
+        delivery_db.current_latitude = ping['lat']
+        delivery_db.current_longitude = ping['lon']
+        delivery_db.location_updated_at = ping['ts']
+        append_points({delivery_db.id: [(to_epoch_ms(ping['ts']), ping['lat'], ping['lon'])]})
+        commit_session()
+        active_deliveries.record(delivery_db)
 
-        return jsonify(delivery_db.to_dict()), 200
+        return jsonify(_delivery_document(delivery_db)), 200
 
     except Exception as e:
-        db.session.rollback()
+        rollback_session()
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@api.route('/deliveries/locations', methods=['PATCH'])
+def update_delivery_locations():
+    """Met à jour en masse les positions GPS des livreurs"""
+    data = request.get_json(silent=True)
+
+    if not data or not isinstance(data.get('pings'), list):
+        return jsonify({"error": "pings list is required"}), 400
+
+    if len(data['pings']) > MAX_PINGS_PER_REQUEST:
+        return jsonify({"error": f"A request is limited to {MAX_PINGS_PER_REQUEST} pings"}), 400
+
+    pings = []
+    rejected = []
+    for index, raw in enumerate(data['pings']):
+        try:
+            pings.append(parse_ping(raw))
+        except ValueError as e:
+            rejected.append({"index": index, "error": str(e)})
+
+    if location_buffer.accepts_writes():
+        return _buffer_pings(pings, rejected)
+
+    try:
+        updated, unknown_ids = apply_pings(pings)
+        commit_session()
+        active_deliveries.record_positions(pings)
+        eta_engine.record_positions(pings)
+    except Exception as e:
+        rollback_session()
         return jsonify({"error": "Internal server error"}), 500
 
+    # Accusé de réception compact : pas de document de livraison
+    return jsonify({
+        "accepted": len(pings),
+        "updated": updated,
+        "rejected": rejected,
+        "unknown": unknown_ids
+    }), 200
+
+
+def _buffer_pings(pings, rejected):
+    """Place les pings des livraisons connues dans le tampon d'écriture différée"""
+    requested_ids = list({ping['delivery_id'] for ping in pings})
+    known_ids = set(db.session.execute(
+        db.select(DeliveryDB.id).where(DeliveryDB.id.in_(requested_ids))
+    ).scalars()) if requested_ids else set()
+
+    known_pings = [ping for ping in pings if ping['delivery_id'] in known_ids]
+    for ping in known_pings:
+        location_buffer.put(ping)
+    eta_engine.record_positions(known_pings)
+
+    # Rien n'est encore écrit : l'accusé compte les pings mis en attente
+    return jsonify({
+        "accepted": len(pings),
+        "buffered": len(known_pings),
+        "rejected": rejected,
+        "unknown": sorted(set(requested_ids) - known_ids)
+    }), 200
+
+
+@api.route('/deliveries/locations/buffer', methods=['GET'])
+def get_location_buffer_stats():
+    """Métriques du tampon d'écriture différée des positions"""
+    return jsonify(location_buffer.stats()), 200
+
+
+@api.route('/deliveries/<delivery_id>/track', methods=['GET'])
+def get_delivery_track(delivery_id):
+    """Renvoie en streaming l'historique des positions d'une livraison"""
+    since = request.args.get('since')
+
+    try:
+        since_ts = parse_since(since) if since is not None else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if db.session.query(DeliveryDB.id).filter_by(id=delivery_id).scalar() is None:
+        return jsonify({"error": "Delivery not found"}), 404
+
+    def generate():
+        yield '{"delivery_id": %s, "points": [' % json.dumps(delivery_id)
+        separator = ''
+        buffer = []
+        for ts, lat, lon in iter_track(delivery_id, since_ts):
+            buffer.append(f'[{ts},{lat},{lon}]')
+            if len(buffer) >= TRACK_STREAM_BATCH:
+                yield separator + ','.join(buffer)
+                separator = ','
+                buffer = []
+        if buffer:
+            yield separator + ','.join(buffer)
+        yield ']}'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+@api.route('/deliveries/<delivery_id>/eta', methods=['GET'])
+def get_delivery_eta(delivery_id):
+    """Heure d'arrivée estimée d'une livraison, servie depuis le cache des estimations"""
+    cached = eta_engine.lookup(delivery_id)
+    if cached is not None:
+        return jsonify({"delivery_id": delivery_id, **cached}), 200
+
+    delivery_db = DeliveryDB.query.get(delivery_id)
+    if not delivery_db:
+        return jsonify({"error": "Delivery not found"}), 404
+
+    eta_engine.refresh_profile()
+    document = _delivery_document(delivery_db, include_order=False)
+    return jsonify({"delivery_id": delivery_id, "status": document['status'], "eta": document['eta']}), 200
 
-@app.route('/deliveries/<delivery_id>/cancel', methods=['PATCH'])
+
+@api.route('/deliveries/<delivery_id>/cancel', methods=['PATCH'])
 def cancel_delivery(delivery_id):
     """Annule une livraison"""
     delivery_db = DeliveryDB.query.get(delivery_id)
@@ -466,28 +1002,169 @@ def cancel_delivery(delivery_id):
         # Annuler la livraison
         delivery_db.status = "cancelled"
         delivery_db.cancellation_reason = data['reason']
-        db.session.commit()
+        commit_session()
+        active_deliveries.record(delivery_db)
 
-        return jsonify(delivery_db.to_dict()), 200
+        return jsonify(_delivery_document(delivery_db)), 200
+
+    except Exception as e:
+        rollback_session()
+        return jsonify({"error": "Internal server error"}), 500
+
+
+# ==================== ANALYTICS ENDPOINTS ====================
+
+@api.route('/analytics/revenue', methods=['GET'])
+def get_revenue():
+    """Chiffre d'affaires par heure ou par jour, lu dans les agrégats (granularity=, from=, to=)"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"Invalid granularity. Must be one of {list(GRANULARITIES)}"}), 400
+
+    try:
+        end = parse_bound(request.args['to']) if request.args.get('to') else datetime.utcnow()
+        start = (parse_bound(request.args['from']) if request.args.get('from')
+                 else end - REVENUE_DEFAULT_WINDOWS[granularity])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if start >= end:
+        return jsonify({"error": "from must be before to"}), 400
+    if (end - start) / timedelta(**{granularity + 's': 1}) > REVENUE_MAX_BUCKETS:
+        return jsonify({"error": f"Period too long: at most {REVENUE_MAX_BUCKETS} buckets"}), 400
+
+    report = revenue_report(granularity, start, end)
+    return jsonify({
+        "granularity": granularity,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        **report
+    }), 200
+
+
+@api.route('/analytics/deliveries', methods=['GET'])
+def get_delivery_analytics():
+    """Durées (p50/p90/p99), ponctualité et détail par livreur des livraisons terminées (from=, to=, target=)"""
+    try:
+        end = parse_bound(request.args['to']) if request.args.get('to') else datetime.utcnow()
+        start = (parse_bound(request.args['from']) if request.args.get('from')
+                 else end - DELIVERY_STATS_DEFAULT_WINDOW)
+        target = float(request.args.get('target', DEFAULT_TARGET_MINUTES))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if start >= end:
+        return jsonify({"error": "from must be before to"}), 400
+    if not target > 0:
+        return jsonify({"error": "target must be a positive number of minutes"}), 400
+
+    key = (request.args.get('from'), request.args.get('to'), target)
+    return jsonify(delivery_stats.get(key, start, end, target)), 200
+
+
+# ==================== BATCH ENDPOINT ====================
+
+@api.route('/batch', methods=['POST'])
+def batch():
+    """Exécute plusieurs opérations de l'API dans une seule transaction"""
+    data = request.get_json(silent=True)
+
+    if not data or not isinstance(data.get('operations'), list):
+        return jsonify({"error": "operations list is required"}), 400
+
+    operations = data['operations']
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({"error": f"A batch is limited to {MAX_BATCH_OPERATIONS} operations"}), 400
+
+    atomic = bool(data.get('atomic', False))
+    results = []
+
+    try:
+        for index, operation in enumerate(operations):
+            status, body = _run_batch_operation(operation)
+            results.append({"index": index, "status": status, "body": body})
+
+            if atomic and status >= 400:
+                break
+
+        failed = sum(1 for result in results if result['status'] >= 400)
+        committed = not (atomic and failed)
+
+        if committed:
+            db.session.commit()
+        else:
+            db.session.rollback()
 
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": "Internal server error"}), 500
+    finally:
+        # Livraisons modifiées dans le batch : le registre est rechargé et les
+        # ETA en cache (non mises à jour pendant le batch) sont recalculées
+        if g.pop('active_deliveries_dirty', False):
+            active_deliveries.invalidate()
+            eta_engine.discard_estimates()
+
+    return jsonify({
+        "results": results,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "committed": committed
+    }), 200
+
+
+def _run_batch_operation(operation):
+    """
+    Exécute une opération d'un batch dans son propre SAVEPOINT
+
+    Args:
+        operation: {"method": ..., "path": ..., "body": ...}
+
+    Returns:
+        tuple: (code HTTP, corps JSON de la réponse)
+    """
+    if not isinstance(operation, dict) or 'method' not in operation or 'path' not in operation:
+        return 400, {"error": "Each operation requires a method and a path"}
+
+    method = str(operation['method']).upper()
+    path = str(operation['path'])
+
+    if method not in BATCH_METHODS:
+        return 400, {"error": f"Invalid method. Must be one of {list(BATCH_METHODS)}"}
+    if path.split('?')[0].rstrip('/') == '/batch':
+        return 400, {"error": "Nested batches are not allowed"}
+
+    savepoint = db.session.begin_nested()
+    g.batch_savepoint = savepoint
+
+    try:
+        with current_app.test_request_context(path, method=method, json=operation.get('body')):
+            try:
+                response = current_app.make_response(current_app.dispatch_request())
+            except HTTPException as e:
+                response = current_app.make_response(current_app.handle_user_exception(e))
+    finally:
+        g.batch_savepoint = None
+
+    if response.status_code >= 400:
+        if savepoint.is_active:
+            savepoint.rollback()
+    elif savepoint.is_active:
+        savepoint.commit()
+
+    return response.status_code, response.get_json(silent=True)
 
 
 # ==================== ERROR HANDLERS ====================
 
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     """Handler pour les erreurs 404"""
     return jsonify({"error": "Resource not found"}), 404
 
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     """Handler pour les erreurs 500"""
     return jsonify({"error": "Internal server error"}), 500
 
-
-if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
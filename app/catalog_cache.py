@@ -0,0 +1,118 @@
+"""
+Cache en mémoire du catalogue de pizzas, versionné par un tampon en base
+"""
+from app.database import db
+from app.models.db_models import PizzaDB, CatalogVersionDB
+import json
+import threading
+import uuid
+
+CATALOG_VERSION_ID = 1
+
+
+def bump_catalog_version():
+    """
+    Invalide le catalogue en changeant son tampon de version
+
+    Doit être appelée dans la transaction qui modifie le catalogue,
+    avant le commit : tous les processus voient la nouvelle version
+    en même temps que les données.
+    """
+    version = db.session.get(CatalogVersionDB, CATALOG_VERSION_ID)
+
+    if version is None:
+        version = CatalogVersionDB(id=CATALOG_VERSION_ID)
+        db.session.add(version)
+
+    version.version = str(uuid.uuid4())
+
+
+def get_catalog_version():
+    """
+    Lit le tampon de version courant du catalogue
+
+    Returns:
+        str: Version courante, ou None si le catalogue n'a jamais été versionné
+    """
+    return db.session.query(CatalogVersionDB.version).filter_by(
+        id=CATALOG_VERSION_ID
+    ).scalar()
+
+
+def build_catalog():
+    """
+    Construit le catalogue groupé par nom de pizza
+
+    Returns:
+        dict: Document {"catalog": [...], "count": n}
+    """
+    pizzas_db = PizzaDB.query.filter(
+        PizzaDB.in_catalog == True
+    ).order_by(PizzaDB.name, PizzaDB.size).all()
+
+    # Grouper par nom de pizza
+    catalog = {}
+    for pizza in pizzas_db:
+        pizza_dict = pizza.to_dict()
+        name = pizza_dict['name']
+
+        if name not in catalog:
+            catalog[name] = {
+                'name': name,
+                'toppings': pizza_dict['toppings'],
+                'sizes': []
+            }
+
+        catalog[name]['sizes'].append({
+            'id': pizza_dict['pizza_id'],
+            'size': pizza_dict['size'],
+            'price': pizza_dict['price'],
+            'currency': pizza_dict['currency']
+        })
+
+    catalog_list = list(catalog.values())
+
+    return {"catalog": catalog_list, "count": len(catalog_list)}
+
+
+class CatalogCache:
+    """Instantané pré-sérialisé du catalogue, valide pour une version donnée"""
+
+    def __init__(self):
+        """Initialise un cache vide"""
+        self._lock = threading.Lock()
+        self._version = None
+        self._body = None
+
+    def get(self):
+        """
+        Retourne l'instantané du catalogue, reconstruit si la version a changé
+
+        Returns:
+            tuple: (version ou None, corps JSON en bytes)
+        """
+        version = get_catalog_version()
+
+        if version is None:
+            # Catalogue jamais versionné : pas d'identifiant fiable pour le cache
+            return None, self._serialize(build_catalog())
+
+        with self._lock:
+            if version != self._version:
+                self._body = self._serialize(build_catalog())
+                self._version = version
+            return self._version, self._body
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._version = None
+            self._body = None
+
+    @staticmethod
+    def _serialize(document):
+        """Sérialise le document en JSON"""
+        return json.dumps(document, sort_keys=True).encode('utf-8')
+
+
+catalog_cache = CatalogCache()
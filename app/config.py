@@ -0,0 +1,105 @@
+"""
+Profils de configuration de l'application
+
+Le profil est choisi par la variable d'environnement PIZZA_CONFIG
+(development par défaut, production ou testing). DATABASE_URL remplace l'URI de la
+base dans tous les profils.
+"""
+import os
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'pizza_delivery.db')
+
+
+class Config:
+    """Profil par défaut (développement) : réglages SQLite d'origine"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+
+    # PRAGMA exécutés à chaque nouvelle connexion SQLite : {nom: valeur}
+    SQLITE_PRAGMAS = {}
+
+    # Instrumentation des requêtes (GET /metrics, en-tête Server-Timing)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+    # Profilage des requêtes : jeton administrateur (X-Profile, _profile=) et
+    # échantillonnage automatique d'une requête sur N (0 : désactivé)
+    PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN')
+    PROFILE_SAMPLE_RATE = int(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')  # par défaut instance/profiles
+    PROFILE_MAX_FILES = 200
+
+    # Écriture différée des positions GPS (désactivée par défaut)
+    LOCATION_WRITE_BEHIND = os.environ.get('LOCATION_WRITE_BEHIND') == '1'
+    LOCATION_FLUSH_INTERVAL_MS = int(os.environ.get('LOCATION_FLUSH_INTERVAL_MS', '500'))
+
+    # Rechargement du profil des ETA dans un thread, hors des requêtes
+    ETA_PROFILE_BACKGROUND = os.environ.get('ETA_PROFILE_BACKGROUND', '1') == '1'
+
+
+class ProductionConfig(Config):
+    """
+    Profil de production SQLite
+
+    WAL : les lectures ne sont plus bloquées par l'écriture en cours.
+    synchronous=NORMAL : en WAL, un seul fsync par checkpoint au lieu d'un par
+    commit (une coupure de courant peut perdre les derniers commits, jamais
+    corrompre la base).
+    """
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms d'attente du verrou d'écriture avant SQLITE_BUSY
+        'mmap_size': 268435456,  # 256 Mo lus par mmap
+        'cache_size': -65536,  # 64 Mo de cache de pages par connexion
+        'temp_store': 'MEMORY'
+    }
+
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+        'connect_args': {
+            'timeout': 5,  # busy_timeout du module sqlite3, en secondes
+            'check_same_thread': False
+        }
+    }
+
+
+class TestingConfig(Config):
+    """Profil des tests : base SQLite en mémoire, propre à chaque application"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    LOCATION_WRITE_BEHIND = False
+    # Base en mémoire propre à chaque connexion : invisible depuis un autre thread
+    ETA_PROFILE_BACKGROUND = False
+
+
+CONFIGS = {
+    'development': Config,
+    'production': ProductionConfig,
+    'testing': TestingConfig
+}
+
+
+def get_config(name=None):
+    """
+    Retourne le profil de configuration demandé
+
+    Args:
+        name: Nom du profil, ou None pour lire PIZZA_CONFIG
+
+    Returns:
+        type: Classe de configuration
+
+    Raises:
+        ValueError: Si le profil est inconnu
+    """
+    name = name or os.environ.get('PIZZA_CONFIG', 'development')
+
+    if name not in CONFIGS:
+        raise ValueError(f"Unknown configuration: {name}. Must be one of {list(CONFIGS)}")
+
+    return CONFIGS[name]
@@ -1,16 +1,116 @@
 """
 Configuration de la base de données SQLAlchemy
 """
+from flask import g, has_app_context, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import datetime
 
 db = SQLAlchemy()
 
 
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+def is_write_transaction():
+    """
+    Indique si la transaction qui s'ouvre va écrire
+
+    Vrai pour les requêtes HTTP d'écriture et pour le code qui le déclare
+    avec g.write_transaction (flush du tampon de positions).
+    """
+    if has_app_context() and g.get('write_transaction'):
+        return True
+    return has_request_context() and request.method in WRITE_METHODS
+
+
+def configure_sqlite_transactions(engine, immediate=is_write_transaction):
+    """
+    Laisse SQLAlchemy piloter les transactions des connexions SQLite du moteur
+
+    Le module sqlite3 n'ouvre plus de transaction implicite : chaque
+    transaction commence par un BEGIN explicite (SAVEPOINT fiables).
+
+    Une transaction d'écriture réserve le verrou dès son ouverture
+    (BEGIN IMMEDIATE) : en WAL, une transaction commencée en lecture ne peut
+    plus écrire si un autre processus a validé entre-temps (SQLITE_BUSY_SNAPSHOT,
+    sans attente busy_timeout). Réservé d'emblée, le verrou est attendu
+    jusqu'à busy_timeout.
+
+    Args:
+        engine: Moteur SQLAlchemy
+        immediate: Fonction sans argument indiquant si la transaction va écrire
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _sqlite_disable_implicit_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, 'begin')
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if immediate() else 'BEGIN')
+
+
+def configure_sqlite_pragmas(engine, pragmas):
+    """
+    Exécute des PRAGMA sur chaque nouvelle connexion SQLite du moteur
+
+    Args:
+        engine: Moteur SQLAlchemy
+        pragmas: {nom: valeur}, par exemple {'journal_mode': 'WAL'}
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    statements = []
+    for name, value in pragmas.items():
+        if not str(name).isidentifier() or not str(value).replace('-', '').isalnum():
+            raise ValueError(f"Invalid SQLite pragma: {name}={value}")
+        statements.append(f'PRAGMA {name}={value}')
+
+    @event.listens_for(engine, 'connect')
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+
+def commit_session():
+    """
+    Valide la transaction de la requête courante
+
+    Dans un batch (POST /batch), les écritures sont seulement flushées :
+    le batch valide l'ensemble en une seule transaction.
+    """
+    if g.get('batch_savepoint') is not None:
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def rollback_session():
+    """
+    Annule la transaction de la requête courante
+
+    Dans un batch, seule l'opération en cours (son SAVEPOINT) est annulée.
+    """
+    savepoint = g.get('batch_savepoint')
+    if savepoint is not None:
+        if savepoint.is_active:
+            savepoint.rollback()
+    else:
+        db.session.rollback()
+
+
 def init_db(app):
     """
     Initialise la base de données avec l'application Flask
-    Peuple automatiquement la base si elle est vide
+
+    Aucune connexion n'est ouverte : le schéma est créé par `flask init-db`
+    (ou les migrations) et les données initiales par `flask seed`.
 
     Args:
         app: Instance de l'application Flask
@@ -18,22 +118,19 @@ def init_db(app):
     db.init_app(app)
 
     with app.app_context():
-        # Créer toutes les tables
-        db.create_all()
-        print("✅ Base de données initialisée avec succès")
-
-        # Peupler la base si elle est vide
-        from app.seeds import is_database_empty, seed_all
+        configure_sqlite_transactions(db.engine)
+        configure_sqlite_pragmas(db.engine, app.config.get('SQLITE_PRAGMAS'))
 
-        if is_database_empty():
-            print("\n🌱 Base de données vide détectée - Peuplement automatique...")
-            stats = seed_all()
-            print(f"\n📊 Peuplement terminé :")
-            print(f"   - {stats['pizzas']} pizzas ajoutées")
-            print(f"   - {stats['orders']} commandes ajoutées")
-            print("="*50)
-        else:
-            print("📊 Base de données déjà peuplée - Aucune action nécessaire")
 
+def create_schema():
+    """
+    Crée les tables manquantes
 
+    Doit être appelée dans un contexte d'application.
 
+    Returns:
+        bool: True si la base ne contenait encore aucune table
+    """
+    was_empty = not db.inspect(db.engine).get_table_names()
+    db.create_all()
+    return was_empty
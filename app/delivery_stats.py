@@ -0,0 +1,158 @@
+"""
+Statistiques de performance des livraisons (durées, ponctualité, par livreur)
+
+Les durées des livraisons terminées sont calculées par SQLite et lues en une
+requête Core (sans objets ORM), puis agrégées avec NumPy. Les résultats sont mis en cache par fenêtre, pour
+max_age secondes ; le cache est propre au processus et vidé à chaque
+livraison terminée.
+"""
+from app.database import db
+from app.models.db_models import DeliveryDB
+from app.exports import delivery_duration_seconds
+from flask import g
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+import threading
+import time
+
+PERCENTILES = (50, 90, 99)
+
+# Délai de livraison visé par défaut (ancienne estimation fixe de 30 minutes ; l'ETA apprise est dans app.eta)
+DEFAULT_TARGET_MINUTES = 30
+
+
+def load_durations(start, end):
+    """
+    Lit en masse les livraisons terminées créées dans [start, end)
+
+    Requête servie par l'index ix_deliveries_status_created_at.
+
+    Returns:
+        tuple: (noms des livreurs, durées en secondes) en tableaux NumPy
+    """
+    result = db.session.connection().execute(
+        db.select(DeliveryDB.driver_name, delivery_duration_seconds())
+        .where(DeliveryDB.status == 'delivered',
+               DeliveryDB.created_at >= start,
+               DeliveryDB.created_at < end,
+               DeliveryDB.started_at.is_not(None),
+               DeliveryDB.completed_at.is_not(None))
+    ).all()
+
+    if not result:
+        return np.array([], dtype=object), np.array([], dtype=float)
+
+    drivers, durations = zip(*result)
+    return np.array(drivers, dtype=object), np.array(durations, dtype=float)
+
+
+def _summary(durations, on_time):
+    """Percentiles, moyenne et taux de ponctualité d'un ensemble de durées"""
+    values = np.percentile(durations, PERCENTILES)
+    return {
+        'duration_seconds': {
+            **{f'p{p}': round(float(value), 1) for p, value in zip(PERCENTILES, values)},
+            'mean': round(float(durations.mean()), 1)
+        },
+        'on_time_rate': round(float(on_time.mean()), 4)
+    }
+
+
+def compute_delivery_stats(start, end, target_minutes=DEFAULT_TARGET_MINUTES):
+    """
+    Calcule les statistiques des livraisons terminées créées dans [start, end)
+
+    Args:
+        start: Début de la fenêtre
+        end: Fin de la fenêtre (exclue)
+        target_minutes: Durée maximale d'une livraison à l'heure
+
+    Returns:
+        dict: Statistiques globales et par livreur (par nombre de livraisons décroissant)
+    """
+    drivers, durations = load_durations(start, end)
+    stats = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'target_minutes': target_minutes,
+        'deliveries': int(durations.size),
+        'duration_seconds': None,
+        'on_time_rate': None,
+        'drivers': []
+    }
+    if not durations.size:
+        return stats
+
+    on_time = durations <= target_minutes * 60
+    stats.update(_summary(durations, on_time))
+
+    # Regroupement par livreur : tri par (livreur, durée) puis découpage des tranches
+    names, inverse, counts = np.unique(drivers.astype(str), return_inverse=True, return_counts=True)
+    order = np.lexsort((durations, inverse))
+    boundaries = np.cumsum(counts)[:-1]
+    groups = zip(names, np.split(durations[order], boundaries), np.split(on_time[order], boundaries))
+
+    stats['drivers'] = sorted(
+        ({'driver_name': str(name), 'deliveries': int(group.size), **_summary(group, group_on_time)}
+         for name, group, group_on_time in groups),
+        key=lambda driver: (-driver['deliveries'], driver['driver_name'])
+    )
+    return stats
+
+
+class DeliveryStatsCache:
+    """Statistiques déjà calculées, par fenêtre demandée"""
+
+    def __init__(self, max_age=60, max_entries=128):
+        """
+        Args:
+            max_age: Durée de vie d'un résultat en secondes
+            max_entries: Nombre de fenêtres conservées (les moins récentes sont évincées)
+        """
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, start, end, target_minutes=DEFAULT_TARGET_MINUTES):
+        """
+        Retourne les statistiques d'une fenêtre, calculées au besoin
+
+        Dans un POST /batch, le résultat n'est pas mis en cache : il peut
+        refléter des écritures qui seront annulées.
+
+        Args:
+            key: Clé de cache (paramètres de la requête)
+            start: Début de la fenêtre
+            end: Fin de la fenêtre (exclue)
+            target_minutes: Durée maximale d'une livraison à l'heure
+
+        Returns:
+            dict: Statistiques (voir compute_delivery_stats)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.max_age:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        stats = compute_delivery_stats(start, end, target_minutes)
+        stats['computed_at'] = datetime.utcnow().isoformat()
+
+        if g.get('batch_savepoint') is None:
+            with self._lock:
+                self._entries[key] = (time.monotonic(), stats)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return stats
+
+    def invalidate(self):
+        """Vide le cache (une livraison vient d'être terminée)"""
+        with self._lock:
+            self._entries.clear()
+
+
+delivery_stats = DeliveryStatsCache()
@@ -0,0 +1,443 @@
+"""
+Estimation de l'heure d'arrivée des livraisons (ETA)
+
+L'estimation combine la dernière position connue du livreur, la destination
+(distance orthodromique) et un profil de vitesse appris sur les livraisons
+terminées, par heure de la journée (UTC) :
+
+- position et destination connues : distance restante / vitesse de l'heure ;
+- sinon : durée médiane des livraisons démarrées à la même heure, comptée
+  depuis le démarrage.
+
+Le profil est chargé (puis rechargé après profile_max_age secondes) à la
+demande des endpoints qui créent, démarrent ou terminent une livraison et de
+GET /deliveries/<id>/eta, dans un thread (ETA_PROFILE_BACKGROUND) : la requête
+ne l'attend pas. Les endpoints ajoutent l'ETA aux documents de livraison
+(EtaEngine.overlay) sans requête, avec le dernier profil chargé (valeurs par
+défaut avant le premier chargement). Les estimations des livraisons actives
+sont mises en cache et recalculées à chaque nouvelle position, sans requête.
+"""
+from app.database import db
+from app.models.db_models import DeliveryDB, DeliveryTrackChunkDB
+from app.tracks import decode_points, EPOCH
+from app.exports import delivery_duration_seconds
+from app.models.geo import haversine_km
+from app.models.delivery import DEFAULT_SPEED_KMH, DEFAULT_DURATION_SECONDS
+from flask import current_app, g
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+import threading
+import time
+
+# Tant qu'une heure n'a pas assez d'historique : DEFAULT_SPEED_KMH et
+# DEFAULT_DURATION_SECONDS (estimation de Delivery.get_estimated_time())
+MIN_SAMPLES = 5
+
+# Historique pris en compte et vitesses plausibles (au-delà : position erronée)
+PROFILE_WINDOW = timedelta(days=28)
+MIN_TRIP_KM = 0.05
+SPEED_RANGE_KMH = (1.0, 150.0)
+
+# Seules les estimations des livraisons en cours sont gardées en cache
+CACHED_STATUSES = ('assigned', 'in_transit')
+
+# Entrées du calcul, lues dans un document de livraison
+EtaInputs = namedtuple('EtaInputs', [
+    'status', 'started_at', 'completed_at', 'latitude', 'longitude', 'located_at',
+    'destination_latitude', 'destination_longitude'
+])
+
+# Résultat du calcul : heure d'arrivée absolue, le temps restant est calculé à la lecture
+Estimate = namedtuple('Estimate', ['arrival', 'method', 'distance_km', 'speed_kmh', 'computed_at'])
+
+
+def parse_destination(data):
+    """
+    Lit la destination optionnelle d'une livraison
+
+    Args:
+        data: Corps de la requête (destination_latitude, destination_longitude)
+
+    Returns:
+        tuple: (latitude, longitude), ou (None, None) si absente
+
+    Raises:
+        ValueError: Si la destination est incomplète ou invalide
+    """
+    lat = data.get('destination_latitude')
+    lon = data.get('destination_longitude')
+    if lat is None and lon is None:
+        return None, None
+    if lat is None or lon is None:
+        raise ValueError("destination_latitude and destination_longitude must be provided together")
+
+    if isinstance(lat, bool) or isinstance(lon, bool) or \
+            not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        raise ValueError("destination_latitude and destination_longitude must be numbers")
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise ValueError("Coordinates out of range")
+
+    return float(lat), float(lon)
+
+
+class SpeedProfile:
+    """Vitesse et durée médianes des livraisons, par heure de la journée (UTC)"""
+
+    def __init__(self, speeds=None, durations=None, trips=0, deliveries=0):
+        """
+        Args:
+            speeds: 24 vitesses en km/h (par défaut DEFAULT_SPEED_KMH)
+            durations: 24 durées en secondes (par défaut DEFAULT_DURATION_SECONDS)
+            trips: Nombre de trajets ayant servi aux vitesses
+            deliveries: Nombre de livraisons ayant servi aux durées
+        """
+        self.speeds = speeds or [DEFAULT_SPEED_KMH] * 24
+        self.durations = durations or [DEFAULT_DURATION_SECONDS] * 24
+        self.trips = trips
+        self.deliveries = deliveries
+
+    def speed_kmh(self, hour):
+        """Vitesse moyenne vers la destination à cette heure"""
+        return self.speeds[hour]
+
+    def duration_seconds(self, hour):
+        """Durée d'une livraison démarrée à cette heure"""
+        return self.durations[hour]
+
+
+def _hourly_medians(hours, values, default):
+    """Médiane par heure ; médiane globale (ou défaut) pour les heures peu représentées"""
+    hours = np.asarray(hours, dtype=int)
+    values = np.asarray(values, dtype=float)
+    overall = float(np.median(values)) if values.size >= MIN_SAMPLES else default
+
+    medians = [overall] * 24
+    counts = np.bincount(hours, minlength=24)
+    for hour in np.flatnonzero(counts >= MIN_SAMPLES):
+        medians[hour] = float(np.median(values[hours == hour]))
+    return medians
+
+
+def load_speed_profile(now=None):
+    """
+    Apprend le profil depuis les livraisons terminées créées pendant PROFILE_WINDOW
+
+    Vitesse d'un trajet : distance entre le premier point de son historique
+    et la destination, divisée par le temps écoulé jusqu'à la fin de la
+    livraison (c'est une vitesse « à vol d'oiseau », détours compris).
+    Deux requêtes, servies par les index des livraisons et de l'historique.
+
+    Returns:
+        SpeedProfile: Profil appris
+    """
+    since = (now or datetime.utcnow()) - PROFILE_WINDOW
+    delivered = (DeliveryDB.status == 'delivered', DeliveryDB.created_at >= since)
+
+    # Premier bloc de l'historique de chaque livraison (index delivery_id, start_ts)
+    chunks = db.aliased(DeliveryTrackChunkDB)
+    first_chunk = db.select(db.func.min(chunks.start_ts)).where(
+        chunks.delivery_id == DeliveryDB.id
+    ).correlate(DeliveryDB).scalar_subquery()
+    trips = db.session.execute(
+        db.select(DeliveryDB.completed_at, DeliveryDB.destination_latitude, DeliveryDB.destination_longitude,
+                  DeliveryTrackChunkDB.start_ts, DeliveryTrackChunkDB.data)
+        .join(DeliveryTrackChunkDB, db.and_(DeliveryTrackChunkDB.delivery_id == DeliveryDB.id,
+                                            DeliveryTrackChunkDB.start_ts == first_chunk))
+        .where(*delivered,
+               DeliveryDB.completed_at.is_not(None),
+               DeliveryDB.destination_latitude.is_not(None),
+               DeliveryDB.destination_longitude.is_not(None))
+    )
+
+    trip_hours, speeds = [], []
+    for row in trips:
+        # Premier point uniquement : 12 octets
+        ts, lat, lon = next(decode_points(row.data[:12], row.start_ts))
+        departure = EPOCH + timedelta(milliseconds=ts)
+        elapsed = (row.completed_at - departure).total_seconds()
+        distance = haversine_km(lat, lon, row.destination_latitude, row.destination_longitude)
+        if elapsed <= 0 or distance < MIN_TRIP_KM:
+            continue
+        speed = distance / elapsed * 3600
+        if SPEED_RANGE_KMH[0] <= speed <= SPEED_RANGE_KMH[1]:
+            trip_hours.append(departure.hour)
+            speeds.append(speed)
+
+    hour = db.cast(db.func.strftime('%H', DeliveryDB.started_at), db.Integer)
+    durations = db.session.execute(
+        db.select(hour, delivery_duration_seconds())
+        .where(*delivered, DeliveryDB.started_at.is_not(None), DeliveryDB.completed_at.is_not(None))
+    ).all()
+    durations = [(row[0], row[1]) for row in durations if row[1] is not None and row[1] > 0]
+
+    return SpeedProfile(
+        speeds=_hourly_medians(trip_hours, speeds, DEFAULT_SPEED_KMH),
+        durations=_hourly_medians([row[0] for row in durations], [row[1] for row in durations],
+                                  DEFAULT_DURATION_SECONDS),
+        trips=len(speeds),
+        deliveries=len(durations)
+    )
+
+
+def _parse_datetime(value):
+    """Date ISO d'un document (ou None)"""
+    return datetime.fromisoformat(value) if value else None
+
+
+def inputs_from_document(document):
+    """Entrées du calcul lues dans un document produit par DeliveryDB.to_dict()"""
+    return EtaInputs(
+        document['status'],
+        _parse_datetime(document['started_at']),
+        _parse_datetime(document['completed_at']),
+        document['current_latitude'],
+        document['current_longitude'],
+        _parse_datetime(document['location_updated_at']),
+        document.get('destination_latitude'),
+        document.get('destination_longitude')
+    )
+
+
+def estimate_arrival(inputs, profile, now):
+    """
+    Calcule l'heure d'arrivée d'une livraison
+
+    Args:
+        inputs: EtaInputs
+        profile: SpeedProfile
+        now: Heure du calcul (UTC naïf)
+
+    Returns:
+        Estimate: Estimation, ou None pour une livraison annulée
+    """
+    if inputs.status == 'cancelled':
+        return None
+    if inputs.status == 'delivered':
+        return Estimate(inputs.completed_at, 'delivered', 0.0, None, now)
+
+    if inputs.latitude is not None and inputs.destination_latitude is not None:
+        distance = haversine_km(inputs.latitude, inputs.longitude,
+                                inputs.destination_latitude, inputs.destination_longitude)
+        # En route, le trajet restant part de la dernière position ; sinon de maintenant
+        reference = inputs.located_at if inputs.status == 'in_transit' and inputs.located_at else now
+        speed = profile.speed_kmh(reference.hour)
+        return Estimate(reference + timedelta(hours=distance / speed), 'distance', distance, speed, now)
+
+    reference = inputs.started_at or now
+    duration = profile.duration_seconds(reference.hour)
+    return Estimate(reference + timedelta(seconds=duration), 'history', None, None, now)
+
+
+def eta_document(estimate, now):
+    """
+    Document ETA exposé par l'API
+
+    Args:
+        estimate: Estimate (ou None)
+        now: Heure de lecture, pour le temps restant
+
+    Returns:
+        dict: estimated_arrival, remaining_seconds, distance_km, speed_kmh, method, computed_at
+    """
+    if estimate is None or estimate.arrival is None:
+        return {'estimated_arrival': None, 'remaining_seconds': None, 'distance_km': None,
+                'speed_kmh': None, 'method': None,
+                'computed_at': estimate.computed_at.isoformat() if estimate else None}
+
+    return {
+        'estimated_arrival': estimate.arrival.isoformat(),
+        'remaining_seconds': max(0, round((estimate.arrival - now).total_seconds())),
+        'distance_km': round(estimate.distance_km, 3) if estimate.distance_km is not None else None,
+        'speed_kmh': round(estimate.speed_kmh, 1) if estimate.speed_kmh is not None else None,
+        'method': estimate.method,
+        'computed_at': estimate.computed_at.isoformat()
+    }
+
+
+class EtaEngine:
+    """Profil de vitesse et estimations en cache, par livraison"""
+
+    def __init__(self, max_age=30, profile_max_age=600, max_entries=10000):
+        """
+        Args:
+            max_age: Durée de vie d'une estimation en secondes (écritures des autres processus)
+            profile_max_age: Durée après laquelle le profil est rechargé, en secondes
+            max_entries: Nombre d'estimations conservées (les moins récentes sont évincées)
+        """
+        self.max_age = max_age
+        self.profile_max_age = profile_max_age
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._profile = SpeedProfile()
+        self._profile_version = 0
+        self._profile_loaded_at = None
+        self._reload_thread = None
+        # {delivery_id: (inputs, version du profil, Estimate, instant monotone)}
+        self._estimates = OrderedDict()
+
+    @property
+    def profile(self):
+        """Dernier profil chargé"""
+        return self._profile
+
+    def refresh_profile(self, force=False):
+        """
+        Recharge le profil s'il n'a jamais été chargé ou a plus de profile_max_age secondes
+
+        Avec ETA_PROFILE_BACKGROUND, le rechargement est lancé dans un thread et
+        la requête continue avec le profil courant. Sans effet dans un
+        POST /batch : ses écritures peuvent être annulées.
+
+        Args:
+            force: Recharger même si le profil est récent, sans thread
+
+        Returns:
+            SpeedProfile: Profil courant
+        """
+        if g.get('batch_savepoint') is not None:
+            return self._profile
+
+        loaded_at = self._profile_loaded_at
+        if not force and loaded_at is not None and time.monotonic() - loaded_at <= self.profile_max_age:
+            return self._profile
+
+        if not force and current_app.config.get('ETA_PROFILE_BACKGROUND'):
+            self._reload_in_background(current_app._get_current_object())
+            return self._profile
+
+        self._install(load_speed_profile(), self._profile_version)
+        return self._profile
+
+    def _install(self, profile, version):
+        """Remplace le profil, sauf si invalidate() a été appelé depuis le début du chargement"""
+        with self._lock:
+            if self._profile_version != version:
+                return
+            self._profile = profile
+            self._profile_version += 1
+            self._profile_loaded_at = time.monotonic()
+
+    def _reload_in_background(self, app):
+        """Lance le chargement du profil dans un thread (un seul à la fois)"""
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return
+            version = self._profile_version
+
+            def run():
+                with app.app_context():
+                    try:
+                        profile = load_speed_profile()
+                    except Exception as e:
+                        app.logger.error("ETA profile reload failed: %s", e)
+                        return
+                self._install(profile, version)
+
+            self._reload_thread = threading.Thread(target=run, name='eta-profile-reload', daemon=True)
+            self._reload_thread.start()
+
+    def _store(self, delivery_id, entry):
+        """Met en cache l'estimation d'une livraison active (hors POST /batch)"""
+        if g.get('batch_savepoint') is not None:
+            return
+        with self._lock:
+            if entry[0].status not in CACHED_STATUSES:
+                self._estimates.pop(delivery_id, None)
+                return
+            self._estimates[delivery_id] = entry
+            self._estimates.move_to_end(delivery_id)
+            while len(self._estimates) > self.max_entries:
+                self._estimates.popitem(last=False)
+
+    def overlay(self, document):
+        """
+        Ajoute l'ETA à un document de livraison, sans requête
+
+        L'estimation en cache est réutilisée tant que ses entrées (statut,
+        position, destination) et le profil n'ont pas changé. Les livraisons
+        terminées ou annulées ne sont pas mises en cache : lister l'historique
+        n'évince pas les estimations des livraisons en cours.
+
+        Args:
+            document: Document produit par DeliveryDB.to_dict()
+
+        Returns:
+            dict: Le même document, avec la clé eta
+        """
+        inputs = inputs_from_document(document)
+        now = datetime.utcnow()
+
+        entry = self._estimates.get(document['delivery_id'])
+        if entry is not None and entry[0] == inputs and entry[1] == self._profile_version and \
+                time.monotonic() - entry[3] <= self.max_age:
+            estimate = entry[2]
+        else:
+            version = self._profile_version
+            estimate = estimate_arrival(inputs, self._profile, now)
+            self._store(document['delivery_id'], (inputs, version, estimate, time.monotonic()))
+
+        document['eta'] = eta_document(estimate, now)
+        return document
+
+    def lookup(self, delivery_id):
+        """
+        Retourne l'ETA en cache d'une livraison, sans requête
+
+        Args:
+            delivery_id: Identifiant de la livraison
+
+        Returns:
+            dict: {status, eta} ou None si l'estimation est absente ou périmée
+        """
+        entry = self._estimates.get(delivery_id)
+        if entry is None or entry[1] != self._profile_version or time.monotonic() - entry[3] > self.max_age:
+            return None
+        return {'status': entry[0].status, 'eta': eta_document(entry[2], datetime.utcnow())}
+
+    def record_positions(self, pings):
+        """
+        Recalcule les estimations en cache des livraisons qui ont bougé
+
+        Seules les livraisons déjà en cache sont recalculées, à partir des
+        entrées gardées en mémoire : aucune requête. Dans un POST /batch, leurs
+        estimations sont retirées du cache.
+
+        Args:
+            pings: Pings normalisés (voir app.locations.parse_ping)
+        """
+        in_batch = g.get('batch_savepoint') is not None
+        now = datetime.utcnow()
+
+        with self._lock:
+            for ping in pings:
+                entry = self._estimates.get(ping['delivery_id'])
+                if entry is None:
+                    continue
+                if in_batch:
+                    del self._estimates[ping['delivery_id']]
+                    continue
+
+                inputs = entry[0]
+                if inputs.located_at is not None and ping['ts'] < inputs.located_at:
+                    continue
+                inputs = inputs._replace(latitude=ping['lat'], longitude=ping['lon'], located_at=ping['ts'])
+                self._estimates[ping['delivery_id']] = (
+                    inputs, self._profile_version, estimate_arrival(inputs, self._profile, now), time.monotonic()
+                )
+
+    def discard_estimates(self):
+        """Vide le cache des estimations, en gardant le profil"""
+        with self._lock:
+            self._estimates.clear()
+
+    def invalidate(self):
+        """Vide le cache et oublie le profil (rechargé au prochain refresh_profile)"""
+        with self._lock:
+            self._estimates.clear()
+            self._profile = SpeedProfile()
+            self._profile_version += 1
+            self._profile_loaded_at = None
+
+
+eta_engine = EtaEngine()
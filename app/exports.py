@@ -0,0 +1,192 @@
+"""
+Exports en streaming (mémoire constante quel que soit le volume)
+
+Les lignes sont lues par lots (yield_per, curseur côté serveur) sans objets
+ORM et sérialisées au fil de l'eau par un générateur. L'export s'exécute
+dans une seule transaction de lecture : le résultat est un instantané
+cohérent de la base.
+"""
+from app.database import db
+from app.models.db_models import PizzaDB, OrderDB, OrderPizzaDB, DeliveryDB, pizza_document, order_document
+from app.locations import parse_timestamp
+import csv
+import io
+import json
+
+EXPORT_CHUNK_SIZE = 1000
+
+DELIVERY_CSV_COLUMNS = ('delivery_id', 'order_id', 'driver_name', 'status', 'created_at',
+                        'started_at', 'completed_at', 'duration_seconds', 'cancellation_reason')
+
+
+def parse_bound(value):
+    """
+    Convertit un paramètre since= / until= en datetime UTC naïf
+
+    Args:
+        value: Secondes depuis l'epoch ou date ISO 8601 (chaîne)
+
+    Returns:
+        datetime: Borne de la période
+
+    Raises:
+        ValueError: Si la valeur est invalide
+    """
+    try:
+        return parse_timestamp(float(value))
+    except ValueError:
+        try:
+            return parse_timestamp(value)
+        except ValueError:
+            raise ValueError(f"Invalid date: {value}")
+
+
+def _pizza_documents(pizza_ids, cache):
+    """Complète le cache {pizza_id: document} avec les pizzas manquantes"""
+    missing = [pizza_id for pizza_id in pizza_ids if pizza_id not in cache]
+    if not missing:
+        return
+
+    rows = db.session.execute(
+        db.select(PizzaDB.id, PizzaDB.name, PizzaDB.size, PizzaDB.price_amount,
+                  PizzaDB.price_currency, PizzaDB.toppings)
+        .where(PizzaDB.id.in_(missing))
+    )
+    for row in rows:
+        cache[row.id] = pizza_document(row, include_id=False)
+
+
+def _order_lines(order_ids, pizza_cache):
+    """Pizzas des commandes d'un lot : {order_id: [document, ...]}"""
+    rows = db.session.execute(
+        db.select(OrderPizzaDB.order_id, OrderPizzaDB.pizza_id)
+        .where(OrderPizzaDB.order_id.in_(order_ids))
+        .order_by(OrderPizzaDB.id)
+    ).all()
+
+    _pizza_documents({row.pizza_id for row in rows}, pizza_cache)
+
+    lines = {}
+    for row in rows:
+        lines.setdefault(row.order_id, []).append(pizza_cache[row.pizza_id])
+    return lines
+
+
+def iter_orders_ndjson(since=None, until=None, statuses=None, selection=None,
+                       include_pizzas=True, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Génère l'export NDJSON des commandes, un document par ligne
+
+    Les documents sont construits par les mêmes fonctions que GET /orders
+    (order_document, pizza_document). Les commandes
+    sont triées par (created_at, id) ; les pizzas d'un lot sont chargées en
+    une requête et le catalogue n'est lu qu'une fois par pizza.
+
+    Args:
+        since: Date de création minimale (incluse)
+        until: Date de création maximale (exclue)
+        statuses: Liste de statuts à exporter (None pour tous)
+        selection: FieldSelection appliquée à chaque document
+        include_pizzas: Inclure la liste des pizzas
+        chunk_size: Nombre de commandes lues et émises par lot
+
+    Yields:
+        str: Un lot de lignes NDJSON
+    """
+    query = db.select(
+        OrderDB.id, OrderDB.customer_name, OrderDB.customer_address, OrderDB.status,
+        OrderDB.created_at, OrderDB.total_amount, OrderDB.currency, OrderDB.item_count
+    ).order_by(OrderDB.created_at, OrderDB.id)
+
+    if since is not None:
+        query = query.where(OrderDB.created_at >= since)
+    if until is not None:
+        query = query.where(OrderDB.created_at < until)
+    if statuses:
+        query = query.where(OrderDB.status.in_(statuses))
+
+    pizza_cache = {}
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+
+    for rows in result.partitions():
+        lines = _order_lines([row.id for row in rows], pizza_cache) if include_pizzas else None
+        buffer = []
+
+        for row in rows:
+            document = order_document(row)
+            if include_pizzas:
+                document['pizzas'] = lines.get(row.id, [])
+            if selection is not None:
+                document = selection.apply(document)
+            buffer.append(json.dumps(document))
+
+        yield '\n'.join(buffer) + '\n'
+
+
+def delivery_duration_seconds():
+    """
+    Durée d'une livraison en secondes (completed_at - started_at), calculée par SQLite
+
+    NULL tant que la livraison n'est pas démarrée et terminée, comme
+    Delivery.calculate_duration().
+    """
+    return db.func.round(
+        (db.func.julianday(DeliveryDB.completed_at) - db.func.julianday(DeliveryDB.started_at)) * 86400, 3
+    )
+
+
+def _isoformat(value):
+    """Date ISO 8601 ou chaîne vide"""
+    return value.isoformat() if value is not None else ''
+
+
+def iter_deliveries_csv(since=None, until=None, statuses=None, driver=None,
+                        chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Génère l'export CSV des livraisons, une ligne par livraison
+
+    La durée est calculée dans la requête SQL ; les livraisons sont triées
+    par (created_at, id).
+
+    Args:
+        since: Date de création minimale (incluse)
+        until: Date de création maximale (exclue)
+        statuses: Liste de statuts à exporter (None pour tous)
+        driver: Nom du livreur (None pour tous)
+        chunk_size: Nombre de livraisons lues et émises par lot
+
+    Yields:
+        str: L'en-tête, puis un lot de lignes CSV
+    """
+    query = db.select(
+        DeliveryDB.id, DeliveryDB.order_id, DeliveryDB.driver_name, DeliveryDB.status,
+        DeliveryDB.created_at, DeliveryDB.started_at, DeliveryDB.completed_at,
+        delivery_duration_seconds().label('duration_seconds'), DeliveryDB.cancellation_reason
+    ).order_by(DeliveryDB.created_at, DeliveryDB.id)
+
+    if since is not None:
+        query = query.where(DeliveryDB.created_at >= since)
+    if until is not None:
+        query = query.where(DeliveryDB.created_at < until)
+    if statuses:
+        query = query.where(DeliveryDB.status.in_(statuses))
+    if driver:
+        query = query.where(DeliveryDB.driver_name == driver)
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(DELIVERY_CSV_COLUMNS)
+    yield output.getvalue()
+
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+
+    for rows in result.partitions():
+        output.seek(0)
+        output.truncate()
+        writer.writerows(
+            (row.id, row.order_id, row.driver_name, row.status, _isoformat(row.created_at),
+             _isoformat(row.started_at), _isoformat(row.completed_at), row.duration_seconds,
+             row.cancellation_reason)
+            for row in rows
+        )
+        yield output.getvalue()
@@ -0,0 +1,104 @@
+"""
+Sélection de champs (fields=) et d'expansions (expand=) pour les documents GET
+"""
+
+
+class FieldSelection:
+    """Représente les paramètres fields= et expand= d'une requête GET"""
+
+    def __init__(self, fields=None, expand=None, allowed_expansions=()):
+        """
+        Initialise la sélection
+
+        Args:
+            fields: Liste des clés à conserver (None pour toutes)
+            expand: Liste des relations à inclure (None pour le comportement par défaut)
+            allowed_expansions: Relations acceptées dans expand
+
+        Raises:
+            ValueError: Si une relation demandée n'est pas supportée
+        """
+        self.fields = set(fields) if fields is not None else None
+        self.expand = set(expand) if expand is not None else None
+
+        if self.expand is not None:
+            unknown = self.expand - set(allowed_expansions)
+            if unknown:
+                raise ValueError(
+                    f"Invalid expand value(s): {sorted(unknown)}. "
+                    f"Must be among {sorted(allowed_expansions)}"
+                )
+
+    @staticmethod
+    def _split(value):
+        """Découpe une liste séparée par des virgules"""
+        if value is None:
+            return None
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    @classmethod
+    def from_args(cls, args, allowed_expansions=()):
+        """
+        Construit la sélection à partir des paramètres de la requête
+
+        Args:
+            args: request.args
+            allowed_expansions: Relations acceptées dans expand
+
+        Returns:
+            FieldSelection: La sélection demandée
+
+        Raises:
+            ValueError: Si expand contient une relation inconnue
+        """
+        return cls(
+            fields=cls._split(args.get('fields')),
+            expand=cls._split(args.get('expand')),
+            allowed_expansions=allowed_expansions
+        )
+
+    def expands(self, relation, keys=()):
+        """
+        Indique si une relation doit être chargée et sérialisée
+
+        Sans expand=, une relation est incluse sauf si fields= ne demande
+        aucune des clés qu'elle alimente.
+
+        Args:
+            relation: Nom de la relation (ex: 'order.pizzas')
+            keys: Clés de premier niveau du document qui dépendent de la relation
+
+        Returns:
+            bool: True si la relation est nécessaire
+        """
+        if self.expand is not None:
+            return any(
+                name == relation or name.startswith(relation + '.')
+                for name in self.expand
+            )
+
+        if self.fields is None:
+            return True
+
+        return bool(self.fields & set(keys or (relation.split('.')[0],)))
+
+    def apply(self, document):
+        """
+        Filtre les clés d'un document selon fields=
+
+        Les relations demandées explicitement via expand= sont conservées.
+
+        Args:
+            document: Dictionnaire sérialisé
+
+        Returns:
+            dict: Le document restreint aux champs demandés
+        """
+        if self.fields is None:
+            return document
+
+        keep = set(self.fields)
+        if self.expand is not None:
+            keep.update(name.split('.')[0] for name in self.expand)
+
+        return {key: value for key, value in document.items() if key in keep}
@@ -0,0 +1,251 @@
+"""
+Tampon d'écriture différée (write-behind) des positions GPS
+
+Quand il est activé, les positions reçues sont gardées en mémoire et écrites
+dans la table deliveries (et dans l'historique) en une seule transaction
+toutes les N millisecondes, ou à l'arrêt du processus.
+"""
+from app.database import db
+from flask import g
+from datetime import datetime
+import atexit
+import threading
+import time
+
+
+class LocationBuffer:
+    """Dernières positions par livraison, en attente d'écriture en base"""
+
+    def __init__(self, max_pings=100000):
+        """
+        Initialise un tampon désactivé
+
+        Args:
+            max_pings: Nombre maximum de pings gardés en mémoire
+        """
+        self.enabled = False
+        self.max_pings = max_pings
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._pending_count = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._metrics = {
+            'buffered_pings': 0,
+            'coalesced_pings': 0,
+            'dropped_pings': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'flushed_deliveries': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0
+        }
+
+    def put(self, ping):
+        """
+        Ajoute un ping normalisé (voir app.locations.parse_ping)
+
+        Au-delà de max_pings, seule la position la plus récente de chaque
+        livraison est gardée ; le ping d'une nouvelle livraison est abandonné
+        si le tampon ne contient plus d'historique à retirer.
+
+        Args:
+            ping: {delivery_id, lat, lon, ts}
+        """
+        with self._lock:
+            pings = self._pending.get(ping['delivery_id'])
+
+            if self._pending_count >= self.max_pings:
+                if pings:
+                    # Tampon plein : on garde la position la plus récente, sans l'historique
+                    keep = [p for p in pings if p['ts'] > ping['ts']][-1:]
+                    self._metrics['dropped_pings'] += len(pings) - len(keep)
+                    self._pending_count -= len(pings) - len(keep)
+                    pings[:] = keep
+                else:
+                    # Nouvelle livraison : l'historique des autres fait de la place
+                    self._compact()
+                    if self._pending_count >= self.max_pings:
+                        self._metrics['dropped_pings'] += 1
+                        return
+
+            if pings is None:
+                pings = self._pending[ping['delivery_id']] = []
+            pings.append(ping)
+            self._pending_count += 1
+            self._metrics['buffered_pings'] += 1
+
+    def _compact(self):
+        """Ne garde que la position la plus récente de chaque livraison (verrou tenu)"""
+        if self._pending_count <= len(self._pending):
+            return
+        for pings in self._pending.values():
+            if len(pings) > 1:
+                self._metrics['dropped_pings'] += len(pings) - 1
+                pings[:] = [max(pings, key=lambda ping: ping['ts'])]
+        self._pending_count = len(self._pending)
+
+    def lookup(self, delivery_id):
+        """
+        Retourne la position en attente la plus récente d'une livraison
+
+        Args:
+            delivery_id: Identifiant de la livraison
+
+        Returns:
+            dict: Ping le plus récent, ou None
+        """
+        if not self._pending:
+            return None
+
+        with self._lock:
+            pings = self._pending.get(delivery_id)
+            if not pings:
+                return None
+            return max(pings, key=lambda ping: ping['ts'])
+
+    def overlay(self, document):
+        """
+        Remplace la position d'un document de livraison par la position en attente
+
+        Args:
+            document: Document produit par DeliveryDB.to_dict()
+
+        Returns:
+            dict: Le même document
+        """
+        ping = self.lookup(document['delivery_id'])
+        if ping is None:
+            return document
+
+        current = document['location_updated_at']
+        if current is None or ping['ts'] >= datetime.fromisoformat(current):
+            document['current_latitude'] = ping['lat']
+            document['current_longitude'] = ping['lon']
+            document['location_updated_at'] = ping['ts'].isoformat()
+        return document
+
+    def depth(self):
+        """Nombre de livraisons dont la position attend d'être écrite"""
+        return len(self._pending)
+
+    def accepts_writes(self):
+        """
+        Indique si les positions de la requête courante doivent être tamponnées
+
+        Un POST /batch écrit toujours directement : son annulation doit
+        pouvoir défaire les positions.
+        """
+        return self.enabled and g.get('batch_savepoint') is None
+
+    def flush(self):
+        """
+        Écrit les positions en attente en une seule transaction
+
+        Doit être appelée dans un contexte d'application, hors d'une requête
+        dont la session porte des écritures non validées. En cas d'échec,
+        les pings sont remis dans le tampon.
+
+        Returns:
+            int: Nombre de livraisons écrites
+        """
+        from app.active_deliveries import active_deliveries
+        from app.eta import eta_engine
+        from app.locations import apply_pings
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_count = 0
+
+            if not pending:
+                return 0
+
+            pings = [ping for delivery_pings in pending.values() for ping in delivery_pings]
+            started = time.perf_counter()
+
+            # Transaction d'écriture : verrou réservé dès sa première lecture
+            previous, g.write_transaction = g.get('write_transaction'), True
+            try:
+                apply_pings(pings)
+                db.session.commit()
+                active_deliveries.record_positions(pings)
+                eta_engine.record_positions(pings)
+            except Exception:
+                db.session.rollback()
+                self._requeue(pending)
+                self._metrics['flush_errors'] += 1
+                raise
+            finally:
+                g.write_transaction = previous
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._metrics['flushes'] += 1
+            self._metrics['flushed_deliveries'] += len(pending)
+            self._metrics['coalesced_pings'] += len(pings) - len(pending)
+            self._metrics['last_flush_ms'] = elapsed_ms
+            self._metrics['max_flush_ms'] = max(self._metrics['max_flush_ms'], elapsed_ms)
+            self._metrics['total_flush_ms'] += elapsed_ms
+
+            return len(pending)
+
+    def _requeue(self, pending):
+        """Remet des pings non écrits devant les pings arrivés depuis"""
+        with self._lock:
+            for delivery_id, pings in pending.items():
+                self._pending[delivery_id] = pings + self._pending.get(delivery_id, [])
+                self._pending_count += len(pings)
+
+    def stats(self):
+        """
+        Retourne les métriques du tampon
+
+        Returns:
+            dict: Profondeur, latences de flush et pings fusionnés/abandonnés
+        """
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['enabled'] = self.enabled
+            stats['depth'] = len(self._pending)
+            stats['pending_pings'] = self._pending_count
+        return stats
+
+    def clear(self):
+        """Abandonne les positions en attente (tests)"""
+        with self._lock:
+            self._pending = {}
+            self._pending_count = 0
+
+    def start(self, app, interval_ms):
+        """
+        Active le tampon et lance le flush périodique en tâche de fond
+
+        Args:
+            app: Application Flask (pour le contexte d'application)
+            interval_ms: Intervalle entre deux flush en millisecondes
+        """
+        self.enabled = True
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval_ms / 1000):
+                with app.app_context():
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        app.logger.error("Location buffer flush failed: %s", e)
+
+        def shutdown():
+            self._stop.set()
+            with app.app_context():
+                self.flush()
+
+        self._thread = threading.Thread(target=run, name='location-buffer-flush', daemon=True)
+        self._thread.start()
+        atexit.register(shutdown)
+
+
+location_buffer = LocationBuffer()
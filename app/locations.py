@@ -0,0 +1,154 @@
+"""
+Ingestion des positions GPS des livreurs
+"""
+from app.database import db
+from app.models.db_models import DeliveryDB
+from app.tracks import append_points, to_epoch_ms
+from sqlalchemy import bindparam, or_
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+MAX_PINGS_PER_REQUEST = 5000
+
+# Avance tolérée sur l'horloge du serveur : au-delà, un ping bloquerait les
+# positions suivantes (plus anciennes que lui) et l'historique du trajet
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def parse_timestamp(value):
+    """
+    Convertit l'horodatage d'un ping en datetime UTC naïf
+
+    Args:
+        value: Secondes depuis l'epoch, chaîne ISO 8601 ou None (maintenant)
+
+    Returns:
+        datetime: Horodatage UTC sans fuseau (comme les colonnes de la base)
+
+    Raises:
+        ValueError: Si l'horodatage est invalide
+    """
+    if value is None:
+        return datetime.utcnow()
+
+    if isinstance(value, bool):
+        raise ValueError("Invalid ts")
+
+    try:
+        if isinstance(value, (int, float)):
+            # Valeur hors des dates représentables, infinie ou NaN : OverflowError, OSError ou ValueError
+            return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except (OverflowError, OSError, ValueError):
+        raise ValueError("Invalid ts")
+
+
+def parse_ping(raw):
+    """
+    Valide un ping {delivery_id, lat, lon, ts}
+
+    Args:
+        raw: Dictionnaire reçu dans la requête
+
+    Returns:
+        dict: Ping normalisé (delivery_id, lat, lon, ts)
+
+    Raises:
+        ValueError: Si le ping est invalide ou daté de plus de MAX_CLOCK_SKEW dans le futur
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("Ping must be an object")
+
+    for field in ('delivery_id', 'lat', 'lon'):
+        if field not in raw:
+            raise ValueError(f"Missing required field: {field}")
+
+    lat, lon = raw['lat'], raw['lon']
+    if isinstance(lat, bool) or isinstance(lon, bool) or \
+            not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        raise ValueError("lat and lon must be numbers")
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise ValueError("Coordinates out of range")
+
+    ts = parse_timestamp(raw.get('ts'))
+    if ts > datetime.utcnow() + MAX_CLOCK_SKEW:
+        raise ValueError("ts is in the future")
+
+    return {
+        'delivery_id': str(raw['delivery_id']),
+        'lat': float(lat),
+        'lon': float(lon),
+        'ts': ts
+    }
+
+
+def latest_pings(pings):
+    """
+    Ne garde que le ping le plus récent de chaque livraison
+
+    Args:
+        pings: Pings normalisés
+
+    Returns:
+        dict: {delivery_id: ping}
+    """
+    latest = {}
+    for ping in pings:
+        current = latest.get(ping['delivery_id'])
+        if current is None or ping['ts'] >= current['ts']:
+            latest[ping['delivery_id']] = ping
+    return latest
+
+
+def apply_pings(pings):
+    """
+    Applique les positions en une seule requête UPDATE (executemany)
+
+    Un ping plus ancien que la dernière position enregistrée est ignoré.
+    Tous les pings valides sont ajoutés à l'historique des trajets.
+    La transaction n'est pas validée : l'appelant reste maître du commit.
+
+    Args:
+        pings: Pings normalisés
+
+    Returns:
+        tuple: (nombre de positions écrites, identifiants inconnus)
+    """
+    latest = latest_pings(pings)
+    if not latest:
+        return 0, []
+
+    table = DeliveryDB.__table__
+    known_ids = set(db.session.execute(
+        db.select(table.c.id).where(table.c.id.in_(list(latest)))
+    ).scalars())
+    unknown_ids = sorted(set(latest) - known_ids)
+
+    points_by_delivery = defaultdict(list)
+    for ping in pings:
+        if ping['delivery_id'] in known_ids:
+            points_by_delivery[ping['delivery_id']].append((to_epoch_ms(ping['ts']), ping['lat'], ping['lon']))
+    append_points(points_by_delivery)
+
+    rows = [
+        {'b_id': ping['delivery_id'], 'b_lat': ping['lat'], 'b_lon': ping['lon'], 'b_ts': ping['ts']}
+        for delivery_id, ping in latest.items() if delivery_id in known_ids
+    ]
+    if not rows:
+        return 0, unknown_ids
+
+    statement = table.update().where(
+        table.c.id == bindparam('b_id'),
+        or_(table.c.location_updated_at == None, table.c.location_updated_at <= bindparam('b_ts'))
+    ).values(
+        current_latitude=bindparam('b_lat'),
+        current_longitude=bindparam('b_lon'),
+        location_updated_at=bindparam('b_ts')
+    )
+    result = db.session.execute(statement, rows)
+
+    return result.rowcount, unknown_ids
@@ -0,0 +1,223 @@
+"""
+Instrumentation des requêtes : latences, requêtes SQL, commits
+
+Les mesures sont exposées au format texte Prometheus par GET /metrics et
+résumées dans l'en-tête Server-Timing de chaque réponse. Désactivée
+(METRICS_ENABLED = False), l'instrumentation n'installe aucun hook.
+"""
+from flask import g, request, has_request_context
+from app.database import db
+from app.location_buffer import location_buffer
+from sqlalchemy import event
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+
+class Histogram:
+    """Histogramme cumulatif Prometheus, par jeu de labels"""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, value, labels=()):
+        """Enregistre une valeur (appelant responsable du verrou)"""
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0, 0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self, label_names=()):
+        """Lignes au format texte Prometheus"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self._series.items()):
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels)]
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, count in zip(bounds, series[:-1]):
+                labels_text = ','.join(base + ['le="' + bound + '"'])
+                lines.append(f'{self.name}_bucket{{{labels_text}}} {count}')
+            suffix = '{' + ','.join(base) + '}' if base else ''
+            lines.append(f'{self.name}_count{suffix} {series[-2]}')
+            lines.append(f'{self.name}_sum{suffix} {series[-1]:.6f}')
+        return lines
+
+
+def _escape(value):
+    """Échappe une valeur de label Prometheus"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """Métriques agrégées du processus"""
+
+    REQUEST_LABELS = ('method', 'route', 'status')
+    ROUTE_LABELS = ('method', 'route')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = Histogram('http_request_duration_seconds',
+                                  'Durée des requêtes HTTP', LATENCY_BUCKETS)
+        self.statements = Histogram('http_request_sql_statements',
+                                    'Requêtes SQL émises par requête HTTP', STATEMENT_BUCKETS)
+        self.sql_time = Histogram('http_request_sql_duration_seconds',
+                                  'Temps passé dans SQLite par requête HTTP', LATENCY_BUCKETS)
+        self.commits = Histogram('db_commit_duration_seconds',
+                                 'Durée des commits (flush compris)', LATENCY_BUCKETS)
+
+    def request_started(self):
+        """Compte une requête en cours"""
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        """Décompte une requête terminée"""
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_request(self, method, route, status, duration, statements, sql_duration):
+        """Enregistre une requête HTTP terminée"""
+        with self._lock:
+            self.requests.observe(duration, (method, route, str(status)))
+            self.statements.observe(statements, (method, route))
+            self.sql_time.observe(sql_duration, (method, route))
+
+    def record_commit(self, duration):
+        """Enregistre la durée d'un commit"""
+        with self._lock:
+            self.commits.observe(duration)
+
+    def render(self):
+        """
+        Exporte les métriques au format texte Prometheus
+
+        Returns:
+            str: Exposition text/plain version 0.0.4
+        """
+        with self._lock:
+            lines = ['# HELP http_requests_in_flight Requêtes HTTP en cours',
+                     '# TYPE http_requests_in_flight gauge',
+                     f'http_requests_in_flight {self.in_flight}']
+            lines += self.requests.render(self.REQUEST_LABELS)
+            lines += self.statements.render(self.ROUTE_LABELS)
+            lines += self.sql_time.render(self.ROUTE_LABELS)
+            lines += self.commits.render()
+
+        buffer = location_buffer.stats()
+        lines += [
+            '# HELP location_buffer_depth Livraisons dont la position attend un flush',
+            '# TYPE location_buffer_depth gauge',
+            f"location_buffer_depth {buffer['depth']}",
+            '# HELP location_buffer_flush_seconds_total Temps cumulé des flush du tampon de positions',
+            '# TYPE location_buffer_flush_seconds_total counter',
+            f"location_buffer_flush_seconds_total {buffer['total_flush_ms'] / 1000:.6f}",
+            '# HELP location_buffer_pings_total Pings du tampon de positions par issue',
+            '# TYPE location_buffer_pings_total counter',
+            f'location_buffer_pings_total{{outcome="buffered"}} {buffer["buffered_pings"]}',
+            f'location_buffer_pings_total{{outcome="coalesced"}} {buffer["coalesced_pings"]}',
+            f'location_buffer_pings_total{{outcome="dropped"}} {buffer["dropped_pings"]}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def _before_request():
+    # Sur la requête elle-même : les opérations d'un POST /batch partagent g
+    request.environ['pizza.metrics_started'] = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+    request_metrics.request_started()
+
+
+def _record(method, route, status, started, state):
+    """Enregistre une requête terminée ; retourne (durée, requêtes SQL, temps SQL)"""
+    duration = time.perf_counter() - started
+    statements = getattr(state, 'sql_statements', 0)
+    sql_seconds = getattr(state, 'sql_seconds', 0.0)
+    request_metrics.record_request(method, route, status, duration, statements, sql_seconds)
+    return duration, statements, sql_seconds
+
+
+def _after_request(response):
+    started = request.environ.get('pizza.metrics_started')
+    if started is None:
+        return response
+
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    # Même objet g pendant la génération d'un flux (stream_with_context)
+    state = g._get_current_object()
+
+    if response.is_streamed:
+        # Le corps n'est pas encore généré : mesure à la fermeture du flux,
+        # sans Server-Timing (les en-têtes partent avant le corps)
+        method, status = request.method, response.status_code
+        response.call_on_close(lambda: _record(method, route, status, started, state))
+        return response
+
+    duration, statements, sql_seconds = _record(request.method, route, response.status_code, started, state)
+    response.headers.add('Server-Timing', f'app;dur={duration * 1000:.2f}')
+    response.headers.add('Server-Timing', f'db;dur={sql_seconds * 1000:.2f};desc="{statements} queries"')
+    return response
+
+
+def _teardown_request(exc):
+    if request.environ.pop('pizza.metrics_started', None) is not None:
+        request_metrics.request_finished()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_statements' in g:
+        conn.info['metrics_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_started', None)
+    if started is None or not has_request_context() or 'sql_statements' not in g:
+        return
+    g.sql_seconds += time.perf_counter() - started
+    if not statement.strip().upper().startswith('BEGIN'):
+        g.sql_statements += 1
+
+
+def _before_commit(session):
+    session.info['metrics_commit_started'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('metrics_commit_started', None)
+    if started is not None:
+        request_metrics.record_commit(time.perf_counter() - started)
+
+
+def init_metrics(app):
+    """
+    Installe l'instrumentation si METRICS_ENABLED est vrai
+
+    Args:
+        app: Instance de l'application Flask
+    """
+    if not app.config.get('METRICS_ENABLED'):
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    if not event.contains(db.session, 'before_commit', _before_commit):
+        event.listen(db.session, 'before_commit', _before_commit)
+        event.listen(db.session, 'after_commit', _after_commit)
@@ -2,14 +2,93 @@
 Modèles SQLAlchemy pour la persistance en base de données
 """
 from app.database import db
+from app.location_buffer import location_buffer
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
 import uuid
 import json
 
+# Garnitures déjà décodées, par pizza : {pizza_id: (texte JSON, liste)}
+_PARSED_TOPPINGS = {}
+_PARSED_TOPPINGS_MAX_SIZE = 10000
+
+
+def decode_toppings(pizza_id, toppings):
+    """
+    Décode le texte JSON des garnitures d'une pizza, une seule fois par pizza
+
+    Args:
+        pizza_id: Identifiant de la pizza (clé du cache)
+        toppings: Texte JSON stocké dans pizzas.toppings
+
+    Returns:
+        list: Noms des garnitures
+    """
+    if not toppings:
+        return []
+
+    cached = _PARSED_TOPPINGS.get(pizza_id)
+    if cached is None or cached[0] != toppings:
+        if len(_PARSED_TOPPINGS) >= _PARSED_TOPPINGS_MAX_SIZE:
+            _PARSED_TOPPINGS.clear()
+        cached = (toppings, tuple(json.loads(toppings)))
+        _PARSED_TOPPINGS[pizza_id] = cached
+
+    return list(cached[1])
+
+
+def pizza_document(pizza, include_id=True):
+    """
+    Document API d'une pizza
+
+    Args:
+        pizza: PizzaDB, ou ligne portant les mêmes colonnes (exports)
+        include_id: Inclure pizza_id (absent des pizzas d'une commande)
+
+    Returns:
+        dict: Document de la pizza
+    """
+    document = {'pizza_id': pizza.id} if include_id else {}
+    document.update({
+        'name': pizza.name,
+        'size': pizza.size,
+        'price': pizza.price_amount,
+        'currency': pizza.price_currency,
+        'toppings': decode_toppings(pizza.id, pizza.toppings)
+    })
+    return document
+
+
+def order_document(order):
+    """
+    Document API d'une commande, sans ses pizzas
+
+    Args:
+        order: OrderDB, ou ligne portant les mêmes colonnes (exports)
+
+    Returns:
+        dict: Document de la commande
+    """
+    return {
+        'order_id': order.id,
+        'customer_name': order.customer_name,
+        'customer_address': order.customer_address,
+        'status': order.status,
+        'created_at': order.created_at.isoformat(),
+        'total': round(order.total_amount or 0, 2),
+        'currency': order.currency or 'EUR',
+        'item_count': order.item_count or 0,
+        'is_valid': (order.item_count or 0) > 0
+    }
+
 
 class PizzaDB(db.Model):
     """Modèle de base de données pour Pizza"""
     __tablename__ = 'pizzas'
+    __table_args__ = (
+        db.Index('ix_pizzas_created_at_id', 'created_at', 'id'),
+        db.Index('ix_pizzas_catalog', 'in_catalog', 'name', 'size'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(100), nullable=False)
@@ -17,38 +96,117 @@ class PizzaDB(db.Model):
     price_amount = db.Column(db.Float, nullable=False)
     price_currency = db.Column(db.String(3), default='EUR')
     toppings = db.Column(db.Text, default='[]')  # Stocké en JSON
+    in_catalog = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relation avec les commandes (many-to-many)
     orders = db.relationship('OrderPizzaDB', back_populates='pizza', cascade='all, delete-orphan')
 
+    # Garnitures normalisées (filtrage indexé)
+    topping_links = db.relationship('PizzaToppingDB', back_populates='pizza', cascade='all, delete-orphan')
+
+    def get_toppings(self):
+        """
+        Retourne la liste des garnitures, décodée une seule fois par pizza
+
+        Returns:
+            list: Noms des garnitures
+        """
+        return decode_toppings(self.id, self.toppings)
+
+    def set_toppings(self, names):
+        """
+        Définit les garnitures (texte JSON et table normalisée)
+
+        Args:
+            names: Liste des noms de garnitures
+        """
+        self.toppings = json.dumps(names)
+        self.topping_links = [
+            PizzaToppingDB(topping=topping)
+            for topping in ToppingDB.get_or_create_many(names)
+        ]
+
     def to_dict(self):
         """Convertit le modèle DB en dictionnaire"""
-        return {
-            'pizza_id': self.id,
-            'name': self.name,
-            'size': self.size,
-            'price': self.price_amount,
-            'currency': self.price_currency,
-            'toppings': json.loads(self.toppings) if self.toppings else []
-        }
+        return pizza_document(self)
 
     @staticmethod
     def from_pizza_object(pizza, pizza_id=None):
         """Crée un PizzaDB à partir d'un objet Pizza"""
-        return PizzaDB(
+        pizza_db = PizzaDB(
             id=pizza_id or str(uuid.uuid4()),
             name=pizza.name,
             size=pizza.size,
             price_amount=pizza.price.amount,
-            price_currency=pizza.price.currency,
-            toppings=json.dumps(pizza.toppings)
+            price_currency=pizza.price.currency
         )
+        pizza_db.set_toppings(pizza.toppings)
+        return pizza_db
+
+
+class ToppingDB(db.Model):
+    """Modèle de base de données pour une garniture"""
+    __tablename__ = 'toppings'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100, collation='NOCASE'), nullable=False, unique=True)
+
+    @staticmethod
+    def get_or_create_many(names):
+        """
+        Retourne les garnitures correspondant aux noms, en créant les manquantes
+
+        Args:
+            names: Liste des noms (les doublons sont ignorés)
+
+        Returns:
+            list: ToppingDB dans l'ordre des noms
+        """
+        unique_names = list(dict.fromkeys(names))
+        if not unique_names:
+            return []
+
+        existing = {
+            topping.name.lower(): topping
+            for topping in ToppingDB.query.filter(ToppingDB.name.in_(unique_names)).all()
+        }
+
+        toppings = []
+        for name in unique_names:
+            topping = existing.get(name.lower())
+            if topping is None:
+                topping = ToppingDB(name=name)
+                db.session.add(topping)
+                existing[name.lower()] = topping
+            if topping not in toppings:
+                toppings.append(topping)
+
+        return toppings
+
+
+class PizzaToppingDB(db.Model):
+    """Table de liaison entre Pizza et Topping (many-to-many)"""
+    __tablename__ = 'pizza_toppings'
+    __table_args__ = (
+        db.Index('ix_pizza_toppings_topping_id', 'topping_id', 'pizza_id'),
+    )
+
+    pizza_id = db.Column(db.String(36), db.ForeignKey('pizzas.id'), primary_key=True)
+    topping_id = db.Column(db.Integer, db.ForeignKey('toppings.id'), primary_key=True)
+
+    # Relations
+    pizza = db.relationship('PizzaDB', back_populates='topping_links')
+    topping = db.relationship('ToppingDB')
 
 
 class OrderDB(db.Model):
     """Modèle de base de données pour Order"""
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created_at', 'status', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     customer_name = db.Column(db.String(100), nullable=False)
@@ -57,41 +215,134 @@ class OrderDB(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Totaux dénormalisés, maintenus par add_pizza() / remove_pizza()
+    total_amount = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    currency = db.Column(db.String(3), nullable=False, default='EUR', server_default='EUR')
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     # Relations
     pizzas = db.relationship('OrderPizzaDB', back_populates='order', cascade='all, delete-orphan')
     delivery = db.relationship('DeliveryDB', back_populates='order', uselist=False, cascade='all, delete-orphan')
 
+    @staticmethod
+    def eager_options(include_pizzas=True):
+        """Options de chargement anticipé des relations utilisées par to_dict()"""
+        if not include_pizzas:
+            return ()
+        return (
+            selectinload(OrderDB.pizzas).joinedload(OrderPizzaDB.pizza),
+        )
+
     def to_dict(self, include_pizzas=True):
         """Convertit le modèle DB en dictionnaire"""
-        from app.models import Pizza, Price, Order
-
-        result = {
-            'order_id': self.id,
-            'customer_name': self.customer_name,
-            'customer_address': self.customer_address,
-            'status': self.status,
-            'created_at': self.created_at.isoformat()
-        }
+        result = order_document(self)
 
         if include_pizzas:
-            pizzas_list = []
-            total_amount = 0
-            currency = 'EUR'
-
-            for order_pizza in self.pizzas:
-                pizza_dict = order_pizza.pizza.to_dict()
-                del pizza_dict['pizza_id']  # Enlever l'ID pour la compatibilité
-                pizzas_list.append(pizza_dict)
-                total_amount += order_pizza.pizza.price_amount
-                currency = order_pizza.pizza.price_currency
-
-            result['pizzas'] = pizzas_list
-            result['total'] = round(total_amount, 2)
-            result['currency'] = currency
-            result['is_valid'] = len(pizzas_list) > 0
+            # Sans pizza_id, pour la compatibilité
+            result['pizzas'] = [pizza_document(order_pizza.pizza, include_id=False)
+                                for order_pizza in self.pizzas]
 
         return result
 
+    def add_pizza(self, pizza):
+        """
+        Ajoute une pizza à la commande et met à jour les totaux dénormalisés
+
+        Args:
+            pizza: PizzaDB à ajouter
+
+        Returns:
+            OrderPizzaDB: La ligne de commande créée (ajoutée à la session)
+        """
+        order_pizza = OrderPizzaDB(order_id=self.id, pizza_id=pizza.id)
+        db.session.add(order_pizza)
+
+        self.total_amount = round((self.total_amount or 0) + pizza.price_amount, 2)
+        self.currency = pizza.price_currency
+        self.item_count = (self.item_count or 0) + 1
+
+        return order_pizza
+
+    def add_pizzas(self, pizzas):
+        """
+        Ajoute plusieurs pizzas en une seule insertion groupée
+
+        La commande doit déjà être flushée (id connu). Les totaux sont
+        mis à jour comme par des appels successifs à add_pizza().
+
+        Args:
+            pizzas: Liste de PizzaDB (une ligne de commande par élément)
+        """
+        if not pizzas:
+            return
+
+        db.session.execute(
+            db.insert(OrderPizzaDB),
+            [{'order_id': self.id, 'pizza_id': pizza.id} for pizza in pizzas]
+        )
+
+        self.total_amount = round((self.total_amount or 0) + sum(pizza.price_amount for pizza in pizzas), 2)
+        self.currency = pizzas[-1].price_currency
+        self.item_count = (self.item_count or 0) + len(pizzas)
+
+    def remove_pizza(self, order_pizza):
+        """
+        Retire une ligne de la commande et met à jour les totaux dénormalisés
+
+        La devise redevient celle de la dernière ligne restante, comme dans
+        recompute_totals().
+
+        Args:
+            order_pizza: OrderPizzaDB à supprimer
+        """
+        db.session.delete(order_pizza)
+
+        self.item_count = max((self.item_count or 0) - 1, 0)
+        if self.item_count == 0:
+            self.total_amount = 0
+            self.currency = 'EUR'
+        else:
+            self.total_amount = round((self.total_amount or 0) - order_pizza.pizza.price_amount, 2)
+            self.currency = db.session.scalar(
+                db.select(PizzaDB.price_currency)
+                .join(OrderPizzaDB, OrderPizzaDB.pizza_id == PizzaDB.id)
+                .where(OrderPizzaDB.order_id == self.id, OrderPizzaDB.id != order_pizza.id)
+                .order_by(OrderPizzaDB.id.desc()).limit(1)
+            ) or 'EUR'
+
+    @staticmethod
+    def recompute_totals():
+        """
+        Recalcule en masse les totaux dénormalisés de toutes les commandes
+
+        Une seule requête UPDATE avec sous-requêtes corrélées, sans charger
+        les commandes en mémoire.
+
+        Returns:
+            int: Nombre de commandes mises à jour
+        """
+        lines = (
+            db.select(OrderPizzaDB.id)
+            .join(PizzaDB, OrderPizzaDB.pizza_id == PizzaDB.id)
+            .where(OrderPizzaDB.order_id == OrderDB.id)
+        )
+
+        result = db.session.execute(
+            db.update(OrderDB).values(
+                item_count=lines.with_only_columns(db.func.count(OrderPizzaDB.id)).scalar_subquery(),
+                total_amount=db.func.round(db.func.coalesce(
+                    lines.with_only_columns(db.func.sum(PizzaDB.price_amount)).scalar_subquery(), 0
+                ), 2),
+                currency=db.func.coalesce(
+                    lines.with_only_columns(PizzaDB.price_currency)
+                    .order_by(OrderPizzaDB.id.desc()).limit(1).scalar_subquery(), 'EUR'
+                )
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        return result.rowcount
+
     @staticmethod
     def from_order_object(order):
         """Crée un OrderDB à partir d'un objet Order"""
@@ -109,8 +360,8 @@ class OrderPizzaDB(db.Model):
     __tablename__ = 'order_pizzas'
 
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), nullable=False)
-    pizza_id = db.Column(db.String(36), db.ForeignKey('pizzas.id'), nullable=False)
+    order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), nullable=False, index=True)
+    pizza_id = db.Column(db.String(36), db.ForeignKey('pizzas.id'), nullable=False, index=True)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relations
@@ -121,6 +372,11 @@ class OrderPizzaDB(db.Model):
 class DeliveryDB(db.Model):
     """Modèle de base de données pour Delivery"""
     __tablename__ = 'deliveries'
+    __table_args__ = (
+        db.Index('ix_deliveries_created_at_id', 'created_at', 'id'),
+        db.Index('ix_deliveries_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_deliveries_driver_status_created_at', 'driver_name', 'status', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     order_id = db.Column(db.String(36), db.ForeignKey('orders.id'), nullable=False, unique=True)
@@ -130,26 +386,53 @@ class DeliveryDB(db.Model):
     completed_at = db.Column(db.DateTime, nullable=True)
     current_latitude = db.Column(db.Float, nullable=True)
     current_longitude = db.Column(db.Float, nullable=True)
+    location_updated_at = db.Column(db.DateTime, nullable=True)
+    destination_latitude = db.Column(db.Float, nullable=True)
+    destination_longitude = db.Column(db.Float, nullable=True)
     cancellation_reason = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relation
     order = db.relationship('OrderDB', back_populates='delivery')
 
-    def to_dict(self):
+    @staticmethod
+    def eager_options(include_order=True, include_pizzas=True):
+        """Options de chargement anticipé des relations utilisées par to_dict()"""
+        if not include_order:
+            return ()
+        if not include_pizzas:
+            return (joinedload(DeliveryDB.order),)
+        return (
+            joinedload(DeliveryDB.order)
+            .selectinload(OrderDB.pizzas)
+            .joinedload(OrderPizzaDB.pizza),
+        )
+
+    def to_dict(self, include_order=True, include_pizzas=True):
         """Convertit le modèle DB en dictionnaire"""
-        return {
+        result = {
             'delivery_id': self.id,
-            'order': self.order.to_dict() if self.order else None,
+            'order_id': self.order_id,
             'driver_name': self.driver_name,
             'status': self.status,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'current_latitude': self.current_latitude,
             'current_longitude': self.current_longitude,
+            'location_updated_at': self.location_updated_at.isoformat() if self.location_updated_at else None,
+            'destination_latitude': self.destination_latitude,
+            'destination_longitude': self.destination_longitude,
             'cancellation_reason': self.cancellation_reason
         }
 
+        # Position plus récente en attente dans le tampon d'écriture différée
+        location_buffer.overlay(result)
+
+        if include_order:
+            result['order'] = self.order.to_dict(include_pizzas=include_pizzas) if self.order else None
+
+        return result
+
     @staticmethod
     def from_delivery_object(delivery):
         """Crée un DeliveryDB à partir d'un objet Delivery"""
@@ -162,6 +445,56 @@ class DeliveryDB(db.Model):
             completed_at=delivery.completed_at,
             current_latitude=delivery.current_latitude,
             current_longitude=delivery.current_longitude,
+            destination_latitude=delivery.destination_latitude,
+            destination_longitude=delivery.destination_longitude,
             cancellation_reason=delivery.cancellation_reason
         )
 
+
+class DeliveryTrackChunkDB(db.Model):
+    """Bloc compact de l'historique des positions d'une livraison"""
+    __tablename__ = 'delivery_track_chunks'
+    __table_args__ = (
+        db.Index('ix_delivery_track_chunks_delivery_start', 'delivery_id', 'start_ts'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    delivery_id = db.Column(db.String(36), db.ForeignKey('deliveries.id'), nullable=False)
+    start_ts = db.Column(db.BigInteger, nullable=False)  # ms depuis l'epoch (UTC)
+    end_ts = db.Column(db.BigInteger, nullable=False)  # ms depuis l'epoch (UTC)
+    point_count = db.Column(db.Integer, nullable=False, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)  # int32 petit-boutiste : (dt ms, lat e6, lon e6)
+
+
+class SalesRollupDB(db.Model):
+    """Agrégat des ventes par heure ou par jour (date de création des commandes, UTC)"""
+    __tablename__ = 'sales_rollups'
+
+    granularity = db.Column(db.String(4), primary_key=True)  # 'hour' ou 'day'
+    bucket = db.Column(db.DateTime, primary_key=True)  # début de l'heure ou du jour
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class PizzaSalesRollupDB(db.Model):
+    """Pizzas vendues par heure ou par jour, par nom et taille"""
+    __tablename__ = 'pizza_sales_rollups'
+
+    granularity = db.Column(db.String(4), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    pizza_name = db.Column(db.String(100), primary_key=True)
+    size = db.Column(db.String(20), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class CatalogVersionDB(db.Model):
+    """Tampon de version du catalogue partagé entre les processus"""
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String(36), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -2,8 +2,13 @@
 Classe Delivery pour représenter une livraison
 """
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
+from .geo import haversine_km
+
+# Estimation sans historique (voir app.eta pour le profil appris)
+DEFAULT_SPEED_KMH = 20.0
+DEFAULT_DURATION_SECONDS = 30 * 60
 
 
 class Delivery:
@@ -25,6 +30,8 @@ class Delivery:
         self.completed_at: Optional[datetime] = None
         self.current_latitude: Optional[float] = None
         self.current_longitude: Optional[float] = None
+        self.destination_latitude: Optional[float] = None
+        self.destination_longitude: Optional[float] = None
         self.cancellation_reason: Optional[str] = None
     
     def start_delivery(self) -> None:
@@ -44,7 +51,7 @@ class Delivery:
             raise ValueError("Cannot start a cancelled delivery")
         
         self.status = "in_transit"
-        self.started_at = datetime.now()
+        self.started_at = datetime.utcnow()
     
     def complete_delivery(self) -> None:
         """
@@ -57,7 +64,7 @@ class Delivery:
             raise ValueError("Delivery must be started before it can be completed")
         
         self.status = "delivered"
-        self.completed_at = datetime.now()
+        self.completed_at = datetime.utcnow()
     
     def calculate_duration(self) -> Optional[float]:
         """
@@ -83,6 +90,17 @@ class Delivery:
         self.current_latitude = latitude
         self.current_longitude = longitude
     
+    def set_destination(self, latitude: float, longitude: float) -> None:
+        """
+        Définit les coordonnées de l'adresse de livraison
+        
+        Args:
+            latitude: Latitude de la destination
+            longitude: Longitude de la destination
+        """
+        self.destination_latitude = latitude
+        self.destination_longitude = longitude
+    
     def cancel_delivery(self, reason: str) -> None:
         """
         Annule la livraison
@@ -93,16 +111,32 @@ class Delivery:
         self.status = "cancelled"
         self.cancellation_reason = reason
     
-    def get_estimated_time(self) -> int:
+    def get_estimated_time(self, now: Optional[datetime] = None) -> int:
         """
-        Calcule le temps estimé de livraison en minutes
+        Calcule le temps restant estimé de livraison en minutes
+        
+        Distance entre la position actuelle et la destination à
+        DEFAULT_SPEED_KMH si elles sont connues, sinon DEFAULT_DURATION_SECONDS
+        depuis le démarrage. L'ETA apprise sur l'historique est calculée par
+        app.eta.
+        
+        Args:
+            now: Heure du calcul, UTC naïf comme les dates de la livraison (par défaut maintenant)
         
         Returns:
-            Temps estimé en minutes (par défaut 30 minutes)
+            Temps estimé en minutes (au moins 1 tant que la livraison n'est pas terminée, 0 ensuite)
         """
-        # Implémentation simple : retourne un temps estimé fixe
-        # Dans une vraie application, cela pourrait être basé sur la distance, le trafic, etc.
-        return 30
+        if self.status in ("delivered", "cancelled"):
+            return 0
+        
+        now = now or datetime.utcnow()
+        if self.current_latitude is not None and self.destination_latitude is not None:
+            distance = haversine_km(self.current_latitude, self.current_longitude,
+                                    self.destination_latitude, self.destination_longitude)
+            return max(1, round(distance / DEFAULT_SPEED_KMH * 60))
+        
+        arrival = (self.started_at or now) + timedelta(seconds=DEFAULT_DURATION_SECONDS)
+        return max(1, round((arrival - now).total_seconds() / 60))
     
     def to_dict(self) -> dict:
         """
@@ -120,5 +154,7 @@ class Delivery:
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
             "current_latitude": self.current_latitude,
             "current_longitude": self.current_longitude,
+            "destination_latitude": self.destination_latitude,
+            "destination_longitude": self.destination_longitude,
             "cancellation_reason": self.cancellation_reason
         }
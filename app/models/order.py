@@ -25,7 +25,7 @@ class Order:
         self.customer_address = customer_address
         self.status = "pending"
         self.pizzas: List = []
-        self.created_at = datetime.now()
+        self.created_at = datetime.utcnow()
     
     def add_pizza(self, pizza) -> None:
         """
@@ -0,0 +1,107 @@
+"""
+Pagination par curseur (keyset) pour les endpoints de listing
+"""
+from sqlalchemy import tuple_
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def encode_cursor(created_at, row_id):
+    """
+    Encode la position (created_at, id) d'une ligne en curseur opaque
+
+    Args:
+        created_at: Date de création de la dernière ligne renvoyée
+        row_id: Identifiant de la dernière ligne renvoyée
+
+    Returns:
+        str: Curseur encodé en base64 (URL-safe)
+    """
+    payload = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Décode un curseur opaque
+
+    Args:
+        cursor: Curseur produit par encode_cursor
+
+    Returns:
+        tuple: (created_at, id)
+
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        created_at, row_id = json.loads(payload)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_limit(value):
+    """
+    Valide le paramètre limit
+
+    Args:
+        value: Valeur brute du paramètre (ou None)
+
+    Returns:
+        int: Limite comprise entre 1 et MAX_LIMIT
+
+    Raises:
+        ValueError: Si la valeur n'est pas un entier positif
+    """
+    if value is None:
+        return DEFAULT_LIMIT
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+
+    return min(limit, MAX_LIMIT)
+
+
+def paginate(query, model, limit, cursor=None):
+    """
+    Applique la pagination keyset (created_at, id) à une requête
+
+    La requête est triée sur l'index (created_at, id) : la page N coûte
+    autant que la page 1 et seules limit + 1 lignes sont chargées.
+
+    Args:
+        query: Requête SQLAlchemy sur le modèle
+        model: Modèle possédant les colonnes created_at et id
+        limit: Nombre maximum de lignes de la page
+        cursor: Curseur de la page précédente (ou None pour la première page)
+
+    Returns:
+        tuple: (lignes de la page, curseur suivant ou None)
+
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) > tuple_(created_at, row_id))
+
+    rows = query.order_by(model.created_at, model.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
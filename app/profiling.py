@@ -0,0 +1,232 @@
+"""
+Profilage à la demande des requêtes
+
+Une requête portant l'en-tête X-Profile (ou le paramètre _profile=) égal à
+PROFILING_TOKEN est exécutée sous cProfile ; avec PROFILE_SAMPLE_RATE = N,
+une requête sur N est profilée automatiquement. Chaque profil est écrit dans
+PROFILE_DIR :
+
+- <id>.prof   : statistiques cProfile (pstats, snakeviz, flameprof...)
+- <id>.folded : piles échantillonnées toutes les millisecondes, au format
+                « pile;repliée nombre » de flamegraph.pl / speedscope
+- <id>.json   : métadonnées et fonctions les plus coûteuses
+"""
+from flask import request
+from collections import Counter
+from datetime import datetime
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+SAMPLE_INTERVAL = 0.001
+TOP_FUNCTIONS = 25
+
+
+class StackSampler:
+    """Échantillonne la pile d'un thread depuis un thread secondaire"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        """Démarre l'échantillonnage"""
+        self._thread.start()
+
+    def stop(self):
+        """Arrête l'échantillonnage et attend le thread"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        """Boucle d'échantillonnage : une pile par intervalle"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def folded(self):
+        """Piles au format « a;b;c nombre », une par ligne"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Décide quelles requêtes profiler et enregistre leurs profils"""
+
+    def __init__(self, directory, token=None, sample_rate=0, max_profiles=200):
+        """
+        Args:
+            directory: Répertoire des profils
+            token: Jeton administrateur (profilage à la demande et listing)
+            sample_rate: Profiler une requête sur N (0 : désactivé)
+            max_profiles: Nombre de profils conservés (les plus anciens sont supprimés)
+        """
+        self.directory = directory
+        self.token = token
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def is_admin(self, value):
+        """Vérifie un jeton administrateur"""
+        return bool(self.token) and value is not None and hmac.compare_digest(str(value), self.token)
+
+    def should_profile(self):
+        """
+        Indique pourquoi profiler la requête courante
+
+        Returns:
+            str: 'requested', 'sampled' ou None
+        """
+        if self.is_admin(request.headers.get('X-Profile') or request.args.get('_profile')):
+            return 'requested'
+        if self.sample_rate and next(self._counter) % self.sample_rate == 0:
+            return 'sampled'
+        return None
+
+    def save(self, profiler, sampler, trigger, status, duration):
+        """
+        Écrit le profil d'une requête terminée
+
+        Returns:
+            str: Identifiant du profil
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        created_at = datetime.utcnow()
+        profile_id = f"{created_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        base = os.path.join(self.directory, profile_id)
+
+        profiler.dump_stats(base + '.prof')
+        with open(base + '.folded', 'w') as f:
+            f.write(sampler.folded())
+
+        stats = pstats.Stats(profiler)
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        metadata = {
+            'profile_id': profile_id,
+            'created_at': created_at.isoformat(),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'route': request.url_rule.rule if request.url_rule is not None else None,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'trigger': trigger,
+            'samples': sum(sampler.stacks.values()),
+            'top_functions': [
+                {
+                    'function': f'{name} ({os.path.basename(filename)}:{line})',
+                    'calls': calls,
+                    'own_ms': round(own * 1000, 3),
+                    'cumulative_ms': round(cumulative * 1000, 3)
+                }
+                for (filename, line, name), (_, calls, own, cumulative, _) in top
+            ]
+        }
+        with open(base + '.json', 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+        self._prune()
+        return profile_id
+
+    def list_profiles(self):
+        """
+        Retourne les métadonnées des profils, du plus récent au plus ancien
+
+        Returns:
+            list: Métadonnées sans le détail des fonctions
+        """
+        profiles = []
+        for name in self._profile_files():
+            with open(os.path.join(self.directory, name)) as f:
+                metadata = json.load(f)
+            metadata.pop('top_functions', None)
+            profiles.append(metadata)
+        return profiles
+
+    def _profile_files(self):
+        """Fichiers de métadonnées, du plus récent au plus ancien"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if name.endswith('.json')), reverse=True)
+
+    def _prune(self):
+        """Supprime les profils au-delà de max_profiles"""
+        with self._lock:
+            for name in self._profile_files()[self.max_profiles:]:
+                base = os.path.join(self.directory, name[:-len('.json')])
+                for extension in ('.json', '.prof', '.folded'):
+                    if os.path.exists(base + extension):
+                        os.remove(base + extension)
+
+
+def _before_request():
+    profiler = request_profiler()
+    trigger = profiler.should_profile()
+    if trigger is None:
+        return
+
+    sampler = StackSampler(threading.get_ident())
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Un autre profileur est déjà actif dans ce thread
+        return
+    sampler.start()
+    request.environ['pizza.profile'] = (profile, sampler, trigger, time.perf_counter())
+
+
+def _after_request(response):
+    state = request.environ.pop('pizza.profile', None)
+    if state is None:
+        return response
+
+    profile, sampler, trigger, started = state
+    profile.disable()
+    sampler.stop()
+    profile_id = request_profiler().save(profile, sampler, trigger, response.status_code,
+                                         time.perf_counter() - started)
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+def request_profiler():
+    """Profileur de l'application courante"""
+    from flask import current_app
+    return current_app.extensions['request_profiler']
+
+
+def init_profiling(app):
+    """
+    Installe le profilage si PROFILING_TOKEN ou PROFILE_SAMPLE_RATE est défini
+
+    Args:
+        app: Instance de l'application Flask
+    """
+    app.extensions['request_profiler'] = RequestProfiler(
+        app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles'),
+        token=app.config.get('PROFILING_TOKEN'),
+        sample_rate=app.config.get('PROFILE_SAMPLE_RATE', 0),
+        max_profiles=app.config.get('PROFILE_MAX_FILES', 200)
+    )
+
+    if app.config.get('PROFILING_TOKEN') or app.config.get('PROFILE_SAMPLE_RATE'):
+        app.before_request(_before_request)
+        app.after_request(_after_request)
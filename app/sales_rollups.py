@@ -0,0 +1,273 @@
+"""
+Agrégats des ventes par heure et par jour (tables sales_rollups et pizza_sales_rollups)
+
+Une commande compte dans le créneau de sa date de création (UTC) :
+
+- confirmée (statut autre que pending et cancelled) : commandes, chiffre
+  d'affaires, pizzas vendues par nom et taille ;
+- annulée : annulations et montant annulé ;
+- pending (panier en cours) : rien.
+
+Les endpoints qui changent le statut ou le contenu d'une commande appellent
+record_sales() dans leur transaction, avec la contribution relevée avant la
+modification (sales_snapshot) : seul l'écart est appliqué aux agrégats, par
+upsert. rebuild_sales_rollups() recalcule tout en masse (INSERT ... SELECT).
+"""
+from app.database import db
+from app.models.db_models import OrderDB, OrderPizzaDB, PizzaDB, SalesRollupDB, PizzaSalesRollupDB
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import namedtuple
+
+GRANULARITIES = ('hour', 'day')
+
+SALES_METRICS = ('order_count', 'revenue', 'item_count', 'cancelled_count', 'cancelled_revenue')
+PIZZA_METRICS = ('quantity', 'revenue')
+
+# Format de stockage des DateTime SQLAlchemy sous SQLite
+BUCKET_FORMATS = {
+    'hour': '%Y-%m-%d %H:00:00.000000',
+    'day': '%Y-%m-%d 00:00:00.000000'
+}
+
+# Contribution d'une commande aux agrégats
+OrderSales = namedtuple('OrderSales', ['created_at', 'status', 'total', 'item_count', 'pizzas'])
+
+# Totaux d'une période, sous la forme d'une ligne d'agrégat
+_Totals = namedtuple('_Totals', SALES_METRICS)
+
+
+def bucket_start(moment, granularity):
+    """Début de l'heure ou du jour contenant moment"""
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def is_placed(status):
+    """Indique si une commande de ce statut compte dans le chiffre d'affaires"""
+    return status not in (None, 'pending', 'cancelled')
+
+
+def sales_snapshot(order_db):
+    """
+    Relève la contribution actuelle d'une commande aux agrégats
+
+    Les pizzas ne sont lues (une requête groupée) que pour une commande
+    confirmée.
+
+    Args:
+        order_db: OrderDB (ou None pour une commande qui n'existait pas)
+
+    Returns:
+        OrderSales: Contribution, ou None
+    """
+    if order_db is None or order_db.created_at is None:
+        return None
+
+    pizzas = {}
+    if is_placed(order_db.status):
+        rows = db.session.execute(
+            db.select(PizzaDB.name, PizzaDB.size, db.func.count(), db.func.sum(PizzaDB.price_amount))
+            .join(OrderPizzaDB, OrderPizzaDB.pizza_id == PizzaDB.id)
+            .where(OrderPizzaDB.order_id == order_db.id)
+            .group_by(PizzaDB.name, PizzaDB.size)
+        )
+        pizzas = {(name, size): (quantity, revenue) for name, size, quantity, revenue in rows}
+
+    return OrderSales(order_db.created_at, order_db.status, order_db.total_amount or 0,
+                      order_db.item_count or 0, pizzas)
+
+
+def _contribution(sales, sign):
+    """Lignes d'agrégats (clé -> métriques) d'une contribution, au signe près"""
+    totals = {}
+    pizzas = {}
+    if sales is None:
+        return totals, pizzas
+
+    for granularity in GRANULARITIES:
+        bucket = bucket_start(sales.created_at, granularity)
+        if is_placed(sales.status):
+            totals[(granularity, bucket)] = (sign, sign * sales.total, sign * sales.item_count, 0, 0)
+            for (name, size), (quantity, revenue) in sales.pizzas.items():
+                pizzas[(granularity, bucket, name, size)] = (sign * quantity, sign * revenue)
+        elif sales.status == 'cancelled':
+            totals[(granularity, bucket)] = (0, 0, 0, sign, sign * sales.total)
+
+    return totals, pizzas
+
+
+def _merge(first, second):
+    """Additionne deux ensembles de lignes et retire les écarts nuls"""
+    merged = dict(first)
+    for key, values in second.items():
+        if key in merged:
+            values = tuple(a + b for a, b in zip(merged[key], values))
+        merged[key] = values
+    return {key: values for key, values in merged.items() if any(round(v, 6) for v in values)}
+
+
+def _upsert(model, key_columns, metrics, rows):
+    """Ajoute les écarts aux agrégats existants (INSERT ... ON CONFLICT DO UPDATE)"""
+    if not rows:
+        return
+
+    table = model.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={metric: table.c[metric] + statement.excluded[metric] for metric in metrics}
+    )
+    db.session.execute(statement, [
+        {**dict(zip(key_columns, key)), **dict(zip(metrics, values))}
+        for key, values in rows.items()
+    ])
+
+
+def record_sales(before, order_db):
+    """
+    Applique aux agrégats l'écart entre deux contributions d'une commande
+
+    Doit être appelée dans la transaction qui modifie la commande, après
+    la modification (les lignes ajoutées doivent être visibles en base).
+
+    Args:
+        before: Contribution relevée par sales_snapshot() avant la modification
+        order_db: Commande modifiée
+    """
+    after = sales_snapshot(order_db)
+    if before == after:
+        return
+
+    old_totals, old_pizzas = _contribution(before, -1)
+    new_totals, new_pizzas = _contribution(after, 1)
+
+    _upsert(SalesRollupDB, ('granularity', 'bucket'), SALES_METRICS,
+            _merge(old_totals, new_totals))
+    _upsert(PizzaSalesRollupDB, ('granularity', 'bucket', 'pizza_name', 'size'), PIZZA_METRICS,
+            _merge(old_pizzas, new_pizzas))
+
+
+def rebuild_sales_rollups():
+    """
+    Recalcule tous les agrégats depuis les commandes, en masse
+
+    Les agrégats horaires sont calculés par INSERT ... SELECT sur les
+    commandes, les agrégats journaliers à partir des horaires.
+
+    Returns:
+        dict: Nombre de lignes d'agrégats par table
+    """
+    db.session.execute(db.delete(PizzaSalesRollupDB))
+    db.session.execute(db.delete(SalesRollupDB))
+
+    placed = OrderDB.status.notin_(('pending', 'cancelled'))
+    cancelled = OrderDB.status == 'cancelled'
+    hour = db.func.strftime(BUCKET_FORMATS['hour'], OrderDB.created_at)
+
+    db.session.execute(db.insert(SalesRollupDB).from_select(
+        ('granularity', 'bucket') + SALES_METRICS,
+        db.select(
+            db.literal('hour'), hour,
+            db.func.sum(db.case((placed, 1), else_=0)),
+            db.func.sum(db.case((placed, OrderDB.total_amount), else_=0)),
+            db.func.sum(db.case((placed, OrderDB.item_count), else_=0)),
+            db.func.sum(db.case((cancelled, 1), else_=0)),
+            db.func.sum(db.case((cancelled, OrderDB.total_amount), else_=0))
+        ).where(OrderDB.status != 'pending').group_by(hour)
+    ))
+
+    db.session.execute(db.insert(PizzaSalesRollupDB).from_select(
+        ('granularity', 'bucket', 'pizza_name', 'size') + PIZZA_METRICS,
+        db.select(
+            db.literal('hour'), hour, PizzaDB.name, PizzaDB.size,
+            db.func.count(), db.func.sum(PizzaDB.price_amount)
+        ).select_from(OrderPizzaDB)
+        .join(OrderDB, OrderDB.id == OrderPizzaDB.order_id)
+        .join(PizzaDB, PizzaDB.id == OrderPizzaDB.pizza_id)
+        .where(placed)
+        .group_by(hour, PizzaDB.name, PizzaDB.size)
+    ))
+
+    for model, keys, metrics in ((SalesRollupDB, (), SALES_METRICS),
+                                 (PizzaSalesRollupDB, ('pizza_name', 'size'), PIZZA_METRICS)):
+        day = db.func.substr(model.bucket, 1, 10).concat(' 00:00:00.000000')
+        key_columns = [getattr(model, key) for key in keys]
+        db.session.execute(db.insert(model).from_select(
+            ('granularity', 'bucket') + keys + metrics,
+            db.select(
+                db.literal('day'), day, *key_columns,
+                *(db.func.sum(getattr(model, metric)) for metric in metrics)
+            ).where(model.granularity == 'hour').group_by(day, *key_columns)
+        ))
+
+    db.session.commit()
+
+    return {
+        'sales_rollups': db.session.query(SalesRollupDB).count(),
+        'pizza_sales_rollups': db.session.query(PizzaSalesRollupDB).count()
+    }
+
+
+def revenue_report(granularity, start, end):
+    """
+    Lit les agrégats des créneaux commençant dans [début du créneau de start, end)
+
+    Args:
+        granularity: 'hour' ou 'day'
+        start: Début de la période
+        end: Fin de la période (exclue)
+
+    Returns:
+        dict: Créneaux non vides, totaux et ventes par pizza sur la période
+    """
+    window = (
+        SalesRollupDB.granularity == granularity,
+        SalesRollupDB.bucket >= bucket_start(start, granularity),
+        SalesRollupDB.bucket < end
+    )
+    rows = db.session.execute(
+        db.select(SalesRollupDB.bucket, *(getattr(SalesRollupDB, metric) for metric in SALES_METRICS))
+        .where(*window)
+        .order_by(SalesRollupDB.bucket)
+    ).all()
+
+    buckets = [
+        _sales_document({'bucket': row.bucket.isoformat()}, row)
+        for row in rows
+        if row.order_count or row.cancelled_count
+    ]
+    totals = _sales_document({}, _Totals(
+        *(sum(getattr(row, metric) for row in rows) for metric in SALES_METRICS)
+    ))
+
+    pizza_rows = db.session.execute(
+        db.select(PizzaSalesRollupDB.pizza_name, PizzaSalesRollupDB.size,
+                  db.func.sum(PizzaSalesRollupDB.quantity).label('quantity'),
+                  db.func.sum(PizzaSalesRollupDB.revenue).label('revenue'))
+        .where(PizzaSalesRollupDB.granularity == granularity,
+               PizzaSalesRollupDB.bucket >= bucket_start(start, granularity),
+               PizzaSalesRollupDB.bucket < end)
+        .group_by(PizzaSalesRollupDB.pizza_name, PizzaSalesRollupDB.size)
+        .having(db.func.sum(PizzaSalesRollupDB.quantity) > 0)
+        .order_by(db.desc('revenue'), PizzaSalesRollupDB.pizza_name, PizzaSalesRollupDB.size)
+    )
+    totals['pizzas'] = [
+        {'name': row.pizza_name, 'size': row.size, 'quantity': row.quantity, 'revenue': round(row.revenue, 2)}
+        for row in pizza_rows
+    ]
+
+    return {'buckets': buckets, 'totals': totals}
+
+
+def _sales_document(document, row):
+    """Complète un document avec les métriques d'un agrégat"""
+    document.update({
+        'orders': row.order_count,
+        'revenue': round(row.revenue, 2),
+        'items': row.item_count,
+        'average_order_value': round(row.revenue / row.order_count, 2) if row.order_count else None,
+        'cancelled_orders': row.cancelled_count,
+        'cancelled_revenue': round(row.cancelled_revenue, 2)
+    })
+    return document
@@ -3,10 +3,10 @@ Module de peuplement de la base de données
 Fonctions pour insérer les données de démonstration
 """
 from datetime import datetime, timedelta
-import json
 from app.database import db
-from app.models.db_models import PizzaDB, OrderDB, OrderPizzaDB, DeliveryDB
+from app.models.db_models import PizzaDB, OrderDB, DeliveryDB
 from app.seeds.catalog import CATALOG_PIZZAS, SAMPLE_ORDERS
+from app.catalog_cache import bump_catalog_version
 
 
 def seed_pizzas():
@@ -20,17 +20,18 @@ def seed_pizzas():
 
     count = 0
     for pizza_data in CATALOG_PIZZAS:
-        # Convertir la liste de toppings en JSON
         pizza = PizzaDB(
             name=pizza_data['name'],
             size=pizza_data['size'],
             price_amount=pizza_data['price_amount'],
-            price_currency=pizza_data['price_currency'],
-            toppings=json.dumps(pizza_data['toppings'])
+            price_currency=pizza_data['price_currency']
         )
+        # Garnitures en JSON et dans la table normalisée
+        pizza.set_toppings(pizza_data['toppings'])
         db.session.add(pizza)
         count += 1
 
+    bump_catalog_version()
     db.session.commit()
     print(f"   ✅ {count} pizzas ajoutées")
     return count
@@ -55,14 +56,14 @@ def seed_orders():
     count = 0
     for order_data in SAMPLE_ORDERS:
         # Calculer la date de création
-        created_at = datetime.now()
+        created_at = datetime.utcnow()
         if order_data.get('delivery'):
             if 'days_ago' in order_data['delivery']:
-                created_at = datetime.now() - timedelta(days=order_data['delivery']['days_ago'])
+                created_at = datetime.utcnow() - timedelta(days=order_data['delivery']['days_ago'])
             elif 'hours_ago' in order_data['delivery']:
-                created_at = datetime.now() - timedelta(hours=order_data['delivery']['hours_ago'])
+                created_at = datetime.utcnow() - timedelta(hours=order_data['delivery']['hours_ago'])
             elif 'minutes_ago' in order_data['delivery']:
-                created_at = datetime.now() - timedelta(minutes=order_data['delivery']['minutes_ago'])
+                created_at = datetime.utcnow() - timedelta(minutes=order_data['delivery']['minutes_ago'])
 
         # Créer la commande
         order = OrderDB(
@@ -77,11 +78,7 @@ def seed_orders():
         # Ajouter les pizzas à la commande
         for pizza_idx in order_data['pizzas_indices']:
             if pizza_idx < len(pizzas):
-                order_pizza = OrderPizzaDB(
-                    order_id=order.id,
-                    pizza_id=pizzas[pizza_idx].id
-                )
-                db.session.add(order_pizza)
+                order.add_pizza(pizzas[pizza_idx])
 
         # Créer la livraison si nécessaire
         if order_data.get('delivery'):
@@ -95,13 +92,13 @@ def seed_orders():
             # Ajouter les dates selon le statut
             if delivery_info['status'] in ['in_transit', 'delivered']:
                 if 'hours_ago' in delivery_info:
-                    delivery.started_at = datetime.now() - timedelta(hours=delivery_info['hours_ago'], minutes=10)
+                    delivery.started_at = datetime.utcnow() - timedelta(hours=delivery_info['hours_ago'], minutes=10)
                 elif 'days_ago' in delivery_info:
-                    delivery.started_at = datetime.now() - timedelta(days=delivery_info['days_ago'], hours=1)
+                    delivery.started_at = datetime.utcnow() - timedelta(days=delivery_info['days_ago'], hours=1)
 
             if delivery_info['status'] == 'delivered':
                 if 'days_ago' in delivery_info:
-                    delivery.completed_at = datetime.now() - timedelta(days=delivery_info['days_ago'])
+                    delivery.completed_at = datetime.utcnow() - timedelta(days=delivery_info['days_ago'])
 
             db.session.add(delivery)
 
@@ -135,7 +132,8 @@ def is_database_empty():
     Returns:
         bool: True si la base est vide, False sinon
     """
-    pizzas_count = PizzaDB.query.count()
-    orders_count = OrderDB.query.count()
+    # Compter sur la clé primaire : fonctionne avant l'application des migrations
+    pizzas_count = db.session.query(db.func.count(PizzaDB.id)).scalar()
+    orders_count = db.session.query(db.func.count(OrderDB.id)).scalar()
     return pizzas_count == 0 and orders_count == 0
 
@@ -0,0 +1,184 @@
+"""
+Générateur de jeux de données synthétiques pour les tests de charge
+
+Les lignes sont insérées en masse (INSERT Core executemany) par lots, une
+transaction par lot, sans passer par les objets ORM.
+"""
+from datetime import datetime, timedelta
+from app.database import db
+from app.models.db_models import PizzaDB, OrderDB, OrderPizzaDB, DeliveryDB
+from app.seeds import seed_pizzas
+import random
+import time
+import uuid
+
+DEFAULT_CHUNK_SIZE = 10000
+
+FIRST_NAMES = ['Alice', 'Bob', 'Camille', 'David', 'Emma', 'Félix', 'Gabriel', 'Hugo', 'Inès',
+               'Jules', 'Léa', 'Louis', 'Manon', 'Nathan', 'Chloé', 'Paul', 'Sarah', 'Tom']
+LAST_NAMES = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand',
+              'Leroy', 'Moreau', 'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'Roux']
+STREETS = ['Rue de la Paix', 'Avenue des Champs', 'Boulevard Voltaire', 'Rue du Commerce',
+           'Rue Victor Hugo', 'Avenue Jean Jaurès', 'Rue de la République', 'Place du Marché']
+DRIVERS = [f'Livreur {i:03d}' for i in range(1, 201)]
+CANCELLATION_REASONS = ['Customer request', 'Address not found', 'Customer unreachable']
+
+# Poids relatif des commandes par heure de la journée (pics du déjeuner et du dîner)
+HOUR_WEIGHTS = [1, 1, 0, 0, 0, 0, 1, 2, 3, 4, 6, 14, 18, 12, 6, 4, 5, 8, 16, 22, 20, 12, 6, 3]
+
+# Nombre de pizzas par commande : 3 en moyenne
+LINE_COUNTS = [1, 2, 3, 4, 5, 6]
+LINE_WEIGHTS = [15, 25, 25, 17, 11, 7]
+
+# Statut des commandes terminées (plus de 2 h) : {statut: poids}
+CLOSED_STATUSES = {'delivered': 93, 'cancelled': 7}
+
+# Statut des commandes récentes selon leur âge en minutes : (âge max, statuts)
+OPEN_STATUSES = [
+    (10, ['pending', 'preparing']),
+    (25, ['preparing', 'ready']),
+    (40, ['ready', 'out_for_delivery']),
+    (120, ['out_for_delivery', 'delivered', 'delivered', 'cancelled'])
+]
+
+
+def random_created_at(rng, start, days):
+    """Date de création : jour uniforme, heure selon HOUR_WEIGHTS"""
+    day = start + timedelta(days=rng.randrange(days))
+    hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+    return day + timedelta(hours=hour, seconds=rng.randrange(3600))
+
+
+def order_status(rng, created_at, now):
+    """Statut cohérent avec l'âge de la commande"""
+    age_minutes = (now - created_at).total_seconds() / 60
+
+    for max_age, statuses in OPEN_STATUSES:
+        if age_minutes < max_age:
+            return rng.choice(statuses)
+
+    return rng.choices(list(CLOSED_STATUSES), weights=list(CLOSED_STATUSES.values()))[0]
+
+
+def delivery_row(rng, order_id, status, created_at, now):
+    """
+    Livraison cohérente avec la commande, ou None (commande pas encore assignée)
+    """
+    if status == 'pending':
+        return None
+    if status == 'cancelled' and rng.random() < 0.5:
+        return None
+
+    row = {
+        'id': str(uuid.uuid4()),
+        'order_id': order_id,
+        'driver_name': rng.choice(DRIVERS),
+        'status': 'assigned',
+        'started_at': None,
+        'completed_at': None,
+        'current_latitude': None,
+        'current_longitude': None,
+        'location_updated_at': None,
+        'cancellation_reason': None,
+        'created_at': created_at + timedelta(minutes=rng.uniform(1, 5))
+    }
+
+    if status == 'cancelled':
+        row['status'] = 'cancelled'
+        row['cancellation_reason'] = rng.choice(CANCELLATION_REASONS)
+    elif status in ('out_for_delivery', 'delivered'):
+        started_at = min(created_at + timedelta(minutes=rng.uniform(15, 35)), now)
+        row['status'] = 'in_transit'
+        row['started_at'] = started_at
+        row['current_latitude'] = round(rng.uniform(48.80, 48.91), 6)
+        row['current_longitude'] = round(rng.uniform(2.25, 2.42), 6)
+        row['location_updated_at'] = started_at
+
+        if status == 'delivered':
+            completed_at = min(started_at + timedelta(minutes=rng.gauss(22, 8) % 60 + 5), now)
+            row['status'] = 'delivered'
+            row['completed_at'] = completed_at
+            row['location_updated_at'] = completed_at
+
+    return row
+
+
+def generate_dataset(orders, chunk_size=DEFAULT_CHUNK_SIZE, days=365, seed=None, progress=None):
+    """
+    Insère des commandes synthétiques avec leurs lignes et leurs livraisons
+
+    Les commandes sont réparties sur les `days` derniers jours avec des pics
+    au déjeuner et au dîner ; statuts, totaux et livraisons sont cohérents.
+    Le catalogue de démonstration est créé s'il est vide.
+
+    Args:
+        orders: Nombre de commandes à créer
+        chunk_size: Nombre de commandes par lot (une transaction par lot)
+        days: Période couverte, en jours jusqu'à maintenant
+        seed: Graine du générateur aléatoire (jeu reproductible)
+        progress: Fonction appelée après chaque lot avec les statistiques
+
+    Returns:
+        dict: Nombre de commandes, lignes et livraisons créées, durée en secondes
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    catalog_query = db.select(PizzaDB.id, PizzaDB.price_amount, PizzaDB.price_currency).where(
+        PizzaDB.in_catalog == True
+    ).order_by(PizzaDB.id)
+    pizzas = db.session.execute(catalog_query).all()
+    if not pizzas:
+        seed_pizzas()
+        pizzas = db.session.execute(catalog_query).all()
+
+    now = datetime.utcnow()
+    start = datetime.combine((now - timedelta(days=days - 1)).date(), datetime.min.time())
+    stats = {'orders': 0, 'order_pizzas': 0, 'deliveries': 0}
+
+    while stats['orders'] < orders:
+        count = min(chunk_size, orders - stats['orders'])
+        order_rows = []
+        line_rows = []
+        delivery_rows = []
+
+        for _ in range(count):
+            order_id = str(uuid.uuid4())
+            created_at = random_created_at(rng, start, days)
+            if created_at > now:
+                created_at = now - timedelta(seconds=rng.randrange(7200))
+            status = order_status(rng, created_at, now)
+
+            lines = rng.choices(pizzas, k=rng.choices(LINE_COUNTS, weights=LINE_WEIGHTS)[0])
+            for pizza in lines:
+                line_rows.append({'order_id': order_id, 'pizza_id': pizza.id, 'added_at': created_at})
+
+            order_rows.append({
+                'id': order_id,
+                'customer_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'customer_address': f'{rng.randrange(1, 200)} {rng.choice(STREETS)}',
+                'status': status,
+                'created_at': created_at,
+                'total_amount': round(sum(pizza.price_amount for pizza in lines), 2),
+                'currency': lines[-1].price_currency,
+                'item_count': len(lines)
+            })
+
+            delivery = delivery_row(rng, order_id, status, created_at, now)
+            if delivery is not None:
+                delivery_rows.append(delivery)
+
+        db.session.execute(OrderDB.__table__.insert(), order_rows)
+        db.session.execute(OrderPizzaDB.__table__.insert(), line_rows)
+        if delivery_rows:
+            db.session.execute(DeliveryDB.__table__.insert(), delivery_rows)
+        db.session.commit()
+
+        stats['orders'] += len(order_rows)
+        stats['order_pizzas'] += len(line_rows)
+        stats['deliveries'] += len(delivery_rows)
+        if progress is not None:
+            progress(stats)
+
+    stats['seconds'] = round(time.perf_counter() - started, 1)
+    return stats
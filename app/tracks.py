@@ -0,0 +1,210 @@
+"""
+Historique compact des positions des livraisons (série temporelle)
+
+Les points sont regroupés en blocs de CHUNK_SIZE points par livraison.
+Chaque point occupe 12 octets : trois int32 petit-boutistes
+(écart en ms depuis le début du bloc, latitude et longitude × 1e6).
+"""
+from app.database import db
+from app.models.db_models import DeliveryTrackChunkDB
+from array import array
+from datetime import datetime, timedelta
+import sys
+
+CHUNK_SIZE = 256
+MAX_CHUNK_SPAN_MS = 2 ** 31 - 1  # les écarts sont stockés en int32
+COORDINATE_SCALE = 1_000_000
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_ms(moment):
+    """Convertit un datetime UTC naïf en millisecondes depuis l'epoch"""
+    return (moment - EPOCH) // timedelta(milliseconds=1)
+
+
+def parse_since(value):
+    """
+    Convertit le paramètre since= en millisecondes depuis l'epoch
+
+    Args:
+        value: Secondes depuis l'epoch ou date ISO 8601 (chaîne)
+
+    Returns:
+        int: Horodatage en ms
+
+    Raises:
+        ValueError: Si la valeur est invalide
+    """
+    from app.locations import parse_timestamp
+
+    try:
+        return to_epoch_ms(parse_timestamp(float(value)))
+    except ValueError:
+        return to_epoch_ms(parse_timestamp(value))
+
+
+def encode_points(points, start_ts):
+    """
+    Encode des points (ts ms, lat, lon) relativement au début du bloc
+
+    Args:
+        points: Liste de tuples (ts en ms, latitude, longitude)
+        start_ts: Début du bloc en ms
+
+    Returns:
+        bytes: Points encodés
+    """
+    values = array('i')
+    for ts, lat, lon in points:
+        values.extend((ts - start_ts, round(lat * COORDINATE_SCALE), round(lon * COORDINATE_SCALE)))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def decode_points(data, start_ts):
+    """
+    Décode un bloc en itérant sur ses points, sans objets intermédiaires
+
+    Args:
+        data: Contenu binaire du bloc
+        start_ts: Début du bloc en ms
+
+    Yields:
+        tuple: (ts en ms, latitude, longitude)
+    """
+    values = array('i')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    for index in range(0, len(values), 3):
+        yield (start_ts + values[index],
+               values[index + 1] / COORDINATE_SCALE,
+               values[index + 2] / COORDINATE_SCALE)
+
+
+def append_points(points_by_delivery):
+    """
+    Ajoute des points à l'historique de plusieurs livraisons
+
+    Une requête lit les blocs ouverts, puis les blocs complétés sont mis à jour
+    en une seule requête executemany et les nouveaux blocs insérés en masse.
+    Les points antérieurs au dernier point enregistré sont ignorés.
+    La transaction n'est pas validée : l'appelant reste maître du commit.
+
+    Args:
+        points_by_delivery: {delivery_id: [(ts en ms, lat, lon), ...]}
+
+    Returns:
+        int: Nombre de points enregistrés
+    """
+    if not points_by_delivery:
+        return 0
+
+    table = DeliveryTrackChunkDB.__table__
+    last_chunks = (
+        db.select(table.c.delivery_id, db.func.max(table.c.start_ts).label('start_ts'))
+        .where(table.c.delivery_id.in_(list(points_by_delivery)))
+        .group_by(table.c.delivery_id)
+        .subquery()
+    )
+
+    # Seul le dernier bloc de chaque livraison est lu
+    open_chunks = {}
+    last_ts = {}
+    for row in db.session.execute(
+        db.select(table.c.id, table.c.delivery_id, table.c.start_ts, table.c.end_ts,
+                  table.c.point_count, table.c.data)
+        .join(last_chunks, db.and_(table.c.delivery_id == last_chunks.c.delivery_id,
+                                   table.c.start_ts == last_chunks.c.start_ts))
+        .order_by(table.c.id)
+    ):
+        last_ts[row.delivery_id] = row.end_ts
+        open_chunks[row.delivery_id] = row if row.point_count < CHUNK_SIZE else None
+
+    updates = []
+    inserts = []
+    stored = 0
+
+    for delivery_id, points in points_by_delivery.items():
+        points = sorted(points)
+        if delivery_id in last_ts:
+            points = [point for point in points if point[0] >= last_ts[delivery_id]]
+        if not points:
+            continue
+        stored += len(points)
+
+        chunk = open_chunks.get(delivery_id)
+        if chunk is not None:
+            room = CHUNK_SIZE - chunk.point_count
+            head = [point for point in points[:room] if point[0] - chunk.start_ts <= MAX_CHUNK_SPAN_MS]
+            points = points[len(head):]
+            if head:
+                updates.append({
+                    'b_id': chunk.id,
+                    'b_end_ts': head[-1][0],
+                    'b_point_count': chunk.point_count + len(head),
+                    'b_data': chunk.data + encode_points(head, chunk.start_ts)
+                })
+
+        for block in _split_blocks(points):
+            inserts.append({
+                'delivery_id': delivery_id,
+                'start_ts': block[0][0],
+                'end_ts': block[-1][0],
+                'point_count': len(block),
+                'data': encode_points(block, block[0][0])
+            })
+
+    if updates:
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('b_id')).values(
+                end_ts=db.bindparam('b_end_ts'),
+                point_count=db.bindparam('b_point_count'),
+                data=db.bindparam('b_data')
+            ),
+            updates
+        )
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+
+    return stored
+
+
+def _split_blocks(points):
+    """Découpe des points triés en blocs de CHUNK_SIZE points au plus"""
+    block = []
+    for point in points:
+        if block and (len(block) == CHUNK_SIZE or point[0] - block[0][0] > MAX_CHUNK_SPAN_MS):
+            yield block
+            block = []
+        block.append(point)
+    if block:
+        yield block
+
+
+def iter_track(delivery_id, since_ts=None, chunk_batch=64):
+    """
+    Parcourt l'historique d'une livraison, bloc par bloc
+
+    Les blocs sont lus par lots (yield_per) : l'historique complet n'est
+    jamais chargé en mémoire.
+
+    Args:
+        delivery_id: Identifiant de la livraison
+        since_ts: Ne renvoyer que les points à partir de ce ts (ms), ou None
+        chunk_batch: Nombre de blocs lus par aller-retour
+
+    Yields:
+        tuple: (ts en ms, latitude, longitude)
+    """
+    table = DeliveryTrackChunkDB.__table__
+    query = db.select(table.c.start_ts, table.c.data).where(table.c.delivery_id == delivery_id)
+    if since_ts is not None:
+        query = query.where(table.c.end_ts >= since_ts)
+    query = query.order_by(table.c.start_ts).execution_options(yield_per=chunk_batch)
+
+    for start_ts, data in db.session.execute(query):
+        for point in decode_points(data, start_ts):
+            if since_ts is None or point[0] >= since_ts:
+                yield point
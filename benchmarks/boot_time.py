@@ -0,0 +1,62 @@
+"""
+Temps de démarrage d'un worker : import, create_app() et première requête
+
+Chaque mesure est faite dans un interpréteur neuf, comme un worker qui démarre.
+
+Usage :
+    python -m benchmarks.boot_time [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/health')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'total_ms': (served - started) * 1000
+}))
+"""
+
+
+def measure_once():
+    """Démarre un worker dans un nouvel interpréteur et retourne ses temps"""
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER_SCRIPT],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    report = {
+        key: {
+            'median': round(statistics.median(run[key] for run in runs), 1),
+            'max': round(max(run[key] for run in runs), 1)
+        }
+        for key in runs[0]
+    }
+    print(json.dumps({'runs': args.runs, 'ms': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
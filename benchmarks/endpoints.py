@@ -0,0 +1,435 @@
+"""
+Benchmark de chaque endpoint de l'API sur des jeux de données de taille croissante
+
+Par défaut, l'application est appelée via le client de test Flask sur une copie
+d'un jeu synthétique (voir `flask generate-dataset`), généré une fois puis
+réutilisé. Avec --url, un serveur déjà lancé sur un jeu de données est appelé
+en HTTP (le nombre de requêtes SQL n'est alors pas mesuré).
+
+Les routes /profiles sont mesurées avec le jeton PROFILING_TOKEN (fixé par le
+benchmark en local, lu dans l'environnement avec --url) ; sans jeton, elles
+sont ignorées.
+
+Usage :
+    python -m benchmarks.endpoints --sizes 1000,100000,1000000 --output bench.json
+    python -m benchmarks.endpoints --url http://localhost:5000 --output bench.json
+    python -m benchmarks.endpoints --compare before.json after.json
+"""
+from app.app import create_app
+from app.config import get_config
+from app.database import db, create_schema
+from app.seeds.synthetic import generate_dataset
+from sqlalchemy import event
+from datetime import datetime, timezone
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import urllib.parse
+
+DEFAULT_SIZES = (1000, 100000, 1000000)
+DATASET_SEED = 42
+BENCH_ADMIN_TOKEN = 'bench-admin-token'
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FlaskClientTransport:
+    """Appels via le client de test Flask, avec comptage des requêtes SQL"""
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+        self.statements = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.strip().upper().startswith('BEGIN'):
+            self.statements += 1
+
+    def __enter__(self):
+        self._context = self.app.app_context()
+        self._context.push()
+        event.listen(db.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, 'before_cursor_execute', self._on_execute)
+        self._context.pop()
+
+    def request(self, method, path, body=None, headers=None):
+        """Retourne (code HTTP, corps en bytes)"""
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_data()
+
+
+class HttpTransport:
+    """Appels HTTP sur une connexion persistante vers un serveur lancé"""
+
+    def __init__(self, url):
+        parsed = urllib.parse.urlsplit(url)
+        self.connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+        self.statements = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.connection.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """Retourne (code HTTP, corps en bytes)"""
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+
+def call(transport, method, path, body=None, headers=None):
+    """Appel hors mesure (préparation) : retourne le JSON de la réponse"""
+    status, data = transport.request(method, path, body, headers)
+    if status >= 400:
+        raise RuntimeError(f"{method} {path} -> {status}: {data[:200]!r}")
+    return json.loads(data)
+
+
+def prepare_fixtures(transport, count, admin_token=None):
+    """
+    Crée (hors mesure) les données consommées par les endpoints d'écriture
+
+    Args:
+        transport: Transport utilisé pour le benchmark
+        count: Nombre de requêtes mesurées par endpoint
+        admin_token: PROFILING_TOKEN du serveur (enregistre un profil à relire)
+
+    Returns:
+        dict: Identifiants utilisés par les scénarios
+    """
+    pizza_id = call(transport, 'GET', '/pizzas?type=catalog&limit=1')['pizzas'][0]['pizza_id']
+    orders = call(transport, 'GET', '/orders?limit=50')['orders']
+    deliveries = call(transport, 'GET', '/deliveries?limit=50')['deliveries']
+
+    def checkouts(driver_name=None):
+        body = {"customer_name": "Bench Client", "customer_address": "1 Rue du Benchmark",
+                "pizza_ids": [pizza_id, pizza_id]}
+        if driver_name:
+            body['driver_name'] = driver_name
+        return [call(transport, 'POST', '/checkout', body) for _ in range(count)]
+
+    def empty_orders():
+        return [call(transport, 'POST', '/orders', {"customer_name": "Bench Client",
+                                                    "customer_address": "1 Rue du Benchmark"})['order_id']
+                for _ in range(count)]
+
+    to_start = [result['delivery']['delivery_id'] for result in checkouts('Bench Driver')]
+    to_cancel = [result['delivery']['delivery_id'] for result in checkouts('Bench Driver')]
+    to_fill = empty_orders()
+    to_assign = empty_orders()
+
+    profile_id = None
+    if admin_token:
+        call(transport, 'GET', '/health', headers={'X-Profile': admin_token})
+        profile_id = call(transport, 'GET', '/profiles',
+                          headers={'X-Admin-Token': admin_token})['profiles'][0]['profile_id']
+
+    return {
+        'pizza_id': pizza_id,
+        'order_ids': [order['order_id'] for order in orders],
+        'delivery_ids': [delivery['delivery_id'] for delivery in deliveries],
+        'driver_name': deliveries[0]['driver_name'] if deliveries else 'Bench Driver',
+        'to_start': to_start,
+        'to_cancel': to_cancel,
+        'to_fill': to_fill,
+        'to_assign': to_assign,
+        'to_prepare': [result['order']['order_id'] for result in checkouts()],
+        'admin_headers': {'X-Admin-Token': admin_token} if admin_token else None,
+        'profile_id': profile_id
+    }
+
+
+def scenarios(fixtures):
+    """
+    Scénarios mesurés, dans l'ordre d'exécution
+
+    Chaque scénario est (nom, méthode, fonction i -> (chemin, corps), en-têtes).
+    Les scénarios d'écriture consomment les données préparées : start avant
+    complete, ajout de pizza avant retrait. Les routes /profiles ne sont
+    mesurées qu'avec un jeton administrateur.
+    """
+    pizza_id = fixtures['pizza_id']
+    order_ids = fixtures['order_ids']
+    delivery_ids = fixtures['delivery_ids']
+    started = fixtures['to_start']
+
+    def pick(ids, i):
+        return ids[i % len(ids)]
+
+    measured = [
+        ('index', 'GET', lambda i: ('/', None)),
+        ('health', 'GET', lambda i: ('/health', None)),
+        ('metrics', 'GET', lambda i: ('/metrics', None)),
+        ('list_pizzas', 'GET', lambda i: ('/pizzas', None)),
+        ('list_pizzas_by_topping', 'GET', lambda i: ('/pizzas?topping=Mozzarella', None)),
+        ('get_pizza', 'GET', lambda i: (f'/pizzas/{pizza_id}', None)),
+        ('pizza_catalog', 'GET', lambda i: ('/pizzas/catalog', None)),
+        ('create_pizza', 'POST', lambda i: ('/pizzas', {"name": f"Bench {i}", "size": "Medium",
+                                                         "price": 11.5, "toppings": ["Mozzarella"]})),
+        ('list_orders', 'GET', lambda i: ('/orders', None)),
+        ('list_orders_expanded', 'GET', lambda i: ('/orders?expand=pizzas', None)),
+        ('export_orders', 'GET', lambda i: ('/orders/export?status=pending', None)),
+        ('get_order', 'GET', lambda i: (f'/orders/{pick(order_ids, i)}', None)),
+        ('create_order', 'POST', lambda i: ('/orders', {"customer_name": "Bench Client",
+                                                         "customer_address": "1 Rue du Benchmark"})),
+        ('add_pizza_to_order', 'POST', lambda i: (f"/orders/{fixtures['to_fill'][i]}/pizzas",
+                                                   {"pizza_id": pizza_id})),
+        ('remove_pizza_from_order', 'DELETE', lambda i: (f"/orders/{fixtures['to_fill'][i]}/pizzas/0", None)),
+        ('update_order_status', 'PATCH', lambda i: (f"/orders/{fixtures['to_prepare'][i]}/status",
+                                                     {"status": "ready"})),
+        ('checkout', 'POST', lambda i: ('/checkout', {"customer_name": "Bench Client",
+                                                       "customer_address": "1 Rue du Benchmark",
+                                                       "pizza_ids": [pizza_id, pizza_id, pizza_id]})),
+        ('create_delivery', 'POST', lambda i: ('/deliveries', {"order_id": fixtures['to_assign'][i],
+                                                                "driver_name": "Bench Driver"})),
+        ('list_deliveries', 'GET', lambda i: ('/deliveries', None)),
+        ('list_deliveries_in_transit', 'GET', lambda i: ('/deliveries?status=in_transit', None)),
+        ('list_deliveries_by_driver', 'GET',
+         lambda i: (f"/deliveries?driver={urllib.parse.quote(fixtures['driver_name'])}", None)),
+        ('export_deliveries_csv', 'GET', lambda i: ('/deliveries/export.csv?status=in_transit', None)),
+        ('active_deliveries', 'GET', lambda i: ('/deliveries/active', None)),
+        ('get_delivery', 'GET', lambda i: (f'/deliveries/{pick(delivery_ids, i)}?expand=order', None)),
+        ('start_delivery', 'PATCH', lambda i: (f'/deliveries/{started[i]}/start', None)),
+        ('update_location', 'PATCH', lambda i: (f'/deliveries/{started[i]}/location',
+                                                {"latitude": 48.85 + i * 1e-5, "longitude": 2.35})),
+        ('update_locations_bulk', 'PATCH', lambda i: ('/deliveries/locations', {"pings": [
+            {"delivery_id": delivery_id, "lat": 48.86, "lon": 2.34} for delivery_id in started[:100]
+        ]})),
+        ('delivery_track', 'GET', lambda i: (f'/deliveries/{pick(started, i)}/track', None)),
+        ('delivery_eta', 'GET', lambda i: (f'/deliveries/{pick(started, i)}/eta', None)),
+        ('location_buffer_stats', 'GET', lambda i: ('/deliveries/locations/buffer', None)),
+        ('complete_delivery', 'PATCH', lambda i: (f'/deliveries/{started[i]}/complete', None)),
+        ('cancel_delivery', 'PATCH', lambda i: (f"/deliveries/{fixtures['to_cancel'][i]}/cancel",
+                                                 {"reason": "Benchmark"})),
+        ('revenue_by_day', 'GET', lambda i: ('/analytics/revenue?granularity=day', None)),
+        ('revenue_by_hour', 'GET', lambda i: ('/analytics/revenue?granularity=hour', None)),
+        ('delivery_analytics', 'GET', lambda i: ('/analytics/deliveries', None)),
+        ('batch', 'POST', lambda i: ('/batch', {"operations": [
+            {"method": "GET", "path": f'/orders/{pick(order_ids, i)}'},
+            {"method": "GET", "path": f'/deliveries/{pick(delivery_ids, i)}'},
+            {"method": "POST", "path": '/orders', "body": {"customer_name": "Bench Client",
+                                                           "customer_address": "1 Rue du Benchmark"}}
+        ]})),
+    ]
+    measured = [(name, method, build, None) for name, method, build in measured]
+
+    profile_id = fixtures['profile_id']
+    if profile_id is not None:
+        admin = fixtures['admin_headers']
+        measured += [
+            ('list_profiles', 'GET', lambda i: ('/profiles', None), admin),
+            ('get_profile', 'GET', lambda i: (f'/profiles/{profile_id}', None), admin),
+            ('download_profile', 'GET', lambda i: (f'/profiles/{profile_id}/folded', None), admin),
+        ]
+    return measured
+
+
+def percentile(sorted_values, fraction):
+    """Percentile par rang le plus proche d'une liste triée"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenarios(transport, count, warmup, admin_token=None):
+    """
+    Mesure chaque scénario
+
+    Args:
+        admin_token: PROFILING_TOKEN du serveur (sans jeton, les routes /profiles sont ignorées)
+
+    Returns:
+        list: Un résultat par endpoint
+    """
+    fixtures = prepare_fixtures(transport, count + warmup, admin_token)
+    results = []
+
+    for name, method, build, headers in scenarios(fixtures):
+        for i in range(warmup):
+            transport.request(method, *build(count + i), headers)
+
+        latencies = []
+        errors = 0
+        statements_before = transport.statements
+        started = time.perf_counter()
+        for i in range(count):
+            path, body = build(i)
+            request_started = time.perf_counter()
+            status, _ = transport.request(method, path, body, headers)
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            if status >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        results.append({
+            'route': name,
+            'method': method,
+            'requests': count,
+            'errors': errors,
+            'throughput_rps': round(count / elapsed, 1),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'statements_per_request': (
+                None if statements_before is None
+                else round((transport.statements - statements_before) / count, 2)
+            )
+        })
+        print(f"   {name:<28} p50 {results[-1]['p50_ms']:>9.3f} ms  "
+              f"p99 {results[-1]['p99_ms']:>9.3f} ms  {results[-1]['throughput_rps']:>8.1f} req/s")
+
+    return results
+
+
+def bench_config(database_path):
+    """Profil courant (PIZZA_CONFIG) pointant sur la base du benchmark"""
+    return type('BenchConfig', (get_config(),), {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database_path,
+        'LOCATION_WRITE_BEHIND': False,
+        'PROFILING_TOKEN': BENCH_ADMIN_TOKEN,
+        'PROFILE_DIR': os.path.join(os.path.dirname(database_path), 'profiles')
+    })
+
+
+def dataset_path(data_dir, size):
+    """Génère le jeu de données de `size` commandes s'il n'existe pas encore"""
+    path = os.path.join(data_dir, f'dataset-{size}-seed{DATASET_SEED}.db')
+    if os.path.exists(path):
+        return path
+
+    print(f"🏭 Génération du jeu de données de {size} commandes ({path})...")
+    building = path + '.building'
+    if os.path.exists(building):
+        os.remove(building)
+    app = create_app(bench_config(building))
+    with app.app_context():
+        create_schema()
+        generate_dataset(size, seed=DATASET_SEED)
+        db.session.remove()
+        db.engine.dispose()
+    os.replace(building, path)
+    return path
+
+
+def run_local(sizes, count, warmup, data_dir):
+    """Benchmark via le client de test, sur une copie de chaque jeu de données"""
+    results = []
+    for size in sizes:
+        source = dataset_path(data_dir, size)
+        work_dir = tempfile.mkdtemp(prefix='pizza-bench-')
+        work_path = os.path.join(work_dir, 'bench.db')
+        shutil.copyfile(source, work_path)
+
+        print(f"📏 {size} commandes")
+        app = create_app(bench_config(work_path))
+        with FlaskClientTransport(app) as transport:
+            for result in run_scenarios(transport, count, warmup, BENCH_ADMIN_TOKEN):
+                results.append({'dataset_orders': size, **result})
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+
+def run_remote(url, count, warmup, size_label):
+    """Benchmark HTTP d'un serveur déjà lancé"""
+    print(f"🌐 {url}")
+    with HttpTransport(url) as transport:
+        return [{'dataset_orders': size_label, **result}
+                for result in run_scenarios(transport, count, warmup, os.environ.get('PROFILING_TOKEN'))]
+
+
+def git_commit():
+    """Commit courant, pour comparer les rapports entre commits"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    """Affiche l'évolution du p50, du p99 et des requêtes SQL entre deux rapports"""
+    with open(before_path) as f:
+        before = {(r['dataset_orders'], r['route']): r for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = json.load(f)['results']
+
+    print(f"{'orders':>8}  {'route':<28} {'p50 ms':>19} {'p99 ms':>19} {'SQL/req':>13}")
+    for result in after:
+        previous = before.get((result['dataset_orders'], result['route']))
+        if previous is None:
+            continue
+        change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100 if previous['p50_ms'] else 0
+        print(f"{result['dataset_orders']:>8}  {result['route']:<28} "
+              f"{previous['p50_ms']:>8.3f} → {result['p50_ms']:<8.3f}"
+              f"{previous['p99_ms']:>8.3f} → {result['p99_ms']:<8.3f}"
+              f"{str(previous['statements_per_request']):>5} → {str(result['statements_per_request']):<5}"
+              f"  ({change:+.0f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Tailles des jeux de données (nombre de commandes)")
+    parser.add_argument('--requests', type=int, default=200, help="Requêtes mesurées par endpoint")
+    parser.add_argument('--warmup', type=int, default=5, help="Requêtes de chauffe par endpoint")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'pizza-bench'),
+                        help="Répertoire des jeux de données générés")
+    parser.add_argument('--url', help="Serveur à appeler en HTTP au lieu du client de test")
+    parser.add_argument('--output', help="Fichier du rapport JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help="Compare deux rapports JSON")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if args.url:
+        results = run_remote(args.url, args.requests, args.warmup, sizes[0] if len(sizes) == 1 else None)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        results = run_local(sizes, args.requests, args.warmup, args.data_dir)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(),
+            'mode': 'http' if args.url else 'test_client',
+            'url': args.url,
+            'python': platform.python_version(),
+            'requests_per_route': args.requests
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Rapport écrit dans {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Débit lecture/écriture concurrent de SQLite : profil par défaut vs production
+
+Chaque profil travaille sur sa propre base temporaire, peuplée à l'identique.
+Des threads lecteurs paginent les commandes par statut pendant que des threads
+écrivains mettent à jour des positions de livraison (un commit par écriture).
+
+Trois formes d'écriture sont mesurées :
+
+- update : un UPDATE seul ;
+- read_then_write : un SELECT puis un UPDATE dans la même transaction, ouverte
+  par BEGIN (en WAL, échoue en SQLITE_BUSY_SNAPSHOT si un autre écrivain a
+  validé entre les deux) ;
+- read_then_write_immediate : la même transaction ouverte par BEGIN IMMEDIATE,
+  comme les requêtes d'écriture de l'application.
+
+Usage :
+    python -m benchmarks.sqlite_concurrency [--seconds 5] [--readers 8] [--writers 2]
+"""
+from app.config import Config, ProductionConfig
+from app.database import db, configure_sqlite_pragmas, configure_sqlite_transactions
+from app.models.db_models import OrderDB, DeliveryDB
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+PROFILES = {
+    'default': Config,
+    'production': ProductionConfig
+}
+
+WRITE_MODES = ('update', 'read_then_write', 'read_then_write_immediate')
+
+# Le thread courant ouvre-t-il ses transactions par BEGIN IMMEDIATE ?
+_thread_state = threading.local()
+
+
+def create_profile_engine(path, config):
+    """Crée un moteur sur `path` avec les options, PRAGMA et transactions de l'application"""
+    engine = create_engine('sqlite:///' + path, **config.SQLALCHEMY_ENGINE_OPTIONS)
+    configure_sqlite_transactions(engine, immediate=lambda: getattr(_thread_state, 'immediate', False))
+    configure_sqlite_pragmas(engine, config.SQLITE_PRAGMAS)
+    return engine
+
+
+def populate(engine, orders):
+    """Crée le schéma et insère `orders` commandes avec leur livraison"""
+    db.metadata.create_all(engine)
+    started = datetime(2025, 1, 1)
+    order_rows = []
+    delivery_rows = []
+
+    for i in range(orders):
+        order_id = str(uuid.uuid4())
+        created_at = started + timedelta(seconds=i)
+        order_rows.append({'id': order_id, 'customer_name': f'Client {i}',
+                           'customer_address': '1 Rue Test', 'status': 'preparing',
+                           'created_at': created_at, 'total_amount': 12.99,
+                           'currency': 'EUR', 'item_count': 1})
+        delivery_rows.append({'id': str(uuid.uuid4()), 'order_id': order_id,
+                              'driver_name': f'Driver {i % 50}', 'status': 'in_transit',
+                              'created_at': created_at})
+
+    with engine.begin() as conn:
+        conn.execute(OrderDB.__table__.insert(), order_rows)
+        conn.execute(DeliveryDB.__table__.insert(), delivery_rows)
+
+    return [row['id'] for row in delivery_rows]
+
+
+def run_profile(name, config, seconds, readers, writers, orders, write_mode='update'):
+    """
+    Mesure le débit d'un profil pour une forme d'écriture (voir WRITE_MODES)
+
+    Returns:
+        dict: Opérations par seconde et erreurs SQLITE_BUSY
+    """
+    directory = tempfile.mkdtemp(prefix='pizza-bench-')
+    engine = create_profile_engine(os.path.join(directory, 'bench.db'), config)
+    delivery_ids = populate(engine, orders)
+
+    orders_table = OrderDB.__table__
+    deliveries_table = DeliveryDB.__table__
+    page_query = (
+        db.select(orders_table)
+        .where(orders_table.c.status == 'preparing')
+        .order_by(orders_table.c.created_at, orders_table.c.id)
+        .limit(50)
+    )
+    update_query = deliveries_table.update().where(
+        deliveries_table.c.id == db.bindparam('b_id')
+    ).values(current_latitude=db.bindparam('b_lat'), current_longitude=db.bindparam('b_lon'))
+    read_query = db.select(deliveries_table.c.status).where(deliveries_table.c.id == db.bindparam('b_id'))
+
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'busy': 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = busy = 0
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(page_query.offset(random.randrange(0, orders, 50))).all()
+                done += 1
+            except OperationalError:
+                busy += 1
+        with lock:
+            counts['reads'] += done
+            counts['busy'] += busy
+
+    def writer():
+        _thread_state.immediate = write_mode == 'read_then_write_immediate'
+        done = busy = 0
+        while not stop.is_set():
+            delivery_id = random.choice(delivery_ids)
+            try:
+                with engine.begin() as conn:
+                    if write_mode != 'update':
+                        conn.execute(read_query, {'b_id': delivery_id}).scalar()
+                    conn.execute(update_query, {'b_id': delivery_id,
+                                                'b_lat': random.uniform(48.8, 48.9),
+                                                'b_lon': random.uniform(2.3, 2.4)})
+                done += 1
+            except OperationalError:
+                busy += 1
+        with lock:
+            counts['writes'] += done
+            counts['busy'] += busy
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'profile': name,
+        'write_mode': write_mode,
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'writes_per_second': round(counts['writes'] / seconds, 1),
+        'busy_errors': counts['busy']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--orders', type=int, default=10000)
+    args = parser.parse_args()
+
+    results = [
+        run_profile(name, config, args.seconds, args.readers, args.writers, args.orders, write_mode)
+        for name, config in PROFILES.items()
+        for write_mode in WRITE_MODES
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Tampon de version du catalogue partagé entre les processus (catalog_version)
+
+Revision ID: 2a7e9c1d3f05
+Revises:
+Create Date: 2026-10-18 08:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import uuid
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7e9c1d3f05'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'catalog_version' in sa.inspect(op.get_bind()).get_table_names():
+        # Base créée par db.create_all() avec le schéma à jour
+        return
+
+    catalog_version = op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.String(length=36), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Ligne unique lue par app.catalog_cache (CATALOG_VERSION_ID)
+    op.bulk_insert(catalog_version, [{'id': 1, 'version': str(uuid.uuid4()), 'updated_at': None}])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
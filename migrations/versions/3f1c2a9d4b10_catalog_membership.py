@@ -0,0 +1,55 @@
+"""Appartenance explicite au catalogue (pizzas.in_catalog)
+
+Revision ID: 3f1c2a9d4b10
+Revises: 2a7e9c1d3f05
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.seeds.catalog import CATALOG_PIZZAS
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d4b10'
+down_revision = '2a7e9c1d3f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('pizzas')]
+    if 'in_catalog' in columns:
+        # Base créée par db.create_all() avec le schéma à jour
+        return
+
+    with op.batch_alter_table('pizzas') as batch_op:
+        batch_op.add_column(sa.Column('in_catalog', sa.Boolean(), nullable=False,
+                                      server_default=sa.false()))
+
+    # Backfill : les pizzas du catalogue de démonstration, plus celles jamais
+    # commandées (ancienne définition du catalogue)
+    pizzas = sa.table('pizzas',
+                      sa.column('id', sa.String),
+                      sa.column('name', sa.String),
+                      sa.column('size', sa.String),
+                      sa.column('in_catalog', sa.Boolean))
+    order_pizzas = sa.table('order_pizzas', sa.column('pizza_id', sa.String))
+
+    seeded = sa.tuple_(pizzas.c.name, pizzas.c.size).in_(
+        [(pizza['name'], pizza['size']) for pizza in CATALOG_PIZZAS]
+    )
+    never_ordered = ~sa.exists().where(order_pizzas.c.pizza_id == pizzas.c.id)
+    op.execute(pizzas.update().where(sa.or_(seeded, never_ordered)).values(in_catalog=True))
+
+    with op.batch_alter_table('pizzas') as batch_op:
+        batch_op.alter_column('in_catalog', server_default=sa.true())
+
+    op.create_index('ix_pizzas_catalog', 'pizzas', ['in_catalog', 'name', 'size'])
+
+
+def downgrade():
+    op.drop_index('ix_pizzas_catalog', table_name='pizzas')
+    with op.batch_alter_table('pizzas') as batch_op:
+        batch_op.drop_column('in_catalog')
@@ -0,0 +1,37 @@
+"""Index secondaires : clés étrangères, statuts et dates de création
+
+Revision ID: 8b2d4e6f1a23
+Revises: 3f1c2a9d4b10
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d4e6f1a23'
+down_revision = '3f1c2a9d4b10'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_order_pizzas_order_id', 'order_pizzas', ['order_id']),
+    ('ix_order_pizzas_pizza_id', 'order_pizzas', ['pizza_id']),
+    ('ix_pizzas_created_at_id', 'pizzas', ['created_at', 'id']),
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id']),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at', 'id']),
+    ('ix_deliveries_created_at_id', 'deliveries', ['created_at', 'id']),
+    ('ix_deliveries_status_created_at', 'deliveries', ['status', 'created_at', 'id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
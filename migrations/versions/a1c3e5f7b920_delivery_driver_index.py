@@ -0,0 +1,25 @@
+"""Index des livraisons par livreur et statut
+
+Revision ID: a1c3e5f7b920
+Revises: f7b0d5e8a439
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b920'
+down_revision = 'f7b0d5e8a439'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_deliveries_driver_status_created_at', 'deliveries',
+                    ['driver_name', 'status', 'created_at', 'id'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_deliveries_driver_status_created_at', table_name='deliveries', if_exists=True)
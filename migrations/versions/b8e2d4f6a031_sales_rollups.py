@@ -0,0 +1,90 @@
+"""Agrégats des ventes par heure et par jour (sales_rollups, pizza_sales_rollups)
+
+Revision ID: b8e2d4f6a031
+Revises: a1c3e5f7b920
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2d4f6a031'
+down_revision = 'a1c3e5f7b920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('sales_rollups'):
+        # Base créée par db.create_all() avec le schéma à jour
+        return
+
+    op.create_table(
+        'sales_rollups',
+        sa.Column('granularity', sa.String(4), primary_key=True),
+        sa.Column('bucket', sa.DateTime(), primary_key=True),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.Column('cancelled_count', sa.Integer(), nullable=False),
+        sa.Column('cancelled_revenue', sa.Float(), nullable=False),
+    )
+    op.create_table(
+        'pizza_sales_rollups',
+        sa.Column('granularity', sa.String(4), primary_key=True),
+        sa.Column('bucket', sa.DateTime(), primary_key=True),
+        sa.Column('pizza_name', sa.String(100), primary_key=True),
+        sa.Column('size', sa.String(20), primary_key=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Float(), nullable=False),
+    )
+
+    # Backfill en masse : agrégats horaires depuis les commandes, journaliers depuis les horaires
+    op.execute("""
+        INSERT INTO sales_rollups
+            (granularity, bucket, order_count, revenue, item_count, cancelled_count, cancelled_revenue)
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00.000000', created_at),
+               SUM(status != 'cancelled'),
+               SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END),
+               SUM(CASE WHEN status != 'cancelled' THEN item_count ELSE 0 END),
+               SUM(status = 'cancelled'),
+               SUM(CASE WHEN status = 'cancelled' THEN total_amount ELSE 0 END)
+        FROM orders
+        WHERE status != 'pending'
+        GROUP BY 2
+    """)
+    op.execute("""
+        INSERT INTO pizza_sales_rollups (granularity, bucket, pizza_name, size, quantity, revenue)
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00.000000', o.created_at), p.name, p.size,
+               COUNT(*), SUM(p.price_amount)
+        FROM order_pizzas op
+        JOIN orders o ON o.id = op.order_id
+        JOIN pizzas p ON p.id = op.pizza_id
+        WHERE o.status NOT IN ('pending', 'cancelled')
+        GROUP BY 2, 3, 4
+    """)
+    op.execute("""
+        INSERT INTO sales_rollups
+            (granularity, bucket, order_count, revenue, item_count, cancelled_count, cancelled_revenue)
+        SELECT 'day', substr(bucket, 1, 10) || ' 00:00:00.000000',
+               SUM(order_count), SUM(revenue), SUM(item_count), SUM(cancelled_count), SUM(cancelled_revenue)
+        FROM sales_rollups
+        WHERE granularity = 'hour'
+        GROUP BY 2
+    """)
+    op.execute("""
+        INSERT INTO pizza_sales_rollups (granularity, bucket, pizza_name, size, quantity, revenue)
+        SELECT 'day', substr(bucket, 1, 10) || ' 00:00:00.000000', pizza_name, size,
+               SUM(quantity), SUM(revenue)
+        FROM pizza_sales_rollups
+        WHERE granularity = 'hour'
+        GROUP BY 2, 3, 4
+    """)
+
+
+def downgrade():
+    op.drop_table('pizza_sales_rollups')
+    op.drop_table('sales_rollups')
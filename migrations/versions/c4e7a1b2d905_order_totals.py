@@ -0,0 +1,49 @@
+"""Totaux dénormalisés des commandes (total_amount, currency, item_count)
+
+Revision ID: c4e7a1b2d905
+Revises: 8b2d4e6f1a23
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a1b2d905'
+down_revision = '8b2d4e6f1a23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('orders')]
+    if 'item_count' in columns:
+        # Base créée par db.create_all() avec le schéma à jour
+        return
+
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('total_amount', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('currency', sa.String(3), nullable=False, server_default='EUR'))
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill en une seule requête
+    op.execute("""
+        UPDATE orders SET
+            item_count = (SELECT COUNT(*) FROM order_pizzas op
+                          WHERE op.order_id = orders.id),
+            total_amount = ROUND(COALESCE((SELECT SUM(p.price_amount)
+                                           FROM order_pizzas op JOIN pizzas p ON p.id = op.pizza_id
+                                           WHERE op.order_id = orders.id), 0), 2),
+            currency = COALESCE((SELECT p.price_currency
+                                 FROM order_pizzas op JOIN pizzas p ON p.id = op.pizza_id
+                                 WHERE op.order_id = orders.id
+                                 ORDER BY op.id DESC LIMIT 1), 'EUR')
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('item_count')
+        batch_op.drop_column('currency')
+        batch_op.drop_column('total_amount')
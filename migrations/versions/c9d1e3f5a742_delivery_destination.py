@@ -0,0 +1,33 @@
+"""Coordonnées de destination des livraisons (estimation de l'heure d'arrivée)
+
+Revision ID: c9d1e3f5a742
+Revises: b8e2d4f6a031
+Create Date: 2026-10-18 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d1e3f5a742'
+down_revision = 'b8e2d4f6a031'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('deliveries')]
+    if 'destination_latitude' in columns:
+        # Base créée par db.create_all() avec le schéma à jour
+        return
+
+    with op.batch_alter_table('deliveries') as batch_op:
+        batch_op.add_column(sa.Column('destination_latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('destination_longitude', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('deliveries') as batch_op:
+        batch_op.drop_column('destination_longitude')
+        batch_op.drop_column('destination_latitude')
@@ -0,0 +1,111 @@
+"""Dates de création des commandes en UTC (agrégats des ventes recalculés)
+
+Les commandes créées par l'API et par les données d'exemple étaient datées à
+l'heure locale du serveur (Order.created_at = datetime.now()), alors que les
+agrégats des ventes, les exports et les fenêtres d'analyse raisonnent en UTC.
+Les dates existantes sont converties depuis le fuseau local de la machine qui
+exécute la migration (celle qui les a écrites), puis les agrégats sont
+recalculés.
+
+Revision ID: d3a5c7e9f104
+Revises: c9d1e3f5a742
+Create Date: 2026-10-18 22:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import timezone
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a5c7e9f104'
+down_revision = 'c9d1e3f5a742'
+branch_labels = None
+depends_on = None
+
+orders = sa.table('orders', sa.column('id', sa.String), sa.column('created_at', sa.DateTime))
+
+
+def local_to_utc(value):
+    """Heure locale naïve -> UTC naïf"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def utc_to_local(value):
+    """UTC naïf -> heure locale naïve"""
+    return value.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+def convert_created_at(convert):
+    """Réécrit orders.created_at avec convert (seules les lignes modifiées)"""
+    bind = op.get_bind()
+    updates = []
+    for order_id, created_at in bind.execute(sa.select(orders.c.id, orders.c.created_at)):
+        if created_at is None:
+            continue
+        converted = convert(created_at)
+        if converted != created_at:
+            updates.append({'order_id': order_id, 'created_at': converted})
+
+    if updates:
+        bind.execute(
+            orders.update().where(orders.c.id == sa.bindparam('order_id'))
+            .values(created_at=sa.bindparam('created_at')),
+            updates
+        )
+
+
+def rebuild_sales_rollups():
+    """Recalcule les agrégats des ventes depuis les commandes (voir b8e2d4f6a031)"""
+    op.execute("DELETE FROM pizza_sales_rollups")
+    op.execute("DELETE FROM sales_rollups")
+    op.execute("""
+        INSERT INTO sales_rollups
+            (granularity, bucket, order_count, revenue, item_count, cancelled_count, cancelled_revenue)
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00.000000', created_at),
+               SUM(status != 'cancelled'),
+               SUM(CASE WHEN status != 'cancelled' THEN total_amount ELSE 0 END),
+               SUM(CASE WHEN status != 'cancelled' THEN item_count ELSE 0 END),
+               SUM(status = 'cancelled'),
+               SUM(CASE WHEN status = 'cancelled' THEN total_amount ELSE 0 END)
+        FROM orders
+        WHERE status != 'pending'
+        GROUP BY 2
+    """)
+    op.execute("""
+        INSERT INTO pizza_sales_rollups (granularity, bucket, pizza_name, size, quantity, revenue)
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00.000000', o.created_at), p.name, p.size,
+               COUNT(*), SUM(p.price_amount)
+        FROM order_pizzas op
+        JOIN orders o ON o.id = op.order_id
+        JOIN pizzas p ON p.id = op.pizza_id
+        WHERE o.status NOT IN ('pending', 'cancelled')
+        GROUP BY 2, 3, 4
+    """)
+    op.execute("""
+        INSERT INTO sales_rollups
+            (granularity, bucket, order_count, revenue, item_count, cancelled_count, cancelled_revenue)
+        SELECT 'day', substr(bucket, 1, 10) || ' 00:00:00.000000',
+               SUM(order_count), SUM(revenue), SUM(item_count), SUM(cancelled_count), SUM(cancelled_revenue)
+        FROM sales_rollups
+        WHERE granularity = 'hour'
+        GROUP BY 2
+    """)
+    op.execute("""
+        INSERT INTO pizza_sales_rollups (granularity, bucket, pizza_name, size, quantity, revenue)
+        SELECT 'day', substr(bucket, 1, 10) || ' 00:00:00.000000', pizza_name, size,
+               SUM(quantity), SUM(revenue)
+        FROM pizza_sales_rollups
+        WHERE granularity = 'hour'
+        GROUP BY 2, 3, 4
+    """)
+
+
+def upgrade():
+    convert_created_at(local_to_utc)
+    rebuild_sales_rollups()
+
+
+def downgrade():
+    convert_created_at(utc_to_local)
+    rebuild_sales_rollups()
@@ -0,0 +1,72 @@
+"""Garnitures normalisées (toppings, pizza_toppings)
+
+Revision ID: d5f8b3c6e217
+Revises: c4e7a1b2d905
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f8b3c6e217'
+down_revision = 'c4e7a1b2d905'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    toppings = sa.table('toppings', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    pizza_toppings = sa.table('pizza_toppings', sa.column('pizza_id', sa.String),
+                              sa.column('topping_id', sa.Integer))
+
+    # Les tables peuvent déjà exister si db.create_all() a été lancé au démarrage
+    if not sa.inspect(bind).has_table('toppings'):
+        op.create_table(
+            'toppings',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(100, collation='NOCASE'), nullable=False, unique=True),
+        )
+    if not sa.inspect(bind).has_table('pizza_toppings'):
+        op.create_table(
+            'pizza_toppings',
+            sa.Column('pizza_id', sa.String(36), sa.ForeignKey('pizzas.id'), primary_key=True),
+            sa.Column('topping_id', sa.Integer(), sa.ForeignKey('toppings.id'), primary_key=True),
+        )
+    op.create_index('ix_pizza_toppings_topping_id', 'pizza_toppings', ['topping_id', 'pizza_id'],
+                    if_not_exists=True)
+
+    if bind.execute(sa.text('SELECT COUNT(*) FROM pizza_toppings')).scalar():
+        return
+
+    # Backfill depuis la colonne JSON pizzas.toppings
+    topping_ids = {name.lower(): topping_id
+                   for topping_id, name in bind.execute(sa.text('SELECT id, name FROM toppings'))}
+    next_id = max(topping_ids.values(), default=0) + 1
+    new_toppings = []
+    links = []
+    for pizza_id, raw in bind.execute(sa.text('SELECT id, toppings FROM pizzas')).fetchall():
+        seen = set()
+        for name in json.loads(raw) if raw else []:
+            key = name.lower()
+            if key not in topping_ids:
+                topping_ids[key] = next_id
+                new_toppings.append({'id': next_id, 'name': name})
+                next_id += 1
+            if key not in seen:
+                seen.add(key)
+                links.append({'pizza_id': pizza_id, 'topping_id': topping_ids[key]})
+
+    if new_toppings:
+        op.bulk_insert(toppings, new_toppings)
+    if links:
+        op.bulk_insert(pizza_toppings, links)
+
+
+def downgrade():
+    op.drop_index('ix_pizza_toppings_topping_id', table_name='pizza_toppings')
+    op.drop_table('pizza_toppings')
+    op.drop_table('toppings')
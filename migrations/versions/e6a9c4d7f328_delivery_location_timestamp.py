@@ -0,0 +1,31 @@
+"""Horodatage de la dernière position (deliveries.location_updated_at)
+
+Revision ID: e6a9c4d7f328
+Revises: d5f8b3c6e217
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a9c4d7f328'
+down_revision = 'd5f8b3c6e217'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('deliveries')]
+    if 'location_updated_at' in columns:
+        # Base créée par db.create_all() avec le schéma à jour
+        return
+
+    with op.batch_alter_table('deliveries') as batch_op:
+        batch_op.add_column(sa.Column('location_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('deliveries') as batch_op:
+        batch_op.drop_column('location_updated_at')
@@ -0,0 +1,36 @@
+"""Historique compact des positions (delivery_track_chunks)
+
+Revision ID: f7b0d5e8a439
+Revises: e6a9c4d7f328
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b0d5e8a439'
+down_revision = 'e6a9c4d7f328'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('delivery_track_chunks'):
+        op.create_table(
+            'delivery_track_chunks',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('delivery_id', sa.String(36), sa.ForeignKey('deliveries.id'), nullable=False),
+            sa.Column('start_ts', sa.BigInteger(), nullable=False),
+            sa.Column('end_ts', sa.BigInteger(), nullable=False),
+            sa.Column('point_count', sa.Integer(), nullable=False),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+        )
+    op.create_index('ix_delivery_track_chunks_delivery_start', 'delivery_track_chunks',
+                    ['delivery_id', 'start_ts'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_delivery_track_chunks_delivery_start', table_name='delivery_track_chunks')
+    op.drop_table('delivery_track_chunks')
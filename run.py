@@ -1,7 +1,9 @@
 """
 Point d'entrée pour lancer l'application Flask
 """
-from app.app import app
+from app.app import create_app
+
+app = create_app()
 
 if __name__ == '__main__':
     print("🍕 Pizza Delivery API Starting...")
@@ -282,72 +282,34 @@ async function handlePlaceOrder() {
     try {
         showToast('Préparation de votre commande...', 'info');
 
-        // 1. Create Order
-        const orderResponse = await fetch('/orders', {
+        // 1. Checkout: order, pizzas, status and delivery in a single request
+        const checkoutResponse = await fetch('/checkout', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
                 customer_name: customerInfo.name,
-                customer_address: customerInfo.address
+                customer_address: customerInfo.address,
+                pizza_ids: cart.map(pizza => pizza.pizza_id),  // IDs des pizzas du catalogue
+                driver_name: 'Mario 🚗'
             })
         });
 
-        if (!orderResponse.ok) {
+        if (!checkoutResponse.ok) {
             throw new Error('Erreur lors de la création de la commande');
         }
 
-        const order = await orderResponse.json();
-        currentOrderId = order.order_id;
-
-        // 2. Add Pizzas to Order (using pizza_id from catalog)
-        for (const pizza of cart) {
-            const addPizzaResponse = await fetch(`/orders/${currentOrderId}/pizzas`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    pizza_id: pizza.pizza_id  // ID de la pizza du catalogue
-                })
-            });
-
-            if (!addPizzaResponse.ok) {
-                throw new Error('Erreur lors de l\'ajout d\'une pizza');
-            }
-        }
-
-        // 3. Update Order Status
-        await fetch(`/orders/${currentOrderId}/status`, {
-            method: 'PATCH',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                status: 'preparing'
-            })
-        });
-
-        // 4. Create Delivery
-        await fetch('/deliveries', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                order_id: currentOrderId,
-                driver_name: 'Mario 🚗'
-            })
-        });
+        const checkout = await checkoutResponse.json();
+        currentOrderId = checkout.order.order_id;
 
-        // 5. Display Order Summary
+        // 2. Display Order Summary
         displayOrderSummary();
         goToStep(3);
 
         showToast('Commande validée avec succès ! 🎉', 'success');
 
-        // 6. Start Order Tracking
+        // 3. Start Order Tracking
         startOrderTracking();
 
     } catch (error) {
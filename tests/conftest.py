@@ -0,0 +1,144 @@
+import pytest
+import json
+import time
+from sqlalchemy import event
+from app.app import create_app
+from app.config import TestingConfig
+from app.database import db
+from app.models.db_models import PizzaDB, OrderDB, DeliveryDB
+from app.active_deliveries import active_deliveries
+from app.catalog_cache import catalog_cache
+from app.delivery_stats import delivery_stats
+from app.eta import eta_engine
+from app.location_buffer import location_buffer
+
+
+def reset_process_caches():
+    """Vide les caches propres au processus, partagés entre les applications de test"""
+    active_deliveries.invalidate()
+    catalog_cache.clear()
+    delivery_stats.invalidate()
+    eta_engine.invalidate()
+    location_buffer.clear()
+
+
+@pytest.fixture
+def app():
+    """Application de test (base SQLite en mémoire)"""
+    return create_app(TestingConfig)
+
+
+@pytest.fixture
+def client(app):
+    """Fixture pour le client de test Flask"""
+    reset_process_caches()
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.session.remove()
+            db.drop_all()
+    reset_process_caches()
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Fuseau local du processus loin d'UTC (Pacific/Auckland), restauré après le test"""
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time.tzset() indisponible sur cette plateforme")
+    monkeypatch.setenv('TZ', 'Pacific/Auckland')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+# ==================== HELPERS PARTAGÉS ====================
+
+class QueryCounter:
+    """Compte les requêtes SQL émises sur le moteur pendant un bloc with"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Le BEGIN explicite des connexions SQLite n'est pas une requête
+        if not statement.startswith('BEGIN'):
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def create_pizza(client, name="Margherita", price=12.99, size="Medium", toppings=None):
+    """Crée une pizza du catalogue via l'API et retourne son identifiant"""
+    payload = {"name": name, "size": size, "price": price}
+    if toppings is not None:
+        payload["toppings"] = toppings
+    response = client.post('/pizzas', data=json.dumps(payload), content_type='application/json')
+    assert response.status_code == 201
+    return json.loads(response.data)['pizza_id']
+
+
+def checkout(client, payload):
+    """Appelle POST /checkout"""
+    return client.post('/checkout', data=json.dumps(payload), content_type='application/json')
+
+
+def place_order(client, pizza_ids, **fields):
+    """Passe une commande confirmée via POST /checkout et retourne {order, delivery}"""
+    response = checkout(client, {"customer_name": "John Doe", "customer_address": "123 Main St",
+                                 "pizza_ids": pizza_ids, **fields})
+    assert response.status_code == 201
+    return json.loads(response.data)
+
+
+def seed_orders(count, with_delivery=False):
+    """Insère `count` commandes de 2 pizzas (et leur livraison)"""
+    pizzas = [
+        PizzaDB(name=f"Pizza {i}", size="Medium", price_amount=10.0 + i, toppings='["cheese"]')
+        for i in range(3)
+    ]
+    db.session.add_all(pizzas)
+    db.session.flush()
+
+    for i in range(count):
+        order = OrderDB(customer_name=f"Client {i}", customer_address="1 Rue Test")
+        db.session.add(order)
+        db.session.flush()
+        order.add_pizza(pizzas[i % 3])
+        order.add_pizza(pizzas[(i + 1) % 3])
+        if with_delivery:
+            db.session.add(DeliveryDB(order_id=order.id, driver_name=f"Driver {i}"))
+
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def create_deliveries(count):
+    """Crée `count` livraisons et retourne leurs identifiants"""
+    ids = []
+    for i in range(count):
+        order = OrderDB(customer_name=f"Client {i}", customer_address="1 Rue Test")
+        db.session.add(order)
+        db.session.flush()
+        delivery = DeliveryDB(order_id=order.id, driver_name=f"Driver {i}")
+        db.session.add(delivery)
+        db.session.flush()
+        ids.append(delivery.id)
+    db.session.commit()
+    return ids
+
+
+def send_pings(client, pings):
+    """Appelle PATCH /deliveries/locations"""
+    response = client.patch('/deliveries/locations',
+                            data=json.dumps({"pings": pings}),
+                            content_type='application/json')
+    return response.status_code, json.loads(response.data)
@@ -0,0 +1,99 @@
+import pytest
+import json
+from app.database import db
+from tests.conftest import QueryCounter
+
+
+def create_delivery(client, customer_name, driver_name):
+    """Crée une commande et sa livraison, retourne l'identifiant de la livraison"""
+    order_response = client.post('/orders',
+                                 data=json.dumps({"customer_name": customer_name,
+                                                  "customer_address": "123 Main St"}),
+                                 content_type='application/json')
+    order_id = json.loads(order_response.data)['order_id']
+    delivery_response = client.post('/deliveries',
+                                    data=json.dumps({"order_id": order_id, "driver_name": driver_name}),
+                                    content_type='application/json')
+    return json.loads(delivery_response.data)['delivery_id']
+
+
+def delivery_ids(client, url):
+    """Identifiants des livraisons renvoyées par une URL de liste"""
+    response = client.get(url)
+    assert response.status_code == 200, response.data
+    return [delivery['delivery_id'] for delivery in json.loads(response.data)['deliveries']]
+
+
+class TestDeliveryFilters:
+    """Tests des filtres status= et driver= de GET /deliveries"""
+
+    def test_filter_by_status_and_driver(self, client):
+        """Test le filtrage par statut, par livreur et par les deux"""
+        mike_1 = create_delivery(client, "John Doe", "Mike")
+        mike_2 = create_delivery(client, "Jane Smith", "Mike")
+        sarah = create_delivery(client, "Bob Johnson", "Sarah")
+        client.patch(f'/deliveries/{mike_2}/start')
+
+        assert delivery_ids(client, '/deliveries?status=in_transit') == [mike_2]
+        assert delivery_ids(client, '/deliveries?driver=Mike') == [mike_1, mike_2]
+        assert delivery_ids(client, '/deliveries?status=assigned&driver=Mike') == [mike_1]
+        assert delivery_ids(client, '/deliveries?status=assigned,in_transit') == [mike_1, mike_2, sarah]
+
+    def test_invalid_status(self, client):
+        """Test qu'un statut inconnu est refusé"""
+        response = client.get('/deliveries?status=lost')
+        assert response.status_code == 400
+
+
+class TestActiveDeliveries:
+    """Tests du registre en mémoire des livraisons actives"""
+
+    def test_registry_follows_lifecycle(self, client):
+        """Test que création, démarrage, fin et annulation tiennent le registre à jour"""
+        first = create_delivery(client, "John Doe", "Mike")
+        assert delivery_ids(client, '/deliveries/active') == [first]
+
+        second = create_delivery(client, "Jane Smith", "Sarah")
+        client.patch(f'/deliveries/{first}/start')
+
+        with QueryCounter(db.engine) as counter:
+            response = client.get('/deliveries/active')
+        assert counter.count == 0
+
+        deliveries = json.loads(response.data)['deliveries']
+        assert [(d['delivery_id'], d['status']) for d in deliveries] == [(first, 'in_transit'), (second, 'assigned')]
+        assert delivery_ids(client, '/deliveries/active?driver=Sarah') == [second]
+
+        client.patch(f'/deliveries/{first}/complete')
+        client.patch(f'/deliveries/{second}/cancel',
+                     data=json.dumps({"reason": "Customer request"}),
+                     content_type='application/json')
+        assert delivery_ids(client, '/deliveries/active') == []
+
+    def test_registry_follows_locations(self, client):
+        """Test que les positions enregistrées apparaissent sur le tableau de bord"""
+        delivery_id = create_delivery(client, "John Doe", "Mike")
+        assert delivery_ids(client, '/deliveries/active') == [delivery_id]
+
+        client.patch('/deliveries/locations',
+                     data=json.dumps({"pings": [{"delivery_id": delivery_id, "lat": 48.85, "lon": 2.35}]}),
+                     content_type='application/json')
+
+        deliveries = json.loads(client.get('/deliveries/active').data)['deliveries']
+        assert (deliveries[0]['current_latitude'], deliveries[0]['current_longitude']) == (48.85, 2.35)
+
+    def test_rolled_back_batch_does_not_leak(self, client):
+        """Test qu'un batch annulé ne laisse pas de livraison fantôme dans le registre"""
+        order_id = json.loads(client.post('/orders',
+                                          data=json.dumps({"customer_name": "John Doe",
+                                                           "customer_address": "123 Main St"}),
+                                          content_type='application/json').data)['order_id']
+        assert delivery_ids(client, '/deliveries/active') == []
+
+        response = client.post('/batch', data=json.dumps({"atomic": True, "operations": [
+            {"method": "POST", "path": "/deliveries", "body": {"order_id": order_id, "driver_name": "Mike"}},
+            {"method": "GET", "path": "/orders/missing"}
+        ]}), content_type='application/json')
+        assert json.loads(response.data)['committed'] is False
+
+        assert delivery_ids(client, '/deliveries/active') == []
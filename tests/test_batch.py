@@ -0,0 +1,95 @@
+import pytest
+import json
+from app.database import db
+from app.models.db_models import OrderDB
+from tests.conftest import create_pizza, place_order
+
+
+def post_batch(client, operations, atomic=False):
+    """Appelle POST /batch et retourne (code, données)"""
+    response = client.post('/batch',
+                           data=json.dumps({"operations": operations, "atomic": atomic}),
+                           content_type='application/json')
+    return response.status_code, json.loads(response.data)
+
+
+def create_order(client, name="John Doe"):
+    """Crée une commande contenant une pizza, avec sa livraison"""
+    data = place_order(client, [create_pizza(client)], customer_name=name, driver_name="Mario")
+    return data['order']['order_id'], data['delivery']['delivery_id']
+
+
+class TestBatchEndpoint:
+    """Tests E2E pour POST /batch"""
+
+    def test_batch_executes_operations(self, client):
+        """Test qu'un batch exécute chaque opération et renvoie son résultat"""
+        order_id, delivery_id = create_order(client)
+
+        status, data = post_batch(client, [
+            {"method": "PATCH", "path": f"/orders/{order_id}/status", "body": {"status": "ready"}},
+            {"method": "PATCH", "path": f"/deliveries/{delivery_id}/start"},
+            {"method": "PATCH", "path": f"/deliveries/{delivery_id}/location",
+             "body": {"latitude": 48.8566, "longitude": 2.3522}},
+            {"method": "GET", "path": f"/deliveries/{delivery_id}?fields=status"},
+        ])
+
+        assert status == 200
+        assert data['committed'] is True
+        assert data['succeeded'] == 4
+        assert [result['status'] for result in data['results']] == [200, 200, 200, 200]
+        assert data['results'][3]['body'] == {"status": "in_transit"}
+
+        delivery = json.loads(client.get(f'/deliveries/{delivery_id}').data)
+        assert delivery['current_latitude'] == 48.8566
+        assert delivery['order']['status'] == "ready"
+
+    def test_batch_reports_partial_failures(self, client):
+        """Test qu'un échec n'annule que l'opération concernée"""
+        order_id, delivery_id = create_order(client)
+
+        status, data = post_batch(client, [
+            {"method": "PATCH", "path": f"/orders/{order_id}/status", "body": {"status": "ready"}},
+            {"method": "PATCH", "path": "/orders/unknown/status", "body": {"status": "ready"}},
+            {"method": "PATCH", "path": f"/deliveries/{delivery_id}/complete"},
+        ])
+
+        assert status == 200
+        assert data['committed'] is True
+        assert data['succeeded'] == 1
+        assert data['failed'] == 2
+        assert [result['status'] for result in data['results']] == [200, 404, 400]
+        assert db.session.get(OrderDB, order_id).status == "ready"
+
+    def test_atomic_batch_rolls_back_everything(self, client):
+        """Test qu'un batch atomique est entièrement annulé au premier échec"""
+        order_id, delivery_id = create_order(client)
+
+        status, data = post_batch(client, [
+            {"method": "PATCH", "path": f"/orders/{order_id}/status", "body": {"status": "ready"}},
+            {"method": "PATCH", "path": f"/deliveries/{delivery_id}/complete"},
+            {"method": "PATCH", "path": f"/deliveries/{delivery_id}/start"},
+        ], atomic=True)
+
+        assert status == 200
+        assert data['committed'] is False
+        assert len(data['results']) == 2
+        db.session.expire_all()
+        assert db.session.get(OrderDB, order_id).status == "preparing"
+
+    def test_batch_rejects_invalid_operations(self, client):
+        """Test la validation des opérations"""
+        status, data = post_batch(client, [
+            {"method": "PUT", "path": "/orders"},
+            {"method": "POST", "path": "/batch", "body": {"operations": []}},
+            {"path": "/orders"},
+            {"method": "GET", "path": "/nowhere"},
+        ])
+
+        assert status == 200
+        assert [result['status'] for result in data['results']] == [400, 400, 400, 404]
+
+    def test_batch_requires_operations(self, client):
+        """Test qu'une liste d'opérations est obligatoire"""
+        response = client.post('/batch', data=json.dumps({}), content_type='application/json')
+        assert response.status_code == 400
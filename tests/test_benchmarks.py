@@ -0,0 +1,66 @@
+import pytest
+import urllib.parse
+from app.app import create_app
+from app.config import TestingConfig
+from app.database import db
+from app.seeds.synthetic import generate_dataset
+from benchmarks.endpoints import FlaskClientTransport, prepare_fixtures, run_scenarios, scenarios, percentile
+
+TOKEN = 'bench-token'
+
+# Routes volontairement absentes du benchmark
+UNBENCHMARKED_ENDPOINTS = {'static'}
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Application de test peuplée d'un petit jeu synthétique, profilage activé"""
+    config = type('BenchConfig', (TestingConfig,), {'PROFILING_TOKEN': TOKEN, 'PROFILE_DIR': str(tmp_path)})
+    app = create_app(config)
+
+    with app.app_context():
+        db.create_all()
+        generate_dataset(50, seed=1)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+class TestEndpointBenchmark:
+    """Vérifie que le benchmark des endpoints reste exécutable"""
+
+    def test_every_scenario_succeeds(self, app):
+        """Test que chaque scénario s'exécute sans erreur et compte les requêtes SQL"""
+        with FlaskClientTransport(app) as transport:
+            results = run_scenarios(transport, 3, 1, TOKEN)
+
+        assert [result['route'] for result in results if result['errors']] == []
+        assert all(result['statements_per_request'] is not None for result in results)
+
+    def test_every_route_has_a_scenario(self, app):
+        """Test que chaque route de l'application est appelée par un scénario"""
+        with FlaskClientTransport(app) as transport:
+            fixtures = prepare_fixtures(transport, 1, TOKEN)
+
+        adapter = app.url_map.bind('localhost')
+        covered = set()
+        for name, method, build, _ in scenarios(fixtures):
+            path = urllib.parse.urlsplit(build(0)[0]).path
+            covered.add(adapter.match(path, method=method)[0])
+
+        routes = {rule.endpoint for rule in app.url_map.iter_rules()} - UNBENCHMARKED_ENDPOINTS
+        assert routes - covered == set()
+
+    def test_profile_routes_skipped_without_token(self, app):
+        """Test que les routes /profiles sont ignorées sans jeton administrateur"""
+        with FlaskClientTransport(app) as transport:
+            fixtures = prepare_fixtures(transport, 1)
+
+        assert 'list_profiles' not in [name for name, *_ in scenarios(fixtures)]
+
+    def test_percentile(self):
+        """Test le calcul des percentiles par rang"""
+        values = list(range(1, 101))
+        assert percentile(values, 0.50) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([7], 0.95) == 7
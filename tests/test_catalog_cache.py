@@ -0,0 +1,70 @@
+import pytest
+import json
+from app.database import db
+from tests.conftest import QueryCounter, create_pizza
+
+
+class TestCatalogCache:
+    """Tests E2E pour le cache versionné du catalogue"""
+
+    def test_catalog_has_strong_etag(self, client):
+        """Test que le catalogue est servi avec un ETag fort"""
+        create_pizza(client, "Margherita")
+
+        response = client.get('/pizzas/catalog')
+        assert response.status_code == 200
+        etag, weak = response.get_etag()
+        assert etag
+        assert not weak
+        assert json.loads(response.data)['count'] == 1
+
+    def test_if_none_match_returns_304(self, client):
+        """Test qu'un ETag à jour donne une réponse 304 sans corps"""
+        create_pizza(client, "Margherita")
+        etag = client.get('/pizzas/catalog').headers['ETag']
+
+        response = client.get('/pizzas/catalog', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_create_pizza_invalidates_catalog(self, client):
+        """Test que la création d'une pizza change la version du catalogue"""
+        create_pizza(client, "Margherita")
+        first = client.get('/pizzas/catalog')
+
+        create_pizza(client, "Pepperoni")
+        response = client.get('/pizzas/catalog', headers={'If-None-Match': first.headers['ETag']})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != first.headers['ETag']
+        assert json.loads(response.data)['count'] == 2
+
+    def test_cache_hit_only_reads_version(self, client):
+        """Test qu'un cache à jour ne relit que le tampon de version"""
+        create_pizza(client, "Margherita", size="Small")
+        create_pizza(client, "Margherita", size="Large")
+        client.get('/pizzas/catalog')
+
+        with QueryCounter(db.engine) as counter:
+            response = client.get('/pizzas/catalog')
+
+        assert response.status_code == 200
+        assert len(json.loads(response.data)['catalog'][0]['sizes']) == 2
+        assert counter.count == 1
+
+    def test_ordered_pizza_stays_in_catalog(self, client):
+        """Test qu'une pizza commandée reste dans le catalogue"""
+        pizza_id = create_pizza(client, "Margherita")
+        order_response = client.post('/orders',
+                                     data=json.dumps({"customer_name": "John Doe",
+                                                      "customer_address": "123 Main St"}),
+                                     content_type='application/json')
+        order_id = json.loads(order_response.data)['order_id']
+        client.post(f'/orders/{order_id}/pizzas',
+                    data=json.dumps({"pizza_id": pizza_id}),
+                    content_type='application/json')
+
+        catalog = json.loads(client.get('/pizzas/catalog').data)
+        assert catalog['count'] == 1
+        pizzas = json.loads(client.get('/pizzas').data)
+        assert pizzas['count'] == 1
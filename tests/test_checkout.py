@@ -0,0 +1,79 @@
+import pytest
+import json
+from app.models.db_models import OrderDB, OrderPizzaDB, DeliveryDB
+from tests.conftest import create_pizza, checkout
+
+
+class TestCheckout:
+    """Tests E2E pour POST /checkout"""
+
+    def test_checkout_creates_everything(self, client):
+        """Test qu'un checkout crée commande, lignes, statut et livraison"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        pepperoni = create_pizza(client, "Pepperoni", 14.5)
+
+        response = checkout(client, {
+            "customer_name": "John Doe",
+            "customer_address": "123 Main St",
+            "pizza_ids": [margherita, pepperoni, margherita],
+            "driver_name": "Mario"
+        })
+
+        assert response.status_code == 201
+        data = json.loads(response.data)
+        assert data['order']['status'] == "preparing"
+        assert data['order']['total'] == 40.48
+        assert data['order']['item_count'] == 3
+        assert len(data['order']['pizzas']) == 3
+        assert data['delivery']['driver_name'] == "Mario"
+        assert data['delivery']['order_id'] == data['order']['order_id']
+
+        order = json.loads(client.get(f"/orders/{data['order']['order_id']}").data)
+        assert order['total'] == 40.48
+        assert len(order['pizzas']) == 3
+
+    def test_checkout_without_driver(self, client):
+        """Test qu'un checkout sans livreur ne crée pas de livraison"""
+        pizza_id = create_pizza(client, "Margherita", 12.99)
+
+        response = checkout(client, {"customer_name": "John Doe",
+                                     "customer_address": "123 Main St",
+                                     "pizza_ids": [pizza_id]})
+
+        assert response.status_code == 201
+        assert json.loads(response.data)['delivery'] is None
+        assert DeliveryDB.query.count() == 0
+
+    def test_checkout_unknown_pizza_is_atomic(self, client):
+        """Test qu'une pizza inconnue n'écrit rien en base"""
+        pizza_id = create_pizza(client, "Margherita", 12.99)
+
+        response = checkout(client, {"customer_name": "John Doe",
+                                     "customer_address": "123 Main St",
+                                     "pizza_ids": [pizza_id, "unknown"],
+                                     "driver_name": "Mario"})
+
+        assert response.status_code == 404
+        assert OrderDB.query.count() == 0
+        assert OrderPizzaDB.query.count() == 0
+
+    def test_checkout_requires_pizzas(self, client):
+        """Test qu'un panier vide est refusé"""
+        response = checkout(client, {"customer_name": "John Doe",
+                                     "customer_address": "123 Main St",
+                                     "pizza_ids": []})
+        assert response.status_code == 400
+
+    def test_checkout_invalid_pizza_ids(self, client):
+        """Test que pizza_ids doit être une liste d'identifiants"""
+        for pizza_ids in ([{"x": 1}], [["a"]], [1], [None], "abc", {"a": 1}):
+            response = checkout(client, {"customer_name": "John Doe",
+                                         "customer_address": "123 Main St",
+                                         "pizza_ids": pizza_ids})
+            assert response.status_code == 400, pizza_ids
+        assert OrderDB.query.count() == 0
+
+    def test_checkout_missing_field(self, client):
+        """Test qu'un champ obligatoire manquant est refusé"""
+        response = checkout(client, {"customer_name": "John Doe", "pizza_ids": ["x"]})
+        assert response.status_code == 400
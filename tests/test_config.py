@@ -0,0 +1,92 @@
+import pytest
+import sqlite3
+from sqlalchemy import create_engine
+from app.config import Config, ProductionConfig, get_config
+from app.app import create_app
+from app.config import TestingConfig
+from app.database import db, configure_sqlite_pragmas
+from app.models.db_models import OrderDB
+
+
+class TestConfig:
+    """Tests des profils de configuration"""
+
+    def test_get_config(self, monkeypatch):
+        """Test la sélection du profil par nom ou par PIZZA_CONFIG"""
+        assert get_config('production') is ProductionConfig
+        monkeypatch.delenv('PIZZA_CONFIG', raising=False)
+        assert get_config() is Config
+        monkeypatch.setenv('PIZZA_CONFIG', 'production')
+        assert get_config() is ProductionConfig
+
+    def test_unknown_config(self):
+        """Test qu'un profil inconnu est refusé"""
+        with pytest.raises(ValueError):
+            get_config('staging')
+
+    def test_production_pragmas_applied(self, tmp_path):
+        """Test que chaque connexion reçoit les PRAGMA du profil de production"""
+        engine = create_engine('sqlite:///' + str(tmp_path / 'prod.db'),
+                               **ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS)
+        configure_sqlite_pragmas(engine, ProductionConfig.SQLITE_PRAGMAS)
+
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+            assert conn.exec_driver_sql('PRAGMA cache_size').scalar() == -65536
+        engine.dispose()
+
+    def test_invalid_pragma(self):
+        """Test qu'une valeur de PRAGMA non littérale est refusée"""
+        engine = create_engine('sqlite://')
+        with pytest.raises(ValueError):
+            configure_sqlite_pragmas(engine, {'journal_mode': 'WAL; DROP TABLE orders'})
+
+    def test_transaction_listeners_scoped_to_app_engine(self):
+        """Test que seul le moteur de l'application pilote ses transactions SQLite"""
+        app = create_app(TestingConfig)
+        with app.app_context():
+            with db.engine.connect() as conn:
+                assert conn.connection.dbapi_connection.isolation_level is None
+
+        engine = create_engine('sqlite://')
+        with engine.connect() as conn:
+            assert conn.connection.dbapi_connection.isolation_level == ''
+        engine.dispose()
+
+    def test_write_requests_reserve_write_lock(self, tmp_path):
+        """Test que les requêtes d'écriture ouvrent leur transaction par BEGIN IMMEDIATE"""
+        path = str(tmp_path / 'prod.db')
+        config = type('FileProductionConfig', (ProductionConfig,), {
+            'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path
+        })
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+
+        def other_writer_blocked():
+            """Un autre processus peut-il réserver le verrou d'écriture ?"""
+            other = sqlite3.connect(path, timeout=0, isolation_level=None)
+            try:
+                other.execute('BEGIN IMMEDIATE')
+                other.execute('ROLLBACK')
+                return False
+            except sqlite3.OperationalError:
+                return True
+            finally:
+                other.close()
+
+        # Lecture puis écriture : le verrou est réservé dès la lecture
+        with app.test_request_context('/orders', method='POST'):
+            db.session.execute(db.select(OrderDB.id)).all()
+            assert other_writer_blocked()
+            db.session.rollback()
+
+        with app.test_request_context('/orders', method='GET'):
+            db.session.execute(db.select(OrderDB.id)).all()
+            assert not other_writer_blocked()
+            db.session.rollback()
+
+        with app.app_context():
+            db.engine.dispose()
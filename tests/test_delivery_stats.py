@@ -0,0 +1,169 @@
+import pytest
+import json
+from datetime import datetime, timedelta
+from app.database import db
+from app.delivery_stats import compute_delivery_stats, DeliveryStatsCache
+from app.models.db_models import OrderDB, DeliveryDB
+from app.seeds.synthetic import generate_dataset
+
+WINDOW_START = datetime(2025, 1, 1)
+WINDOW_END = datetime(2025, 1, 8)
+
+
+def add_delivery(driver, minutes, status='delivered', created_at=datetime(2025, 1, 2, 12)):
+    """Ajoute une livraison de `minutes` minutes (None : non terminée)"""
+    order = OrderDB(customer_name="Client", customer_address="1 Rue Test")
+    db.session.add(order)
+    db.session.flush()
+    started_at = created_at + timedelta(minutes=5)
+    db.session.add(DeliveryDB(
+        order_id=order.id, driver_name=driver, status=status, created_at=created_at,
+        started_at=started_at,
+        completed_at=started_at + timedelta(minutes=minutes) if minutes is not None else None
+    ))
+
+
+def analytics(client, query='?from=2025-01-01&to=2025-01-08'):
+    """Appelle GET /analytics/deliveries"""
+    response = client.get(f'/analytics/deliveries{query}')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+class TestComputeDeliveryStats:
+    """Tests unitaires du calcul vectorisé"""
+
+    def test_percentiles_and_on_time_rate(self, client):
+        """Test des percentiles, de la moyenne et du taux de ponctualité"""
+        for minutes in range(1, 101):
+            add_delivery("Mario", minutes)
+        db.session.commit()
+
+        stats = compute_delivery_stats(WINDOW_START, WINDOW_END, target_minutes=30)
+
+        assert stats['deliveries'] == 100
+        assert stats['duration_seconds']['p50'] == pytest.approx(50.5 * 60)
+        assert stats['duration_seconds']['p90'] == pytest.approx(90.1 * 60)
+        assert stats['duration_seconds']['p99'] == pytest.approx(99.01 * 60)
+        assert stats['duration_seconds']['mean'] == pytest.approx(50.5 * 60)
+        assert stats['on_time_rate'] == 0.3
+
+    def test_per_driver_breakdown(self, client):
+        """Test du détail par livreur, trié par nombre de livraisons"""
+        for minutes in (10, 20, 40):
+            add_delivery("Luigi", minutes)
+        add_delivery("Mario", 25)
+        db.session.commit()
+
+        drivers = compute_delivery_stats(WINDOW_START, WINDOW_END)['drivers']
+
+        assert [driver['driver_name'] for driver in drivers] == ['Luigi', 'Mario']
+        assert drivers[0]['deliveries'] == 3
+        assert drivers[0]['duration_seconds']['p50'] == 20 * 60
+        assert drivers[0]['on_time_rate'] == pytest.approx(2 / 3, abs=1e-4)
+        assert drivers[1]['duration_seconds']['mean'] == 25 * 60
+        assert drivers[1]['on_time_rate'] == 1
+
+    def test_only_completed_deliveries_in_window(self, client):
+        """Test que seules les livraisons terminées créées dans la fenêtre comptent"""
+        add_delivery("Mario", 20)
+        add_delivery("Mario", None, status='in_transit')
+        add_delivery("Mario", 20, status='cancelled')
+        add_delivery("Mario", 20, created_at=datetime(2025, 1, 8))
+        add_delivery("Mario", 20, created_at=datetime(2024, 12, 31, 23))
+        db.session.commit()
+
+        assert compute_delivery_stats(WINDOW_START, WINDOW_END)['deliveries'] == 1
+
+    def test_empty_window(self, client):
+        """Test d'une fenêtre sans livraison"""
+        stats = compute_delivery_stats(WINDOW_START, WINDOW_END)
+
+        assert stats['deliveries'] == 0
+        assert stats['duration_seconds'] is None
+        assert stats['drivers'] == []
+
+    def test_matches_row_by_row_durations(self, client):
+        """Test que les durées vectorisées égalent Delivery.calculate_duration()"""
+        generate_dataset(300, days=3, seed=7)
+        end = datetime.utcnow() + timedelta(days=1)
+        start = end - timedelta(days=5)
+
+        stats = compute_delivery_stats(start, end)
+
+        durations = sorted(
+            (delivery.completed_at - delivery.started_at).total_seconds()
+            for delivery in DeliveryDB.query.filter_by(status='delivered').all()
+        )
+        assert stats['deliveries'] == len(durations)
+        assert stats['duration_seconds']['mean'] == pytest.approx(sum(durations) / len(durations), abs=0.1)
+        assert sum(driver['deliveries'] for driver in stats['drivers']) == len(durations)
+
+
+class TestDeliveryStatsCache:
+    """Tests du cache par fenêtre"""
+
+    def test_results_are_cached(self, client):
+        """Test qu'une même fenêtre est servie depuis le cache"""
+        cache = DeliveryStatsCache()
+        add_delivery("Mario", 20)
+        db.session.commit()
+        first = cache.get('key', WINDOW_START, WINDOW_END)
+
+        add_delivery("Mario", 40)
+        db.session.commit()
+
+        assert cache.get('key', WINDOW_START, WINDOW_END) is first
+        cache.invalidate()
+        assert cache.get('key', WINDOW_START, WINDOW_END)['deliveries'] == 2
+
+    def test_expired_and_evicted_entries(self, client):
+        """Test de l'expiration et de l'éviction des fenêtres les moins récentes"""
+        cache = DeliveryStatsCache(max_age=0, max_entries=2)
+        first = cache.get('a', WINDOW_START, WINDOW_END)
+        assert cache.get('a', WINDOW_START, WINDOW_END) is not first
+
+        cache = DeliveryStatsCache(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.get(key, WINDOW_START, WINDOW_END)
+        assert list(cache._entries) == ['b', 'c']
+
+    def test_completion_invalidates_cache(self, client):
+        """Test que terminer une livraison vide le cache de l'endpoint"""
+        order_id = json.loads(client.post('/orders', data=json.dumps(
+            {"customer_name": "John Doe", "customer_address": "123 Main St"}
+        ), content_type='application/json').data)['order_id']
+        delivery_id = json.loads(client.post('/deliveries', data=json.dumps(
+            {"order_id": order_id, "driver_name": "Mario"}
+        ), content_type='application/json').data)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+
+        assert analytics(client, '')['deliveries'] == 0
+        client.patch(f'/deliveries/{delivery_id}/complete')
+        assert analytics(client, '')['deliveries'] == 1
+
+
+class TestDeliveryAnalyticsEndpoint:
+    """Tests E2E de GET /analytics/deliveries"""
+
+    def test_response(self, client):
+        """Test du document renvoyé"""
+        add_delivery("Mario", 20)
+        add_delivery("Mario", 45)
+        db.session.commit()
+
+        data = analytics(client, '?from=2025-01-01&to=2025-01-08&target=40')
+
+        assert data['from'] == '2025-01-01T00:00:00'
+        assert data['target_minutes'] == 40
+        assert data['deliveries'] == 2
+        assert data['on_time_rate'] == 0.5
+        assert data['drivers'][0]['driver_name'] == 'Mario'
+        assert 'computed_at' in data
+
+    def test_invalid_parameters(self, client):
+        """Test des paramètres invalides"""
+        assert client.get('/analytics/deliveries?from=never').status_code == 400
+        assert client.get('/analytics/deliveries?from=2025-02-01&to=2025-01-01').status_code == 400
+        assert client.get('/analytics/deliveries?target=0').status_code == 400
+        assert client.get('/analytics/deliveries?target=soon').status_code == 400
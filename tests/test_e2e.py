@@ -1,21 +1,5 @@
 import pytest
 import json
-from app.app import app
-from app.database import db
-
-
-@pytest.fixture
-def client():
-    """Fixture pour le client de test Flask"""
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            yield client
-            db.session.remove()
-            db.drop_all()
 
 
 class TestHealthEndpoint:
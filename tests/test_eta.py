@@ -0,0 +1,355 @@
+import pytest
+import json
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+from app.database import db
+from app.eta import (eta_engine, haversine_km, parse_destination, load_speed_profile,
+                     SpeedProfile, DEFAULT_SPEED_KMH, DEFAULT_DURATION_SECONDS)
+from app.models import Order, Delivery
+from app.models.db_models import OrderDB, DeliveryDB
+from app.tracks import append_points, to_epoch_ms
+from tests.conftest import QueryCounter
+
+DESTINATION = (48.8566, 2.3522)
+KM_PER_DEGREE_LAT = 111.195
+
+
+def north_of_destination(km):
+    """Point situé à `km` kilomètres au nord de la destination"""
+    return DESTINATION[0] + km / KM_PER_DEGREE_LAT, DESTINATION[1]
+
+
+def create_delivery(client, destination=DESTINATION):
+    """Crée une commande et sa livraison, avec ou sans destination"""
+    order_id = json.loads(client.post('/orders', data=json.dumps({
+        "customer_name": "John Doe", "customer_address": "123 Main St"
+    }), content_type='application/json').data)['order_id']
+
+    body = {"order_id": order_id, "driver_name": "Mike"}
+    if destination is not None:
+        body.update(destination_latitude=destination[0], destination_longitude=destination[1])
+    response = client.post('/deliveries', data=json.dumps(body), content_type='application/json')
+    assert response.status_code == 201
+    return json.loads(response.data)
+
+
+def get_eta(client, delivery_id):
+    """Appelle GET /deliveries/<id>/eta"""
+    response = client.get(f'/deliveries/{delivery_id}/eta')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+def move(client, delivery_id, km):
+    """Envoie une position à `km` kilomètres de la destination"""
+    lat, lon = north_of_destination(km)
+    response = client.patch(f'/deliveries/{delivery_id}/location',
+                            data=json.dumps({"latitude": lat, "longitude": lon}),
+                            content_type='application/json')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+def add_trip(departure, km, minutes):
+    """Ajoute une livraison terminée partie à `km` km de la destination, en `minutes` minutes"""
+    order = OrderDB(customer_name="Client", customer_address="1 Rue Test", status="delivered")
+    db.session.add(order)
+    db.session.flush()
+    delivery = DeliveryDB(
+        order_id=order.id, driver_name="Mario", status='delivered', created_at=departure,
+        started_at=departure, completed_at=departure + timedelta(minutes=minutes),
+        destination_latitude=DESTINATION[0], destination_longitude=DESTINATION[1]
+    )
+    db.session.add(delivery)
+    db.session.flush()
+    append_points({delivery.id: [(to_epoch_ms(departure), *north_of_destination(km)),
+                                 (to_epoch_ms(departure) + 60000, *north_of_destination(km / 2))]})
+
+
+class TestGeometry:
+    """Tests unitaires de la distance et de la destination"""
+
+    def test_haversine(self):
+        """Test de la distance orthodromique Paris - Londres"""
+        assert haversine_km(48.8566, 2.3522, 51.5074, -0.1278) == pytest.approx(343.5, abs=0.5)
+        assert haversine_km(*DESTINATION, *DESTINATION) == 0
+
+    def test_parse_destination(self):
+        """Test de la validation de la destination"""
+        assert parse_destination({}) == (None, None)
+        assert parse_destination({"destination_latitude": 48, "destination_longitude": 2}) == (48.0, 2.0)
+
+        for data in ({"destination_latitude": 48},
+                     {"destination_latitude": "48", "destination_longitude": 2},
+                     {"destination_latitude": 91, "destination_longitude": 2},
+                     {"destination_latitude": True, "destination_longitude": 2}):
+            with pytest.raises(ValueError):
+                parse_destination(data)
+
+    def test_domain_estimated_time(self):
+        """Test que Delivery.get_estimated_time() utilise la distance restante"""
+        delivery = Delivery(order=Order(customer_name="Henry Iron", customer_address="369 Spruce Blvd"),
+                            driver_name="Nina Driver")
+        assert delivery.get_estimated_time() == DEFAULT_DURATION_SECONDS // 60
+
+        delivery.set_destination(*DESTINATION)
+        delivery.start_delivery()
+        delivery.update_location(*north_of_destination(5))
+        assert delivery.get_estimated_time() == 15  # 5 km à 20 km/h
+
+        delivery.complete_delivery()
+        assert delivery.get_estimated_time() == 0
+
+    def test_domain_estimated_time_without_app_layer(self):
+        """Test que l'estimation du domaine n'importe ni Flask, ni SQLAlchemy, ni NumPy"""
+        code = (
+            "import sys\n"
+            "from datetime import datetime, timedelta\n"
+            "from app.models import Delivery, Order\n"
+            "delivery = Delivery(order=Order(customer_name='A', customer_address='B'), driver_name='C')\n"
+            "delivery.start_delivery()\n"
+            "print(delivery.get_estimated_time(now=delivery.started_at + timedelta(minutes=10)))\n"
+            "print(sorted(m for m in ('flask', 'sqlalchemy', 'numpy') if m in sys.modules))\n"
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+        assert output.split('\n')[:2] == [str(DEFAULT_DURATION_SECONDS // 60 - 10), '[]']
+
+
+class TestSpeedProfile:
+    """Tests de l'apprentissage du profil de vitesse"""
+
+    def test_profile_learned_by_hour(self, client):
+        """Test de la vitesse médiane d'une heure et du repli sur la médiane globale"""
+        departure = (datetime.utcnow() - timedelta(days=1)).replace(hour=12, minute=0, second=0, microsecond=0)
+        for minutes in (20, 30, 30, 30, 40):
+            add_trip(departure, 6, minutes)
+        db.session.commit()
+
+        profile = load_speed_profile()
+
+        assert profile.trips == 5
+        assert profile.deliveries == 5
+        assert profile.speed_kmh(12) == pytest.approx(12, rel=1e-3)  # 6 km en 30 min
+        assert profile.speed_kmh(3) == pytest.approx(12, rel=1e-3)
+        assert profile.duration_seconds(12) == 30 * 60
+
+    def test_profile_defaults_without_history(self, client):
+        """Test des valeurs par défaut sans livraison terminée"""
+        add_trip(datetime.utcnow() - timedelta(days=1), 6, 30)
+        db.session.commit()
+
+        profile = load_speed_profile()
+
+        assert profile.trips == 1
+        assert profile.speed_kmh(12) == DEFAULT_SPEED_KMH
+        assert profile.duration_seconds(12) == DEFAULT_DURATION_SECONDS
+
+    def test_old_and_implausible_trips_ignored(self, client):
+        """Test que l'historique trop ancien et les vitesses aberrantes sont ignorés"""
+        recent = datetime.utcnow() - timedelta(hours=2)
+        add_trip(datetime.utcnow() - timedelta(days=60), 6, 30)
+        add_trip(recent, 6, 1)  # 360 km/h
+        add_trip(recent, 0.01, 30)  # départ à la destination
+        db.session.commit()
+
+        assert load_speed_profile().trips == 0
+
+    def test_profile_reloaded_outside_request(self, app, client, monkeypatch):
+        """Test que la requête qui déclenche le rechargement du profil ne l'attend pas"""
+        release = threading.Event()
+
+        def slow_profile():
+            assert release.wait(5)
+            return SpeedProfile(speeds=[12.0] * 24, trips=5)
+
+        monkeypatch.setattr('app.eta.load_speed_profile', slow_profile)
+        app.config['ETA_PROFILE_BACKGROUND'] = True
+        eta_engine.invalidate()
+
+        assert create_delivery(client)['eta']['method'] == 'history'
+        assert eta_engine.profile.trips == 0
+
+        release.set()
+        eta_engine._reload_thread.join(5)
+        assert eta_engine.profile.speed_kmh(12) == 12.0
+
+
+class TestEtaEndpoint:
+    """Tests E2E de GET /deliveries/<id>/eta et du document de livraison"""
+
+    def test_eta_from_distance(self, client):
+        """Test de l'ETA calculée depuis la position et la destination"""
+        delivery_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+        document = move(client, delivery_id, 5)
+
+        assert document['destination_latitude'] == DESTINATION[0]
+        assert document['eta']['method'] == 'distance'
+        assert document['eta']['distance_km'] == pytest.approx(5, abs=0.01)
+        assert document['eta']['speed_kmh'] == DEFAULT_SPEED_KMH
+
+        data = get_eta(client, delivery_id)
+        assert data['delivery_id'] == delivery_id
+        assert data['status'] == 'in_transit'
+        assert data['eta']['remaining_seconds'] == pytest.approx(15 * 60, abs=5)
+
+    def test_eta_served_from_cache(self, client):
+        """Test qu'une ETA en cache est lue sans requête SQL"""
+        delivery_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+        move(client, delivery_id, 5)
+
+        with QueryCounter(db.engine) as counter:
+            data = get_eta(client, delivery_id)
+        assert counter.count == 0
+        assert data['eta']['method'] == 'distance'
+
+    def test_eta_recomputed_on_location_updates(self, client):
+        """Test que les positions reçues en masse recalculent l'ETA en cache"""
+        delivery_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+        move(client, delivery_id, 5)
+        assert get_eta(client, delivery_id)['eta']['distance_km'] == pytest.approx(5, abs=0.01)
+
+        lat, lon = north_of_destination(2)
+        client.patch('/deliveries/locations',
+                     data=json.dumps({"pings": [{"delivery_id": delivery_id, "lat": lat, "lon": lon}]}),
+                     content_type='application/json')
+
+        with QueryCounter(db.engine) as counter:
+            data = get_eta(client, delivery_id)
+        assert counter.count == 0
+        assert data['eta']['distance_km'] == pytest.approx(2, abs=0.01)
+        assert data['eta']['remaining_seconds'] == pytest.approx(6 * 60, abs=5)
+
+    def test_eta_uses_learned_profile(self, client):
+        """Test que l'ETA utilise la vitesse apprise pour l'heure de la position"""
+        now = datetime.utcnow()
+        for _ in range(5):
+            add_trip(now - timedelta(hours=1), 6, 30)
+        db.session.commit()
+        eta_engine.invalidate()
+
+        delivery_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+        eta = move(client, delivery_id, 3)['eta']
+
+        assert eta['speed_kmh'] == pytest.approx(12, abs=0.1)
+        assert eta['remaining_seconds'] == pytest.approx(15 * 60, abs=5)
+
+    def test_eta_from_history_without_destination(self, client):
+        """Test du repli sur la durée habituelle sans destination"""
+        delivery_id = create_delivery(client, destination=None)['delivery_id']
+        started = json.loads(client.patch(f'/deliveries/{delivery_id}/start').data)
+
+        eta = get_eta(client, delivery_id)['eta']
+        assert eta['method'] == 'history'
+        assert eta['distance_km'] is None
+        assert datetime.fromisoformat(eta['estimated_arrival']) == \
+            datetime.fromisoformat(started['started_at']) + timedelta(seconds=DEFAULT_DURATION_SECONDS)
+
+    def test_eta_after_completion_and_cancellation(self, client):
+        """Test de l'ETA d'une livraison terminée ou annulée"""
+        delivered_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivered_id}/start')
+        completed = json.loads(client.patch(f'/deliveries/{delivered_id}/complete').data)
+        eta = get_eta(client, delivered_id)['eta']
+        assert eta['method'] == 'delivered'
+        assert eta['remaining_seconds'] == 0
+        assert eta['estimated_arrival'] == completed['completed_at']
+
+        cancelled_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{cancelled_id}/cancel', data=json.dumps({"reason": "Customer request"}),
+                     content_type='application/json')
+        data = get_eta(client, cancelled_id)
+        assert data['status'] == 'cancelled'
+        assert data['eta']['estimated_arrival'] is None
+
+    def test_eta_unknown_delivery(self, client):
+        """Test de l'ETA d'une livraison inexistante"""
+        response = client.get('/deliveries/unknown/eta')
+        assert response.status_code == 404
+
+    def test_invalid_destination(self, client):
+        """Test qu'une destination invalide est refusée"""
+        order_id = json.loads(client.post('/orders', data=json.dumps({
+            "customer_name": "John Doe", "customer_address": "123 Main St"
+        }), content_type='application/json').data)['order_id']
+
+        response = client.post('/deliveries', data=json.dumps({
+            "order_id": order_id, "driver_name": "Mike", "destination_latitude": 48.85
+        }), content_type='application/json')
+        assert response.status_code == 400
+
+    def test_batch_positions_not_cached(self, client):
+        """Test qu'une position envoyée dans un batch annulé ne reste pas dans le cache"""
+        delivery_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+        move(client, delivery_id, 5)
+
+        lat, lon = north_of_destination(1)
+        client.post('/batch', data=json.dumps({"atomic": True, "operations": [
+            {"method": "PATCH", "path": '/deliveries/locations',
+             "body": {"pings": [{"delivery_id": delivery_id, "lat": lat, "lon": lon}]}},
+            {"method": "GET", "path": '/deliveries/unknown'}
+        ]}), content_type='application/json')
+
+        assert get_eta(client, delivery_id)['eta']['distance_km'] == pytest.approx(5, abs=0.01)
+
+    def test_batch_completion_refreshes_cached_eta(self, client):
+        """Test que l'ETA en cache d'une livraison terminée dans un batch est recalculée"""
+        delivery_id = create_delivery(client)['delivery_id']
+        client.patch(f'/deliveries/{delivery_id}/start')
+        move(client, delivery_id, 5)
+        assert eta_engine.lookup(delivery_id)['status'] == 'in_transit'
+
+        response = client.post('/batch', data=json.dumps({"operations": [
+            {"method": "PATCH", "path": f'/deliveries/{delivery_id}/complete'}
+        ]}), content_type='application/json')
+        assert json.loads(response.data)['committed'] is True
+
+        data = get_eta(client, delivery_id)
+        assert data['status'] == 'delivered'
+        assert data['eta']['method'] == 'delivered'
+
+    def test_to_dict_without_side_effects(self, client):
+        """Test que DeliveryDB.to_dict() n'ajoute pas d'ETA et ne remplit pas le cache"""
+        delivery_id = create_delivery(client)['delivery_id']
+        eta_engine.invalidate()
+        delivery_db = db.session.get(DeliveryDB, delivery_id)
+
+        document = delivery_db.to_dict(include_order=False)
+
+        assert 'eta' not in document
+        assert eta_engine.lookup(delivery_id) is None
+
+    def test_history_not_cached(self, client):
+        """Test que lister des livraisons terminées n'évince pas les estimations actives"""
+        eta_engine.max_entries = 2
+        try:
+            active_id = create_delivery(client)['delivery_id']
+            for _ in range(3):
+                delivered_id = create_delivery(client)['delivery_id']
+                client.patch(f'/deliveries/{delivered_id}/start')
+                client.patch(f'/deliveries/{delivered_id}/complete')
+                assert eta_engine.lookup(delivered_id) is None
+
+            response = client.get('/deliveries?status=delivered')
+            assert response.status_code == 200
+            assert all(item['eta']['method'] == 'delivered' for item in json.loads(response.data)['deliveries'])
+            assert eta_engine.lookup(active_id) is not None
+        finally:
+            eta_engine.max_entries = 10000
+
+
+def test_to_dict_outside_app_context():
+    """Test que DeliveryDB.to_dict() fonctionne hors contexte d'application"""
+    delivery_db = DeliveryDB(id='d-1', order_id='o-1', driver_name='Mike', status='assigned')
+
+    document = delivery_db.to_dict(include_order=False)
+
+    assert document['delivery_id'] == 'd-1'
+    assert 'eta' not in document
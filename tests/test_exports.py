@@ -0,0 +1,243 @@
+import pytest
+import csv
+import io
+import json
+import time
+from datetime import datetime, timedelta
+from app.database import db
+from app.exports import iter_orders_ndjson, iter_deliveries_csv, parse_bound, DELIVERY_CSV_COLUMNS
+from app.models.db_models import OrderDB, DeliveryDB, _PARSED_TOPPINGS
+from tests.conftest import QueryCounter, seed_orders
+
+
+def read_ndjson(response):
+    """Décode une réponse NDJSON en liste de documents"""
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def seed_dated_orders():
+    """Une commande par jour du 1er au 5 janvier, statuts alternés"""
+    for day in range(5):
+        db.session.add(OrderDB(customer_name=f"Client {day}",
+                               customer_address="1 Rue Test",
+                               status='delivered' if day % 2 else 'cancelled',
+                               created_at=datetime(2025, 1, 1 + day, 12)))
+    db.session.commit()
+
+
+def read_csv(response):
+    """Décode une réponse CSV en liste de dictionnaires"""
+    return list(csv.DictReader(io.StringIO(response.data.decode())))
+
+
+def seed_deliveries():
+    """Trois livraisons : terminée, en cours et annulée"""
+    started_at = datetime(2025, 1, 1, 12, 0, 0, 250000)
+    rows = [
+        ('Alice', 'delivered', started_at, started_at + timedelta(minutes=25, seconds=30, microseconds=500000), None),
+        ('Bob', 'in_transit', started_at, None, None),
+        ('Alice', 'cancelled', None, None, 'Customer request, "urgent"')
+    ]
+    for index, (driver, status, started, completed, reason) in enumerate(rows):
+        order = OrderDB(customer_name=f"Client {index}", customer_address="1 Rue Test")
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(DeliveryDB(order_id=order.id, driver_name=driver, status=status,
+                                  started_at=started, completed_at=completed,
+                                  cancellation_reason=reason,
+                                  created_at=datetime(2025, 1, 1 + index, 11)))
+    db.session.commit()
+
+
+class TestParseBound:
+    """Tests unitaires des bornes since= / until="""
+
+    def test_epoch_and_iso(self):
+        """Test que les secondes epoch et l'ISO 8601 sont acceptées"""
+        assert parse_bound('0') == datetime(1970, 1, 1)
+        assert parse_bound('2025-01-02T03:04:05Z') == datetime(2025, 1, 2, 3, 4, 5)
+
+    def test_invalid(self):
+        """Test qu'une date invalide lève une ValueError"""
+        with pytest.raises(ValueError):
+            parse_bound('yesterday')
+
+    def test_out_of_range(self):
+        """Test qu'une borne hors des dates représentables lève une ValueError"""
+        for value in ('1e20', '-1e20', 'inf', 'nan'):
+            with pytest.raises(ValueError, match="Invalid date"):
+                parse_bound(value)
+
+
+class TestOrdersExport:
+    """Tests E2E de GET /orders/export"""
+
+    def test_documents_match_listing(self, client):
+        """Test que chaque ligne est identique au document de GET /orders"""
+        seed_orders(5)
+
+        response = client.get('/orders/export')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+
+        exported = read_ndjson(response)
+        listed = client.get('/orders').get_json()['orders']
+        assert sorted(exported, key=lambda o: o['order_id']) == sorted(listed, key=lambda o: o['order_id'])
+
+    def test_toppings_decoded_through_shared_cache(self, client):
+        """Test que l'export décode les garnitures via le cache de PizzaDB"""
+        seed_orders(3)
+        _PARSED_TOPPINGS.clear()
+
+        documents = read_ndjson(client.get('/orders/export?expand=pizzas'))
+
+        assert documents[0]['pizzas'][0]['toppings'] == ['cheese']
+        assert len(_PARSED_TOPPINGS) == 3
+
+    def test_until_now_outside_utc(self, client, local_timezone):
+        """Test qu'une commande créée juste avant until=<maintenant> est exportée quel que soit le fuseau"""
+        client.post('/orders', data=json.dumps({"customer_name": "John Doe", "customer_address": "123 Main St"}),
+                    content_type='application/json')
+
+        documents = read_ndjson(client.get(f'/orders/export?until={time.time() + 1}'))
+        assert len(documents) == 1
+
+    def test_fields_and_expand(self, client):
+        """Test que fields= et expand= s'appliquent comme pour GET /orders"""
+        seed_orders(2)
+
+        documents = read_ndjson(client.get('/orders/export?fields=order_id,total'))
+        assert all(set(document) == {'order_id', 'total'} for document in documents)
+
+        documents = read_ndjson(client.get('/orders/export?fields=order_id&expand=pizzas'))
+        assert all(len(document['pizzas']) == 2 for document in documents)
+
+    def test_filters(self, client):
+        """Test des filtres since (inclus), until (exclu) et status"""
+        seed_dated_orders()
+
+        documents = read_ndjson(client.get('/orders/export?since=2025-01-02&until=2025-01-04'))
+        assert [d['customer_name'] for d in documents] == ['Client 1', 'Client 2']
+
+        documents = read_ndjson(client.get('/orders/export?status=delivered'))
+        assert [d['customer_name'] for d in documents] == ['Client 1', 'Client 3']
+
+        documents = read_ndjson(client.get('/orders/export?status=delivered,cancelled&since=1735819200'))
+        assert [d['customer_name'] for d in documents] == ['Client 1', 'Client 2', 'Client 3', 'Client 4']
+
+    def test_sorted_by_creation_date(self, client):
+        """Test que l'export suit l'ordre (created_at, id)"""
+        seed_dated_orders()
+
+        documents = read_ndjson(client.get('/orders/export'))
+        assert [d['created_at'] for d in documents] == sorted(d['created_at'] for d in documents)
+
+    def test_empty_export(self, client):
+        """Test qu'un export sans commande renvoie un corps vide"""
+        response = client.get('/orders/export')
+
+        assert response.status_code == 200
+        assert read_ndjson(response) == []
+
+    def test_invalid_parameters(self, client):
+        """Test des paramètres invalides"""
+        assert client.get('/orders/export?status=lost').status_code == 400
+        assert client.get('/orders/export?since=never').status_code == 400
+        assert client.get('/orders/export?since=1e20').status_code == 400
+        assert client.get('/orders/export?expand=delivery').status_code == 400
+
+
+class TestChunkedExport:
+    """Tests du découpage par lots"""
+
+    def test_one_fragment_per_chunk(self, client):
+        """Test qu'un fragment est émis par lot de chunk_size commandes"""
+        seed_orders(7)
+
+        fragments = list(iter_orders_ndjson(chunk_size=3))
+
+        assert [fragment.count('\n') for fragment in fragments] == [3, 3, 1]
+
+    def test_queries_per_chunk_not_per_order(self, client):
+        """Test que le nombre de requêtes dépend du nombre de lots, pas de commandes"""
+        seed_orders(4)
+        with QueryCounter(db.engine) as small:
+            list(iter_orders_ndjson(chunk_size=10))
+
+        seed_orders(4)
+        with QueryCounter(db.engine) as large:
+            list(iter_orders_ndjson(chunk_size=10))
+
+        assert small.count == large.count
+
+
+class TestDeliveriesCsvExport:
+    """Tests E2E de GET /deliveries/export.csv"""
+
+    def test_rows_and_headers(self, client):
+        """Test de l'en-tête CSV, du type de contenu et du téléchargement"""
+        seed_deliveries()
+
+        response = client.get('/deliveries/export.csv')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert response.is_streamed
+        assert 'attachment' in response.headers['Content-Disposition']
+        assert response.data.decode().splitlines()[0] == ','.join(DELIVERY_CSV_COLUMNS)
+        rows = read_csv(response)
+        assert [row['driver_name'] for row in rows] == ['Alice', 'Bob', 'Alice']
+
+    def test_duration_computed_in_sql(self, client):
+        """Test que la durée SQL est celle de Delivery.calculate_duration()"""
+        seed_deliveries()
+
+        rows = read_csv(client.get('/deliveries/export.csv'))
+
+        assert float(rows[0]['duration_seconds']) == pytest.approx(25 * 60 + 30.5, abs=0.001)
+        assert rows[0]['started_at'] == '2025-01-01T12:00:00.250000'
+        assert rows[1]['duration_seconds'] == ''
+        assert rows[1]['completed_at'] == ''
+        assert rows[2]['duration_seconds'] == ''
+
+    def test_values_are_escaped(self, client):
+        """Test que virgules et guillemets sont échappés"""
+        seed_deliveries()
+
+        rows = read_csv(client.get('/deliveries/export.csv?status=cancelled'))
+
+        assert rows[0]['cancellation_reason'] == 'Customer request, "urgent"'
+
+    def test_filters(self, client):
+        """Test des filtres status, driver, since et until"""
+        seed_deliveries()
+
+        rows = read_csv(client.get('/deliveries/export.csv?driver=Alice'))
+        assert [row['status'] for row in rows] == ['delivered', 'cancelled']
+
+        rows = read_csv(client.get('/deliveries/export.csv?status=in_transit,cancelled'))
+        assert [row['driver_name'] for row in rows] == ['Bob', 'Alice']
+
+        rows = read_csv(client.get('/deliveries/export.csv?since=2025-01-02&until=2025-01-03'))
+        assert [row['driver_name'] for row in rows] == ['Bob']
+
+    def test_empty_export_has_header(self, client):
+        """Test qu'un export vide contient uniquement l'en-tête"""
+        response = client.get('/deliveries/export.csv')
+
+        assert response.data.decode().splitlines() == [','.join(DELIVERY_CSV_COLUMNS)]
+
+    def test_invalid_parameters(self, client):
+        """Test des paramètres invalides"""
+        assert client.get('/deliveries/export.csv?status=lost').status_code == 400
+        assert client.get('/deliveries/export.csv?until=soon').status_code == 400
+        assert client.get('/deliveries/export.csv?until=-1e20').status_code == 400
+
+    def test_one_fragment_per_chunk(self, client):
+        """Test que l'en-tête puis un fragment par lot sont émis"""
+        seed_deliveries()
+
+        fragments = list(iter_deliveries_csv(chunk_size=2))
+
+        assert [fragment.count('\n') for fragment in fragments] == [1, 2, 1]
@@ -0,0 +1,105 @@
+import pytest
+import json
+from app.database import db
+from app.fieldsets import FieldSelection
+from app.models.db_models import PizzaDB, OrderDB, DeliveryDB
+from tests.conftest import QueryCounter
+
+
+@pytest.fixture
+def delivery_id(client):
+    """Crée une commande d'une pizza avec sa livraison"""
+    pizza = PizzaDB(name="Margherita", size="Medium", price_amount=12.99, toppings='["basil"]')
+    order = OrderDB(customer_name="John Doe", customer_address="123 Main St")
+    db.session.add_all([pizza, order])
+    db.session.flush()
+    order.add_pizza(pizza)
+    delivery = DeliveryDB(order_id=order.id, driver_name="Mike Driver",
+                          current_latitude=48.8566, current_longitude=2.3522)
+    db.session.add(delivery)
+    db.session.commit()
+    delivery_id = delivery.id
+    db.session.expunge_all()
+    return delivery_id
+
+
+class TestFieldSelection:
+    """Tests unitaires pour FieldSelection"""
+
+    def test_default_expands_everything(self):
+        """Test que sans paramètre toutes les relations sont incluses"""
+        selection = FieldSelection()
+        assert selection.expands('order')
+        assert selection.expands('order.pizzas')
+        assert selection.apply({'a': 1}) == {'a': 1}
+
+    def test_fields_without_relation_skip_it(self):
+        """Test que fields= sans la relation évite de la charger"""
+        selection = FieldSelection(fields=['delivery_id', 'status'])
+        assert not selection.expands('order')
+        assert not selection.expands('order.pizzas')
+        assert selection.apply({'delivery_id': 1, 'status': 'x', 'driver_name': 'y'}) == \
+            {'delivery_id': 1, 'status': 'x'}
+
+    def test_expand_parent_only(self):
+        """Test que expand=order n'inclut pas les pizzas"""
+        selection = FieldSelection(expand=['order'], allowed_expansions=('order', 'order.pizzas'))
+        assert selection.expands('order')
+        assert not selection.expands('order.pizzas')
+
+    def test_nested_expand_implies_parent(self):
+        """Test que expand=order.pizzas inclut aussi la commande"""
+        selection = FieldSelection(expand=['order.pizzas'], allowed_expansions=('order', 'order.pizzas'))
+        assert selection.expands('order')
+        assert selection.expands('order.pizzas')
+
+    def test_unknown_expand(self):
+        """Test qu'une expansion inconnue lève une ValueError"""
+        with pytest.raises(ValueError):
+            FieldSelection(expand=['driver'], allowed_expansions=('order',))
+
+
+class TestSparseDocuments:
+    """Tests E2E pour fields= et expand="""
+
+    def test_delivery_compact_document(self, client, delivery_id):
+        """Test qu'un document compact ne charge pas la commande"""
+        url = f'/deliveries/{delivery_id}?fields=delivery_id,status,current_latitude,current_longitude'
+        with QueryCounter(db.engine) as counter:
+            response = client.get(url)
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data == {
+            'delivery_id': delivery_id,
+            'status': 'assigned',
+            'current_latitude': 48.8566,
+            'current_longitude': 2.3522
+        }
+        assert counter.count == 1
+
+    def test_delivery_expand_order_without_pizzas(self, client, delivery_id):
+        """Test que expand=order renvoie la commande sans ses pizzas"""
+        response = client.get(f'/deliveries/{delivery_id}?expand=order')
+        data = json.loads(response.data)
+        assert data['order']['customer_name'] == "John Doe"
+        assert 'pizzas' not in data['order']
+
+    def test_delivery_expand_order_pizzas(self, client, delivery_id):
+        """Test que expand=order.pizzas renvoie les pizzas de la commande"""
+        response = client.get(f'/deliveries?expand=order.pizzas&fields=delivery_id')
+        data = json.loads(response.data)
+        delivery = data['deliveries'][0]
+        assert set(delivery) == {'delivery_id', 'order'}
+        assert delivery['order']['total'] == 12.99
+
+    def test_orders_without_pizzas(self, client, delivery_id):
+        """Test que fields= sans total/pizzas omet les pizzas"""
+        response = client.get('/orders?fields=order_id,status')
+        data = json.loads(response.data)
+        assert set(data['orders'][0]) == {'order_id', 'status'}
+
+    def test_invalid_expand_returns_400(self, client):
+        """Test qu'une expansion invalide retourne une erreur 400"""
+        response = client.get('/orders?expand=customer')
+        assert response.status_code == 400
@@ -0,0 +1,158 @@
+import pytest
+import json
+from datetime import datetime
+from app.database import db
+from app.location_buffer import LocationBuffer, location_buffer
+from app.models.db_models import DeliveryDB
+from app.tracks import iter_track
+from tests.conftest import QueryCounter, create_deliveries, send_pings
+
+
+@pytest.fixture(autouse=True)
+def write_behind():
+    """Active le tampon d'écriture différée pendant chaque test"""
+    location_buffer.enabled = True
+    yield
+    location_buffer.enabled = False
+    location_buffer.clear()
+
+
+def ping(delivery_id, lat, lon, second):
+    """Ping normalisé à la seconde donnée"""
+    return {'delivery_id': delivery_id, 'lat': lat, 'lon': lon, 'ts': datetime(2025, 10, 27, 10, 0, second)}
+
+
+def stored_position(delivery_id):
+    """Position lue directement en base"""
+    db.session.expire_all()
+    delivery = db.session.get(DeliveryDB, delivery_id)
+    return delivery.current_latitude, delivery.current_longitude
+
+
+class TestLocationBuffer:
+    """Tests unitaires du tampon"""
+
+    def test_lookup_returns_latest_ping(self):
+        """Test que la position servie est la plus récente"""
+        buffer = LocationBuffer()
+        buffer.put(ping('d1', 1.0, 1.0, 5))
+        buffer.put(ping('d1', 2.0, 2.0, 1))
+
+        assert buffer.lookup('d1')['lat'] == 1.0
+        assert buffer.lookup('d2') is None
+        assert buffer.depth() == 1
+
+    def test_full_buffer_drops_history_but_keeps_latest(self):
+        """Test qu'un tampon plein abandonne l'historique, pas la position"""
+        buffer = LocationBuffer(max_pings=2)
+        buffer.put(ping('d1', 1.0, 1.0, 1))
+        buffer.put(ping('d1', 2.0, 2.0, 2))
+        buffer.put(ping('d1', 3.0, 3.0, 3))
+
+        stats = buffer.stats()
+        assert stats['dropped_pings'] == 2
+        assert stats['pending_pings'] == 1
+        assert buffer.lookup('d1')['lat'] == 3.0
+
+    def test_full_buffer_counts_only_discarded_pings(self):
+        """Test qu'une position plus récente gardée n'est pas comptée comme abandonnée"""
+        buffer = LocationBuffer(max_pings=2)
+        buffer.put(ping('d1', 1.0, 1.0, 1))
+        buffer.put(ping('d1', 5.0, 5.0, 5))
+        buffer.put(ping('d1', 3.0, 3.0, 3))
+
+        stats = buffer.stats()
+        assert stats['dropped_pings'] == 1
+        assert stats['pending_pings'] == 2
+        assert buffer.lookup('d1')['lat'] == 5.0
+
+    def test_full_buffer_caps_new_deliveries(self):
+        """Test que le plafond s'applique aussi aux pings d'une nouvelle livraison"""
+        buffer = LocationBuffer(max_pings=3)
+        buffer.put(ping('d1', 1.0, 1.0, 1))
+        buffer.put(ping('d1', 2.0, 2.0, 2))
+        buffer.put(ping('d2', 1.0, 1.0, 1))
+
+        # L'historique de d1 fait de la place à d3
+        buffer.put(ping('d3', 1.0, 1.0, 1))
+        assert buffer.stats()['pending_pings'] == 3
+        assert buffer.lookup('d1')['lat'] == 2.0
+        assert buffer.lookup('d3')['lat'] == 1.0
+
+        # Plus d'historique à retirer : d4 est abandonné
+        buffer.put(ping('d4', 1.0, 1.0, 1))
+        stats = buffer.stats()
+        assert stats['pending_pings'] == 3
+        assert stats['dropped_pings'] == 2
+        assert buffer.lookup('d4') is None
+
+
+class TestWriteBehindEndpoints:
+    """Tests des endpoints de position en mode écriture différée"""
+
+    def test_single_update_is_served_before_flush(self, client):
+        """Test que la position est lue depuis le tampon avant d'être écrite"""
+        delivery_id = create_deliveries(1)[0]
+
+        response = client.patch(f'/deliveries/{delivery_id}/location',
+                                data=json.dumps({"latitude": 48.8566, "longitude": 2.3522}),
+                                content_type='application/json')
+        assert response.status_code == 200
+        assert json.loads(response.data)['current_latitude'] == 48.8566
+        assert stored_position(delivery_id) == (None, None)
+
+        data = json.loads(client.get(f'/deliveries/{delivery_id}').data)
+        assert (data['current_latitude'], data['current_longitude']) == (48.8566, 2.3522)
+
+        assert location_buffer.flush() == 1
+        assert stored_position(delivery_id) == (48.8566, 2.3522)
+        assert location_buffer.depth() == 0
+
+    def test_single_update_validates_coordinates(self, client):
+        """Test qu'une position invalide est refusée sans être tamponnée"""
+        delivery_id = create_deliveries(1)[0]
+
+        response = client.patch(f'/deliveries/{delivery_id}/location',
+                                data=json.dumps({"latitude": 120, "longitude": 2.3522}),
+                                content_type='application/json')
+        assert response.status_code == 400
+        assert location_buffer.depth() == 0
+
+    def test_bulk_updates_coalesce_into_one_flush(self, client):
+        """Test que plusieurs pings d'une livraison donnent une seule écriture"""
+        ids = create_deliveries(2)
+
+        with QueryCounter(db.engine) as counter:
+            status, data = send_pings(client, [
+                {"delivery_id": ids[0], "lat": 1.0, "lon": 1.0, "ts": 100},
+                {"delivery_id": ids[0], "lat": 2.0, "lon": 2.0, "ts": 200},
+                {"delivery_id": ids[1], "lat": 3.0, "lon": 3.0, "ts": 100},
+                {"delivery_id": "missing", "lat": 4.0, "lon": 4.0, "ts": 100}
+            ])
+        assert status == 200
+        assert data['accepted'] == 4
+        assert data['buffered'] == 3
+        assert 'updated' not in data
+        assert data['unknown'] == ['missing']
+        assert counter.count == 1  # lecture des livraisons connues uniquement
+
+        assert location_buffer.flush() == 2
+        assert stored_position(ids[0]) == (2.0, 2.0)
+        assert [point[1] for point in iter_track(ids[0])] == [1.0, 2.0]
+
+        stats = json.loads(client.get('/deliveries/locations/buffer').data)
+        assert stats['enabled'] is True
+        assert stats['coalesced_pings'] == 1
+        assert stats['depth'] == 0
+
+    def test_batch_writes_directly(self, client):
+        """Test qu'un batch écrit les positions sans passer par le tampon"""
+        delivery_id = create_deliveries(1)[0]
+
+        response = client.post('/batch', data=json.dumps({"operations": [
+            {"method": "PATCH", "path": f"/deliveries/{delivery_id}/location",
+             "body": {"latitude": 48.8566, "longitude": 2.3522}}
+        ]}), content_type='application/json')
+        assert response.status_code == 200
+        assert location_buffer.depth() == 0
+        assert stored_position(delivery_id) == (48.8566, 2.3522)
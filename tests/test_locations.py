@@ -0,0 +1,127 @@
+import pytest
+import json
+import time
+from datetime import datetime
+from app.database import db
+from app.locations import parse_ping, parse_timestamp, latest_pings
+from tests.conftest import QueryCounter, create_deliveries, send_pings
+
+
+class TestPingParsing:
+    """Tests unitaires pour la validation des pings"""
+
+    def test_parse_ping(self):
+        """Test la normalisation d'un ping valide"""
+        ping = parse_ping({"delivery_id": "abc", "lat": 48.85, "lon": 2.35, "ts": 0})
+        assert ping == {"delivery_id": "abc", "lat": 48.85, "lon": 2.35, "ts": datetime(1970, 1, 1)}
+
+    def test_parse_timestamp_iso(self):
+        """Test la conversion d'un horodatage ISO 8601 avec fuseau en UTC"""
+        assert parse_timestamp("2025-10-27T12:00:00+02:00") == datetime(2025, 10, 27, 10, 0, 0)
+
+    def test_invalid_pings(self):
+        """Test le rejet des pings invalides"""
+        for raw in [{"lat": 1, "lon": 1}, {"delivery_id": "a", "lat": "x", "lon": 1},
+                    {"delivery_id": "a", "lat": 91, "lon": 1}, {"delivery_id": "a", "lat": 1, "lon": 1, "ts": "hier"}]:
+            with pytest.raises(ValueError):
+                parse_ping(raw)
+
+    def test_out_of_range_timestamps(self):
+        """Test qu'un horodatage hors des dates représentables est refusé"""
+        for value in [1e20, -1e20, float('inf'), float('nan'), "9999-12-31T23:59:59-01:00"]:
+            with pytest.raises(ValueError, match="Invalid ts"):
+                parse_timestamp(value)
+
+    def test_latest_pings(self):
+        """Test que seul le ping le plus récent d'une livraison est conservé"""
+        pings = [parse_ping({"delivery_id": "a", "lat": 1, "lon": 1, "ts": 20}),
+                 parse_ping({"delivery_id": "a", "lat": 2, "lon": 2, "ts": 10})]
+        assert latest_pings(pings)["a"]["lat"] == 1
+
+
+class TestBulkLocations:
+    """Tests E2E pour PATCH /deliveries/locations"""
+
+    def test_bulk_update(self, client):
+        """Test la mise à jour de plusieurs livraisons en une requête"""
+        ids = create_deliveries(3)
+
+        with QueryCounter(db.engine) as counter:
+            status, data = send_pings(client, [
+                {"delivery_id": delivery_id, "lat": 48.0 + i, "lon": 2.0 + i, "ts": 1000 + i}
+                for i, delivery_id in enumerate(ids)
+            ])
+
+        assert status == 200
+        assert data == {"accepted": 3, "updated": 3, "rejected": [], "unknown": []}
+        # Positions : un SELECT des identifiants et un UPDATE executemany
+        # Historique : un SELECT des derniers blocs et un INSERT groupé
+        assert counter.count == 4
+
+        delivery = json.loads(client.get(f'/deliveries/{ids[2]}').data)
+        assert delivery['current_latitude'] == 50.0
+        assert delivery['current_longitude'] == 4.0
+
+    def test_stale_ping_is_ignored(self, client):
+        """Test qu'un ping plus ancien que la position connue est ignoré"""
+        delivery_id = create_deliveries(1)[0]
+        send_pings(client, [{"delivery_id": delivery_id, "lat": 10, "lon": 10, "ts": 2000}])
+
+        status, data = send_pings(client, [{"delivery_id": delivery_id, "lat": 20, "lon": 20, "ts": 1000}])
+
+        assert data['updated'] == 0
+        delivery = json.loads(client.get(f'/deliveries/{delivery_id}?fields=current_latitude').data)
+        assert delivery['current_latitude'] == 10
+
+    def test_rejected_and_unknown(self, client):
+        """Test le rapport des pings invalides et des livraisons inconnues"""
+        delivery_id = create_deliveries(1)[0]
+
+        status, data = send_pings(client, [
+            {"delivery_id": delivery_id, "lat": 48.85, "lon": 2.35},
+            {"delivery_id": "unknown", "lat": 48.85, "lon": 2.35},
+            {"delivery_id": delivery_id, "lat": 200, "lon": 2.35},
+        ])
+
+        assert status == 200
+        assert data['updated'] == 1
+        assert data['unknown'] == ["unknown"]
+        assert data['rejected'][0]['index'] == 2
+
+    def test_out_of_range_ts_rejected(self, client):
+        """Test qu'un ts énorme ou infini est rejeté sans erreur serveur"""
+        delivery_id = create_deliveries(1)[0]
+
+        # json.dumps émet Infinity, que Flask accepte
+        status, data = send_pings(client, [
+            {"delivery_id": delivery_id, "lat": 48.85, "lon": 2.35, "ts": 1e20},
+            {"delivery_id": delivery_id, "lat": 48.85, "lon": 2.35, "ts": float('inf')},
+        ])
+
+        assert status == 200
+        assert data['updated'] == 0
+        assert data['rejected'] == [{"index": 0, "error": "Invalid ts"}, {"index": 1, "error": "Invalid ts"}]
+
+    def test_future_ts_rejected(self, client):
+        """Test qu'un ping daté loin dans le futur est rejeté et ne bloque pas les suivants"""
+        delivery_id = create_deliveries(1)[0]
+
+        status, data = send_pings(client, [
+            {"delivery_id": delivery_id, "lat": 48.85, "lon": 2.35, "ts": "9999-01-01T00:00:00Z"}
+        ])
+        assert status == 200
+        assert data['rejected'] == [{"index": 0, "error": "ts is in the future"}]
+
+        # Une légère avance d'horloge reste acceptée, et la position suivante est écrite
+        status, data = send_pings(client, [{"delivery_id": delivery_id, "lat": 48.86, "lon": 2.36,
+                                            "ts": time.time() + 60}])
+        assert data['updated'] == 1
+        status, data = send_pings(client, [{"delivery_id": delivery_id, "lat": 48.87, "lon": 2.37,
+                                            "ts": time.time() + 120}])
+        assert data['updated'] == 1
+
+    def test_pings_required(self, client):
+        """Test qu'une liste de pings est obligatoire"""
+        response = client.patch('/deliveries/locations', data=json.dumps({}),
+                                content_type='application/json')
+        assert response.status_code == 400
@@ -0,0 +1,88 @@
+import pytest
+import json
+from app.app import create_app
+from app.config import TestingConfig
+from app.metrics import Histogram
+from tests.conftest import seed_orders
+
+
+def metric_value(text, prefix):
+    """Valeur de la première ligne de métrique commençant par prefix"""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class TestHistogram:
+    """Tests unitaires de l'histogramme Prometheus"""
+
+    def test_cumulative_buckets(self):
+        """Test que les buckets sont cumulatifs et que +Inf compte tout"""
+        histogram = Histogram('latency_seconds', 'Latence', (0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, ('GET',))
+
+        lines = histogram.render(('method',))
+        assert 'latency_seconds_bucket{method="GET",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{method="GET",le="1"} 2' in lines
+        assert 'latency_seconds_bucket{method="GET",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{method="GET"} 3' in lines
+        assert 'latency_seconds_sum{method="GET"} 5.550000' in lines
+
+
+class TestRequestMetrics:
+    """Tests de l'instrumentation des requêtes"""
+
+    def test_server_timing_header(self, client):
+        """Test que chaque réponse porte la durée totale et le temps SQL"""
+        client.post('/orders', data=json.dumps({"customer_name": "John Doe",
+                                                 "customer_address": "123 Main St"}),
+                    content_type='application/json')
+        response = client.get('/orders')
+
+        timings = response.headers.getlist('Server-Timing')
+        assert timings[0].startswith('app;dur=')
+        assert timings[1].startswith('db;dur=') and timings[1].endswith('desc="2 queries"')
+
+    def test_metrics_endpoint(self, client):
+        """Test l'exposition des latences par route et des requêtes SQL"""
+        before = client.get('/metrics').get_data(as_text=True)
+        prefix = 'http_request_duration_seconds_count{method="GET",route="/orders/<order_id>",status="404"}'
+        count_before = metric_value(before, prefix) or 0
+
+        client.get('/orders/missing')
+        client.get('/orders/missing')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert metric_value(text, prefix) == count_before + 2
+        assert metric_value(text, 'http_requests_in_flight') == 1  # la requête /metrics elle-même
+        assert '# TYPE http_request_sql_statements histogram' in text
+        assert '# TYPE db_commit_duration_seconds histogram' in text
+        assert 'location_buffer_depth 0' in text
+
+    def test_streamed_export_measured_when_stream_closes(self, client):
+        """Test qu'un export en streaming compte les requêtes SQL émises pendant la génération"""
+        seed_orders(30)
+        prefix = 'http_request_sql_statements_sum{method="GET",route="/orders/export"}'
+
+        response = client.get('/orders/export?expand=pizzas')
+        assert len(response.get_data(as_text=True).splitlines()) == 30
+        assert 'Server-Timing' not in response.headers
+        response.close()
+
+        text = client.get('/metrics').get_data(as_text=True)
+        assert metric_value(text, prefix) >= 3  # commandes, lignes et pizzas du lot
+
+    def test_disabled_metrics_install_no_hooks(self):
+        """Test que l'instrumentation désactivée n'ajoute ni hook ni en-tête"""
+        app = create_app(type('NoMetricsConfig', (TestingConfig,), {'METRICS_ENABLED': False}))
+
+        with app.test_client() as client:
+            response = client.get('/health')
+            assert 'Server-Timing' not in response.headers
+            assert client.get('/metrics').status_code == 404
+        assert app.before_request_funcs.get(None, []) == []
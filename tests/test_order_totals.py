@@ -0,0 +1,87 @@
+import pytest
+import json
+from app.database import db
+from app.models.db_models import OrderDB, PizzaDB
+from tests.conftest import create_pizza
+
+
+def create_order_with_pizzas(client, prices):
+    """Crée une commande contenant une pizza par prix donné"""
+    order_response = client.post('/orders',
+                                 data=json.dumps({"customer_name": "John Doe",
+                                                  "customer_address": "123 Main St"}),
+                                 content_type='application/json')
+    order_id = json.loads(order_response.data)['order_id']
+
+    for price in prices:
+        pizza_id = create_pizza(client, price=price)
+        client.post(f'/orders/{order_id}/pizzas',
+                    data=json.dumps({"pizza_id": pizza_id}),
+                    content_type='application/json')
+
+    return order_id
+
+
+class TestOrderTotals:
+    """Tests pour les totaux dénormalisés des commandes"""
+
+    def test_totals_maintained_on_add(self, client):
+        """Test que l'ajout de pizzas met à jour total et item_count"""
+        order_id = create_order_with_pizzas(client, [12.99, 8.5])
+
+        order_db = db.session.get(OrderDB, order_id)
+        assert order_db.item_count == 2
+        assert order_db.total_amount == 21.49
+        assert order_db.currency == 'EUR'
+
+    def test_totals_maintained_on_remove(self, client):
+        """Test que le retrait d'une pizza met à jour total et item_count"""
+        order_id = create_order_with_pizzas(client, [12.99, 8.5])
+
+        response = client.delete(f'/orders/{order_id}/pizzas/0')
+        data = json.loads(response.data)
+        assert data['total'] == 8.5
+        assert data['item_count'] == 1
+
+        response = client.delete(f'/orders/{order_id}/pizzas/0')
+        data = json.loads(response.data)
+        assert data['total'] == 0
+        assert data['is_valid'] is False
+
+    def test_currency_maintained_on_remove(self, client):
+        """Test que le retrait d'une pizza redonne la devise de la dernière ligne restante"""
+        order_id = create_order_with_pizzas(client, [12.99, 8.5])
+        order_db = db.session.get(OrderDB, order_id)
+        db.session.get(PizzaDB, order_db.pizzas[0].pizza_id).price_currency = 'USD'
+        order_db.currency = 'EUR'
+        db.session.commit()
+
+        response = client.delete(f'/orders/{order_id}/pizzas/1')
+        assert response.status_code == 200
+
+        db.session.expire_all()
+        assert db.session.get(OrderDB, order_id).currency == 'USD'
+
+    def test_status_validation_uses_item_count(self, client):
+        """Test qu'une commande vide ne peut pas passer en préparation"""
+        order_id = create_order_with_pizzas(client, [])
+        response = client.patch(f'/orders/{order_id}/status',
+                                data=json.dumps({"status": "preparing"}),
+                                content_type='application/json')
+        assert response.status_code == 400
+
+    def test_recompute_totals_repairs_drift(self, client):
+        """Test que le recalcul en masse corrige des totaux incohérents"""
+        order_id = create_order_with_pizzas(client, [12.99, 8.5, 10.0])
+        empty_order_id = create_order_with_pizzas(client, [])
+
+        db.session.execute(db.update(OrderDB).values(total_amount=999, item_count=42, currency='USD'))
+        db.session.commit()
+
+        assert OrderDB.recompute_totals() == 2
+
+        db.session.expire_all()
+        order_db = db.session.get(OrderDB, order_id)
+        assert (order_db.item_count, order_db.total_amount, order_db.currency) == (3, 31.49, 'EUR')
+        empty_db = db.session.get(OrderDB, empty_order_id)
+        assert (empty_db.item_count, empty_db.total_amount, empty_db.currency) == (0, 0, 'EUR')
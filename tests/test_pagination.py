@@ -0,0 +1,73 @@
+import pytest
+import json
+from datetime import datetime, timedelta
+from app.database import db
+from app.models.db_models import OrderDB
+from app.pagination import encode_cursor, decode_cursor, parse_limit, MAX_LIMIT, DEFAULT_LIMIT
+
+
+class TestCursor:
+    """Tests unitaires pour l'encodage des curseurs"""
+
+    def test_cursor_roundtrip(self):
+        """Test qu'un curseur encodé puis décodé redonne la même position"""
+        created_at = datetime(2025, 10, 27, 10, 0, 0, 123456)
+        cursor = encode_cursor(created_at, "abc")
+        assert decode_cursor(cursor) == (created_at, "abc")
+
+    def test_invalid_cursor(self):
+        """Test qu'un curseur invalide lève une ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_parse_limit(self):
+        """Test la validation du paramètre limit"""
+        assert parse_limit(None) == DEFAULT_LIMIT
+        assert parse_limit("10") == 10
+        assert parse_limit(str(MAX_LIMIT + 1)) == MAX_LIMIT
+        with pytest.raises(ValueError):
+            parse_limit("0")
+        with pytest.raises(ValueError):
+            parse_limit("abc")
+
+
+class TestPaginatedListings:
+    """Tests E2E pour la pagination des listings"""
+
+    def test_orders_pages_cover_all_rows(self, client):
+        """Test que le parcours des pages renvoie chaque commande une seule fois"""
+        base = datetime(2025, 1, 1)
+        for i in range(7):
+            # Deux commandes partagent chaque created_at pour tester le départage par id
+            db.session.add(OrderDB(customer_name=f"Client {i}",
+                                   customer_address="1 Rue Test",
+                                   created_at=base + timedelta(minutes=i // 2)))
+        db.session.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            url = '/orders?limit=3' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url)
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert data['count'] <= 3
+            seen.extend(order['order_id'] for order in data['orders'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+
+    def test_invalid_cursor_returns_400(self, client):
+        """Test qu'un curseur invalide retourne une erreur 400"""
+        for url in ['/orders', '/deliveries', '/pizzas']:
+            response = client.get(f'{url}?cursor=garbage')
+            assert response.status_code == 400
+            assert 'error' in json.loads(response.data)
+
+    def test_invalid_limit_returns_400(self, client):
+        """Test qu'une limite invalide retourne une erreur 400"""
+        response = client.get('/orders?limit=-1')
+        assert response.status_code == 400
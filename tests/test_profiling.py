@@ -0,0 +1,160 @@
+import pytest
+import json
+import pstats
+from app.app import create_app
+from app.config import TestingConfig
+from app.database import db
+
+TOKEN = 'secret-token'
+
+
+def make_client(tmp_path, **settings):
+    """Client de test avec le profilage configuré"""
+    config = type('ProfilingConfig', (TestingConfig,), {'PROFILE_DIR': str(tmp_path), **settings})
+    return create_app(config)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Application avec profilage à la demande"""
+    return make_client(tmp_path, PROFILING_TOKEN=TOKEN)
+
+
+def admin_headers():
+    return {'X-Admin-Token': TOKEN}
+
+
+class TestOnDemandProfiling:
+    """Tests du profilage déclenché par jeton"""
+
+    def test_request_without_token_is_not_profiled(self, client, tmp_path):
+        """Test qu'une requête ordinaire n'est pas profilée"""
+        response = client.get('/pizzas')
+
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_wrong_token_is_not_profiled(self, client):
+        """Test qu'un mauvais jeton est ignoré"""
+        response = client.get('/pizzas', headers={'X-Profile': 'wrong'})
+
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_header_token_writes_profile(self, client, tmp_path):
+        """Test que l'en-tête X-Profile produit les trois fichiers"""
+        response = client.get('/pizzas', headers={'X-Profile': TOKEN})
+
+        assert response.status_code == 200
+        profile_id = response.headers['X-Profile-Id']
+        for extension in ('prof', 'folded', 'json'):
+            assert (tmp_path / f'{profile_id}.{extension}').exists()
+
+        stats = pstats.Stats(str(tmp_path / f'{profile_id}.prof'))
+        assert stats.total_calls > 0
+
+        metadata = json.loads((tmp_path / f'{profile_id}.json').read_text())
+        assert metadata['route'] == '/pizzas'
+        assert metadata['status'] == 200
+        assert metadata['trigger'] == 'requested'
+        assert metadata['top_functions']
+
+    def test_query_parameter_token(self, client):
+        """Test que le paramètre _profile déclenche aussi le profilage"""
+        response = client.get(f'/pizzas?_profile={TOKEN}')
+
+        assert 'X-Profile-Id' in response.headers
+
+    def test_no_hooks_without_token(self, tmp_path):
+        """Test que sans jeton ni échantillonnage aucun profil n'est produit"""
+        app = make_client(tmp_path)
+        with app.app_context():
+            db.create_all()
+            response = app.test_client().get('/pizzas', headers={'X-Profile': 'anything'})
+
+        assert 'X-Profile-Id' not in response.headers
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestSampledProfiling:
+    """Tests du profilage par échantillonnage"""
+
+    def test_one_request_in_n(self, tmp_path):
+        """Test qu'une requête sur PROFILE_SAMPLE_RATE est profilée"""
+        app = make_client(tmp_path, PROFILE_SAMPLE_RATE=3)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            responses = [client.get('/health') for _ in range(6)]
+
+        profiled = [response for response in responses if 'X-Profile-Id' in response.headers]
+        assert len(profiled) == 2
+        assert len(list(tmp_path.glob('*.json'))) == 2
+
+    def test_oldest_profiles_are_pruned(self, tmp_path):
+        """Test que seuls PROFILE_MAX_FILES profils sont conservés"""
+        app = make_client(tmp_path, PROFILE_SAMPLE_RATE=1, PROFILE_MAX_FILES=2)
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            for _ in range(4):
+                client.get('/health')
+
+        assert len(list(tmp_path.glob('*.json'))) == 2
+        assert len(list(tmp_path.glob('*.prof'))) == 2
+        assert len(list(tmp_path.glob('*.folded'))) == 2
+
+
+class TestProfileEndpoints:
+    """Tests des endpoints d'administration des profils"""
+
+    def test_endpoints_require_admin_token(self, client):
+        """Test que le listing et le téléchargement exigent le jeton"""
+        assert client.get('/profiles').status_code == 403
+        assert client.get('/profiles', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+        assert client.get('/profiles/abc').status_code == 403
+        assert client.get('/profiles/abc/prof').status_code == 403
+
+    def test_endpoints_forbidden_without_configured_token(self, tmp_path):
+        """Test qu'aucun jeton configuré interdit tout accès"""
+        app = make_client(tmp_path, PROFILE_SAMPLE_RATE=1)
+        response = app.test_client().get('/profiles', headers={'X-Admin-Token': ''})
+
+        assert response.status_code == 403
+
+    def test_list_and_download(self, client):
+        """Test du listing, des métadonnées et du téléchargement"""
+        profile_id = client.get('/pizzas', headers={'X-Profile': TOKEN}).headers['X-Profile-Id']
+
+        response = client.get('/profiles', headers=admin_headers())
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['count'] == 1
+        assert data['profiles'][0]['profile_id'] == profile_id
+        assert 'top_functions' not in data['profiles'][0]
+
+        response = client.get(f'/profiles/{profile_id}', headers=admin_headers())
+        assert response.status_code == 200
+        assert response.get_json()['top_functions']
+
+        response = client.get(f'/profiles/{profile_id}/folded', headers=admin_headers())
+        assert response.status_code == 200
+        assert b'dispatch_request' in response.data
+
+        response = client.get(f'/profiles/{profile_id}/prof', headers=admin_headers())
+        assert response.status_code == 200
+        assert 'attachment' in response.headers['Content-Disposition']
+
+    def test_invalid_kind_and_unknown_profile(self, client):
+        """Test des erreurs 400 et 404"""
+        assert client.get('/profiles/abc/svg', headers=admin_headers()).status_code == 400
+        assert client.get('/profiles/unknown', headers=admin_headers()).status_code == 404
+        assert client.get('/profiles/unknown/prof', headers=admin_headers()).status_code == 404
+
+    def test_path_traversal_is_rejected(self, client, tmp_path):
+        """Test qu'un identifiant ne peut pas sortir du répertoire des profils"""
+        (tmp_path.parent / 'leak.json').write_text('{}')
+
+        for url in ('/profiles/..%2Fleak', '/profiles/%2E%2E/json'):
+            response = client.get(url, headers=admin_headers())
+            assert response.status_code in (400, 404)
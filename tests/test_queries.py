@@ -0,0 +1,42 @@
+import pytest
+import json
+from app.database import db
+from tests.conftest import QueryCounter, seed_orders
+
+
+def count_queries(client, url):
+    """Exécute un GET et retourne (nombre de requêtes SQL, données JSON)"""
+    with QueryCounter(db.engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count, json.loads(response.data)
+
+
+class TestListingQueryCount:
+    """Le nombre de requêtes des listings ne dépend pas du volume"""
+
+    def test_orders_listing_constant_queries(self, client):
+        """GET /orders émet autant de requêtes pour 2 ou 20 commandes"""
+        seed_orders(2)
+        small_count, data = count_queries(client, '/orders')
+        assert data['count'] == 2
+
+        seed_orders(18)
+        large_count, data = count_queries(client, '/orders')
+        assert data['count'] == 20
+        assert all(len(order['pizzas']) == 2 for order in data['orders'])
+
+        assert large_count == small_count
+
+    def test_deliveries_listing_constant_queries(self, client):
+        """GET /deliveries émet autant de requêtes pour 2 ou 20 livraisons"""
+        seed_orders(2, with_delivery=True)
+        small_count, data = count_queries(client, '/deliveries')
+        assert data['count'] == 2
+
+        seed_orders(18, with_delivery=True)
+        large_count, data = count_queries(client, '/deliveries')
+        assert data['count'] == 20
+        assert all(len(d['order']['pizzas']) == 2 for d in data['deliveries'])
+
+        assert large_count == small_count
@@ -0,0 +1,168 @@
+import pytest
+import json
+from flask import request, request_started
+from sqlalchemy import event
+from app.database import db
+from app.eta import eta_engine
+
+# Tables dont le volume croît avec l'historique : un SCAN sans index y est interdit
+LARGE_TABLES = {'orders', 'order_pizzas', 'deliveries', 'pizza_toppings'}
+
+# Routes sans accès à la base (fichiers statiques, page d'accueil, profils sur disque)
+ROUTES_WITHOUT_QUERIES = {'/static/<path:filename>', '/', '/profiles', '/profiles/<profile_id>',
+                          '/profiles/<profile_id>/<kind>'}
+
+
+class StatementRecorder:
+    """Enregistre les requêtes SQL émises pendant un bloc with"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith('INSERT'):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def full_table_scans(statement, parameters):
+    """
+    Retourne les étapes du plan qui parcourent une grande table sans index
+
+    Args:
+        statement: Requête SQL
+        parameters: Paramètres de la requête
+
+    Returns:
+        list: Détails des étapes SCAN fautives
+    """
+    plan = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        words = detail.split()
+        if len(words) < 2 or words[0] != 'SCAN':
+            continue
+        if words[1] in LARGE_TABLES and 'INDEX' not in detail:
+            scans.append(detail)
+    return scans
+
+
+def post(client, url, payload=None):
+    """POST JSON et retourne les données"""
+    response = client.post(url, data=json.dumps(payload or {}), content_type='application/json')
+    assert response.status_code in (200, 201), response.data
+    return json.loads(response.data)
+
+
+def patch(client, url, payload=None):
+    """PATCH JSON et retourne les données"""
+    response = client.patch(url, data=json.dumps(payload or {}), content_type='application/json')
+    assert response.status_code == 200, response.data
+    return json.loads(response.data)
+
+
+def exercise_endpoints(client):
+    """Appelle chaque endpoint de l'API qui interroge la base au moins une fois"""
+    # Profil de l'ETA rechargé (et ses requêtes vérifiées) à la création de la livraison
+    eta_engine.invalidate()
+    pizza_id = post(client, '/pizzas', {"name": "Margherita", "size": "Medium", "price": 12.99,
+                                        "toppings": ["Mozzarella", "Basil"]})['pizza_id']
+    order_id = post(client, '/orders', {"customer_name": "John Doe",
+                                        "customer_address": "123 Main St"})['order_id']
+    post(client, f'/orders/{order_id}/pizzas', {"pizza_id": pizza_id})
+    post(client, f'/orders/{order_id}/pizzas', {"pizza_id": pizza_id})
+    client.delete(f'/orders/{order_id}/pizzas/1')
+    patch(client, f'/orders/{order_id}/status', {"status": "preparing"})
+
+    delivery_id = post(client, '/deliveries', {"order_id": order_id,
+                                               "driver_name": "Mike Driver"})['delivery_id']
+    patch(client, f'/deliveries/{delivery_id}/start')
+    patch(client, f'/deliveries/{delivery_id}/location', {"latitude": 48.8566, "longitude": 2.3522})
+    patch(client, '/deliveries/locations', {"pings": [{"delivery_id": delivery_id, "lat": 48.857, "lon": 2.353}]})
+    patch(client, f'/deliveries/{delivery_id}/complete')
+
+    other_order_id = post(client, '/orders', {"customer_name": "Jane Smith",
+                                              "customer_address": "456 Oak Ave"})['order_id']
+    other_delivery_id = post(client, '/deliveries', {"order_id": other_order_id,
+                                                     "driver_name": "Sarah Driver"})['delivery_id']
+    patch(client, f'/deliveries/{other_delivery_id}/cancel', {"reason": "Customer request"})
+
+    post(client, '/checkout', {"customer_name": "Bob Johnson", "customer_address": "789 Elm St",
+                               "pizza_ids": [pizza_id, pizza_id], "driver_name": "Tom Driver"})
+
+    batch = post(client, '/batch', {"operations": [
+        {"method": "POST", "path": '/orders', "body": {"customer_name": "Ann Lee", "customer_address": "1 Pine Rd"}},
+        {"method": "GET", "path": f'/deliveries/{delivery_id}'}
+    ]})
+    assert batch['failed'] == 0
+
+    for url in ['/pizzas', '/pizzas?type=all', '/pizzas?topping=Mozzarella',
+                f'/pizzas/{pizza_id}', '/pizzas/catalog',
+                '/orders', f'/orders/{order_id}', '/orders?expand=pizzas',
+                '/deliveries', f'/deliveries/{delivery_id}', '/deliveries?fields=delivery_id',
+                '/deliveries?status=in_transit', '/deliveries?status=assigned,in_transit&driver=Tom Driver',
+                '/deliveries?driver=Mike Driver', '/deliveries/active',
+                '/analytics/revenue', '/analytics/revenue?granularity=hour',
+                '/analytics/deliveries', f'/deliveries/{other_delivery_id}/eta',
+                '/deliveries/locations/buffer',
+                '/health', '/metrics']:
+        response = client.get(url)
+        assert response.status_code == 200, url
+
+    # Réponses en streaming : les requêtes s'exécutent pendant la lecture du corps
+    for url in [f'/deliveries/{delivery_id}/track',
+                '/orders/export', '/orders/export?since=2020-01-01&fields=order_id,total',
+                '/deliveries/export.csv', '/deliveries/export.csv?status=delivered']:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        assert response.get_data()
+        response.close()
+
+    # Pages suivantes : requêtes avec curseur
+    cursor = json.loads(client.get('/orders?limit=1').data)['next_cursor']
+    assert client.get(f'/orders?limit=1&cursor={cursor}').status_code == 200
+    cursor = json.loads(client.get('/deliveries?limit=1').data)['next_cursor']
+    assert client.get(f'/deliveries?limit=1&cursor={cursor}').status_code == 200
+
+
+class TestQueryPlans:
+    """Vérifie le plan d'exécution de chaque requête émise par les endpoints"""
+
+    def test_every_endpoint_exercised(self, app, client):
+        """Test que exercise_endpoints() appelle chaque route qui interroge la base"""
+        called = set()
+
+        def record(sender, **extra):
+            called.add((request.url_rule.rule, request.method))
+
+        with request_started.connected_to(record, app):
+            exercise_endpoints(client)
+
+        routes = {(rule.rule, method) for rule in app.url_map.iter_rules()
+                  for method in rule.methods - {'HEAD', 'OPTIONS'}
+                  if rule.rule not in ROUTES_WITHOUT_QUERIES}
+        assert routes - called == set()
+
+    def test_no_full_scan_on_large_tables(self, client):
+        """Test qu'aucune requête ne parcourt entièrement une grande table"""
+        with StatementRecorder(db.engine) as recorder:
+            exercise_endpoints(client)
+
+        assert recorder.statements
+
+        offenders = {}
+        for statement, parameters in recorder.statements:
+            scans = full_table_scans(statement, parameters)
+            if scans:
+                offenders[statement] = scans
+
+        assert offenders == {}
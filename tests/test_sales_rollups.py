@@ -0,0 +1,210 @@
+import pytest
+import json
+from datetime import datetime, timedelta
+from app.models.db_models import OrderDB, SalesRollupDB, PizzaSalesRollupDB
+from app.sales_rollups import rebuild_sales_rollups, bucket_start
+from app.seeds.synthetic import generate_dataset
+from tests.conftest import create_pizza, place_order
+
+
+def set_status(client, order_id, status):
+    """Change le statut d'une commande"""
+    return client.patch(f'/orders/{order_id}/status', data=json.dumps({"status": status}),
+                        content_type='application/json')
+
+
+def rollup_state():
+    """Contenu des tables d'agrégats (valeurs arrondies, lignes vides ignorées)"""
+    sales = sorted(
+        (row.granularity, row.bucket, row.order_count, round(row.revenue, 2), row.item_count,
+         row.cancelled_count, round(row.cancelled_revenue, 2))
+        for row in SalesRollupDB.query.all()
+        if row.order_count or row.cancelled_count
+    )
+    pizzas = sorted(
+        (row.granularity, row.bucket, row.pizza_name, row.size, row.quantity, round(row.revenue, 2))
+        for row in PizzaSalesRollupDB.query.all()
+        if row.quantity
+    )
+    return sales, pizzas
+
+
+def revenue(client, query=''):
+    """Appelle GET /analytics/revenue"""
+    response = client.get(f'/analytics/revenue{query}')
+    assert response.status_code == 200
+    return json.loads(response.data)
+
+
+class TestIncrementalRollups:
+    """Les agrégats tenus à jour par les endpoints égalent un recalcul complet"""
+
+    def test_checkout_counts_immediately(self, client):
+        """Test qu'un checkout (statut preparing) compte dans le chiffre d'affaires"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        place_order(client, [margherita, margherita])
+
+        data = revenue(client)
+        assert data['totals']['orders'] == 1
+        assert data['totals']['revenue'] == 25.98
+        assert data['totals']['items'] == 2
+        assert data['totals']['pizzas'] == [
+            {"name": "Margherita", "size": "Medium", "quantity": 2, "revenue": 25.98}
+        ]
+
+    def test_checkout_counted_outside_utc(self, client, local_timezone):
+        """Test qu'une commande compte dans le créneau UTC courant quel que soit le fuseau du serveur"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        before = datetime.utcnow()
+        order_id = place_order(client, [margherita])['order']['order_id']
+
+        assert before <= OrderDB.query.get(order_id).created_at <= datetime.utcnow()
+        data = revenue(client, '?granularity=hour')
+        assert data['totals']['orders'] == 1
+        assert data['buckets'][0]['bucket'] == bucket_start(before, 'hour').isoformat()
+
+    def test_pending_orders_are_not_counted(self, client):
+        """Test qu'un panier pending ne compte pas"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        order_id = json.loads(client.post('/orders', data=json.dumps(
+            {"customer_name": "John Doe", "customer_address": "123 Main St"}
+        ), content_type='application/json').data)['order_id']
+        client.post(f'/orders/{order_id}/pizzas', data=json.dumps({"pizza_id": margherita}),
+                    content_type='application/json')
+
+        assert revenue(client)['totals']['orders'] == 0
+
+        set_status(client, order_id, 'preparing')
+        assert revenue(client)['totals']['revenue'] == 12.99
+
+    def test_cancellation_moves_revenue(self, client):
+        """Test qu'une annulation retire la commande du chiffre d'affaires"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        order_id = place_order(client, [margherita])['order']['order_id']
+
+        set_status(client, order_id, 'cancelled')
+
+        totals = revenue(client)['totals']
+        assert totals['orders'] == 0
+        assert totals['revenue'] == 0
+        assert totals['cancelled_orders'] == 1
+        assert totals['cancelled_revenue'] == 12.99
+        assert totals['pizzas'] == []
+
+    def test_matches_rebuild_after_mixed_changes(self, client):
+        """Test qu'une suite de changements donne les agrégats d'un recalcul complet"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        large = create_pizza(client, "Margherita", 16.5, size="Large")
+        pepperoni = create_pizza(client, "Pepperoni", 14.5)
+
+        first = place_order(client, [margherita, pepperoni])['order']['order_id']
+        second = place_order(client, [large, large, pepperoni])['order']['order_id']
+        third = place_order(client, [pepperoni])['order']['order_id']
+
+        set_status(client, first, 'delivered')
+        set_status(client, second, 'cancelled')
+        set_status(client, second, 'ready')
+        set_status(client, third, 'cancelled')
+        client.post(f'/orders/{first}/pizzas', data=json.dumps({"pizza_id": large}),
+                    content_type='application/json')
+        client.delete(f'/orders/{second}/pizzas/0')
+
+        incremental = rollup_state()
+        rebuild_sales_rollups()
+
+        assert incremental == rollup_state()
+        assert revenue(client)['totals']['revenue'] == round(12.99 + 14.5 + 16.5 + 16.5 + 14.5, 2)
+
+    def test_failed_batch_leaves_rollups_unchanged(self, client):
+        """Test qu'un batch atomique annulé n'altère pas les agrégats"""
+        margherita = create_pizza(client, "Margherita", 12.99)
+        order_id = place_order(client, [margherita])['order']['order_id']
+        before = rollup_state()
+
+        client.post('/batch', data=json.dumps({"atomic": True, "operations": [
+            {"method": "PATCH", "path": f"/orders/{order_id}/status", "body": {"status": "cancelled"}},
+            {"method": "GET", "path": "/orders/unknown"}
+        ]}), content_type='application/json')
+
+        assert rollup_state() == before
+
+
+class TestRebuild:
+    """Tests du recalcul en masse"""
+
+    def test_rebuild_matches_orders(self, client):
+        """Test que le recalcul reflète un jeu synthétique"""
+        generate_dataset(300, chunk_size=100, days=5, seed=3)
+        stats = rebuild_sales_rollups()
+
+        assert stats['sales_rollups'] > 0
+        placed = OrderDB.query.filter(OrderDB.status.notin_(('pending', 'cancelled'))).all()
+        daily = SalesRollupDB.query.filter_by(granularity='day').all()
+        hourly = SalesRollupDB.query.filter_by(granularity='hour').all()
+
+        assert sum(row.order_count for row in daily) == len(placed)
+        assert sum(row.order_count for row in hourly) == len(placed)
+        assert round(sum(row.revenue for row in daily), 2) == round(sum(o.total_amount for o in placed), 2)
+        assert sum(row.quantity for row in PizzaSalesRollupDB.query.filter_by(granularity='day')) == \
+            sum(o.item_count for o in placed)
+
+    def test_rebuild_is_idempotent(self, client):
+        """Test que deux recalculs donnent le même résultat"""
+        generate_dataset(50, seed=4)
+        rebuild_sales_rollups()
+        first = rollup_state()
+        rebuild_sales_rollups()
+
+        assert rollup_state() == first
+
+    def test_cli_command(self, client):
+        """Test de la commande flask rebuild-sales-rollups"""
+        generate_dataset(20, seed=5)
+        runner = client.application.test_cli_runner()
+
+        result = runner.invoke(args=['rebuild-sales-rollups'])
+
+        assert result.exit_code == 0
+        assert 'agrégats' in result.output
+
+
+class TestRevenueEndpoint:
+    """Tests E2E de GET /analytics/revenue"""
+
+    def test_buckets_by_hour_and_day(self, client):
+        """Test du découpage en créneaux et des bornes from (inclus) / to (exclu)"""
+        generate_dataset(200, days=3, seed=6)
+        rebuild_sales_rollups()
+        today = bucket_start(datetime.utcnow(), 'day')
+
+        daily = revenue(client, f'?granularity=day&from={(today - timedelta(days=2)).isoformat()}'
+                                f'&to={(today + timedelta(days=1)).isoformat()}')
+        hourly = revenue(client, f'?granularity=hour&from={(today - timedelta(days=2)).isoformat()}'
+                                 f'&to={(today + timedelta(days=1)).isoformat()}')
+
+        assert daily['granularity'] == 'day'
+        assert all(bucket['bucket'].endswith('T00:00:00') for bucket in daily['buckets'])
+        assert daily['totals']['orders'] == hourly['totals']['orders'] > 0
+        assert daily['totals']['revenue'] == hourly['totals']['revenue']
+
+        yesterday = revenue(client, f'?from={(today - timedelta(days=1)).isoformat()}&to={today.isoformat()}')
+        assert [bucket['bucket'] for bucket in yesterday['buckets']] == [
+            (today - timedelta(days=1)).isoformat()
+        ]
+
+    def test_average_order_value(self, client):
+        """Test du panier moyen"""
+        margherita = create_pizza(client, "Margherita", 10)
+        place_order(client, [margherita])
+        place_order(client, [margherita, margherita])
+
+        bucket = revenue(client, '?granularity=hour')['buckets'][0]
+        assert bucket['orders'] == 2
+        assert bucket['average_order_value'] == 15
+
+    def test_invalid_parameters(self, client):
+        """Test des paramètres invalides"""
+        assert client.get('/analytics/revenue?granularity=week').status_code == 400
+        assert client.get('/analytics/revenue?from=never').status_code == 400
+        assert client.get('/analytics/revenue?from=2025-02-01&to=2025-01-01').status_code == 400
+        assert client.get('/analytics/revenue?granularity=hour&from=2000-01-01&to=2025-01-01').status_code == 400
@@ -0,0 +1,49 @@
+import pytest
+from app.database import db
+from app.models.db_models import OrderDB, OrderPizzaDB, DeliveryDB, PizzaDB
+from app.seeds.synthetic import generate_dataset
+
+
+class TestSyntheticDataset:
+    """Tests du générateur de jeux de données synthétiques"""
+
+    def test_generates_requested_volume_in_chunks(self, client):
+        """Test le volume généré, lot par lot"""
+        batches = []
+        stats = generate_dataset(500, chunk_size=200, seed=1, progress=lambda s: batches.append(s['orders']))
+
+        assert batches == [200, 400, 500]
+        assert stats['orders'] == db.session.query(db.func.count(OrderDB.id)).scalar() == 500
+        assert stats['order_pizzas'] == db.session.query(db.func.count(OrderPizzaDB.id)).scalar()
+        assert stats['deliveries'] == db.session.query(db.func.count(DeliveryDB.id)).scalar()
+        assert 2.5 < stats['order_pizzas'] / stats['orders'] < 3.5
+        assert db.session.query(db.func.count(PizzaDB.id)).scalar() > 0
+
+    def test_totals_match_lines(self, client):
+        """Test que les totaux dénormalisés correspondent aux lignes"""
+        generate_dataset(200, seed=2)
+
+        line_totals = db.select(
+            OrderPizzaDB.order_id,
+            db.func.count(OrderPizzaDB.id).label('item_count'),
+            db.func.round(db.func.sum(PizzaDB.price_amount), 2).label('total')
+        ).join(PizzaDB, PizzaDB.id == OrderPizzaDB.pizza_id).group_by(OrderPizzaDB.order_id).subquery()
+
+        mismatches = db.session.query(OrderDB.id).join(
+            line_totals, line_totals.c.order_id == OrderDB.id
+        ).filter(db.or_(OrderDB.item_count != line_totals.c.item_count,
+                        OrderDB.total_amount != line_totals.c.total)).count()
+        assert mismatches == 0
+
+    def test_deliveries_consistent_with_orders(self, client):
+        """Test que le statut des livraisons suit celui des commandes"""
+        generate_dataset(300, seed=3)
+
+        pairs = db.session.query(OrderDB.status, DeliveryDB.status, DeliveryDB.started_at,
+                                 DeliveryDB.completed_at).join(DeliveryDB, DeliveryDB.order_id == OrderDB.id).all()
+        expected = {'delivered': 'delivered', 'cancelled': 'cancelled', 'out_for_delivery': 'in_transit',
+                    'ready': 'assigned', 'preparing': 'assigned'}
+        for order_status, delivery_status, started_at, completed_at in pairs:
+            assert expected[order_status] == delivery_status
+            if delivery_status == 'delivered':
+                assert started_at <= completed_at
@@ -0,0 +1,42 @@
+import pytest
+import json
+from unittest.mock import patch
+from app.database import db
+from app.models.db_models import PizzaDB, ToppingDB
+from tests.conftest import create_pizza
+
+
+class TestToppings:
+    """Tests pour le stockage normalisé des garnitures"""
+
+    def test_toppings_are_shared(self, client):
+        """Test que les garnitures communes ne sont stockées qu'une fois"""
+        create_pizza(client, "Margherita", toppings=["Mozzarella", "Basil"])
+        create_pizza(client, "Pepperoni", toppings=["Mozzarella", "Pepperoni"])
+
+        assert ToppingDB.query.count() == 3
+
+    def test_filter_by_topping(self, client):
+        """Test le filtre GET /pizzas?topping="""
+        create_pizza(client, "Margherita", toppings=["Mozzarella", "Basil"])
+        create_pizza(client, "Pepperoni", toppings=["Mozzarella", "Pepperoni"])
+
+        data = json.loads(client.get('/pizzas?topping=basil').data)
+        assert [pizza['name'] for pizza in data['pizzas']] == ["Margherita"]
+
+        data = json.loads(client.get('/pizzas?topping=Mozzarella').data)
+        assert data['count'] == 2
+
+        data = json.loads(client.get('/pizzas?topping=Anchovies').data)
+        assert data['count'] == 0
+
+    def test_toppings_parsed_once(self, client):
+        """Test que le JSON des garnitures n'est décodé qu'une fois par pizza"""
+        pizza_id = create_pizza(client, "Margherita", toppings=["Mozzarella", "Basil"])
+        pizza_db = db.session.get(PizzaDB, pizza_id)
+        assert pizza_db.get_toppings() == ["Mozzarella", "Basil"]
+
+        with patch('app.models.db_models.json.loads') as loads:
+            for _ in range(3):
+                assert pizza_db.to_dict()['toppings'] == ["Mozzarella", "Basil"]
+            loads.assert_not_called()
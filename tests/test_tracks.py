@@ -0,0 +1,106 @@
+import pytest
+import json
+from app.database import db
+from app.models.db_models import OrderDB, DeliveryDB, DeliveryTrackChunkDB
+from app.tracks import encode_points, decode_points, append_points, iter_track, CHUNK_SIZE
+
+
+@pytest.fixture
+def delivery_id(client):
+    """Crée une livraison"""
+    order = OrderDB(customer_name="John Doe", customer_address="123 Main St")
+    db.session.add(order)
+    db.session.flush()
+    delivery = DeliveryDB(order_id=order.id, driver_name="Mike Driver")
+    db.session.add(delivery)
+    db.session.commit()
+    return delivery.id
+
+
+class TestTrackEncoding:
+    """Tests unitaires pour l'encodage des blocs"""
+
+    def test_roundtrip(self):
+        """Test qu'un bloc encodé puis décodé redonne les points"""
+        points = [(1000, 48.856613, 2.352222), (2500, -33.8688, 151.2093)]
+        data = encode_points(points, 1000)
+        assert len(data) == 12 * len(points)
+        assert list(decode_points(data, 1000)) == points
+
+
+class TestTrackStore:
+    """Tests pour le stockage de l'historique"""
+
+    def test_points_grouped_in_chunks(self, client, delivery_id):
+        """Test que les points sont regroupés en blocs de CHUNK_SIZE"""
+        total = CHUNK_SIZE * 2 + 10
+        for start in range(0, total, 100):
+            append_points({delivery_id: [(ts * 1000, 48.0, 2.0) for ts in range(start, min(start + 100, total))]})
+        db.session.commit()
+
+        assert DeliveryTrackChunkDB.query.count() == 3
+        points = list(iter_track(delivery_id))
+        assert [point[0] for point in points] == [ts * 1000 for ts in range(total)]
+
+    def test_older_points_ignored(self, client, delivery_id):
+        """Test qu'un point antérieur au dernier point enregistré est ignoré"""
+        append_points({delivery_id: [(5000, 48.0, 2.0)]})
+        assert append_points({delivery_id: [(1000, 49.0, 3.0), (6000, 49.0, 3.0)]}) == 1
+        db.session.commit()
+
+        assert [point[0] for point in iter_track(delivery_id)] == [5000, 6000]
+
+    def test_iter_track_since(self, client, delivery_id):
+        """Test le filtrage since"""
+        append_points({delivery_id: [(ts, 48.0, 2.0) for ts in range(0, 10000, 1000)]})
+        db.session.commit()
+
+        assert [point[0] for point in iter_track(delivery_id, since_ts=7000)] == [7000, 8000, 9000]
+
+
+class TestTrackEndpoint:
+    """Tests E2E pour GET /deliveries/<id>/track"""
+
+    def test_track_from_pings(self, client, delivery_id):
+        """Test que les pings alimentent l'historique restitué par l'API"""
+        client.patch('/deliveries/locations',
+                     data=json.dumps({"pings": [
+                         {"delivery_id": delivery_id, "lat": 48.8566, "lon": 2.3522, "ts": 1000},
+                         {"delivery_id": delivery_id, "lat": 48.8570, "lon": 2.3530, "ts": 1005},
+                     ]}),
+                     content_type='application/json')
+
+        response = client.get(f'/deliveries/{delivery_id}/track')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['points'] == [[1000000, 48.8566, 2.3522], [1005000, 48.857, 2.353]]
+
+        data = json.loads(client.get(f'/deliveries/{delivery_id}/track?since=1003').data)
+        assert data['points'] == [[1005000, 48.857, 2.353]]
+
+    def test_single_location_update_recorded(self, client, delivery_id):
+        """Test que PATCH /location ajoute aussi un point à l'historique"""
+        client.patch(f'/deliveries/{delivery_id}/location',
+                     data=json.dumps({"latitude": 48.8566, "longitude": 2.3522}),
+                     content_type='application/json')
+
+        data = json.loads(client.get(f'/deliveries/{delivery_id}/track').data)
+        assert len(data['points']) == 1
+
+    def test_track_errors(self, client, delivery_id):
+        """Test les erreurs de l'endpoint"""
+        assert client.get('/deliveries/unknown/track').status_code == 404
+        assert client.get(f'/deliveries/{delivery_id}/track?since=hier').status_code == 400
+        for since in ('1e20', '-1e20', 'inf'):
+            assert client.get(f'/deliveries/{delivery_id}/track?since={since}').status_code == 400
+
+    def test_single_location_update_validated(self, client, delivery_id):
+        """Test qu'une position invalide est refusée sans toucher l'historique"""
+        for body in ({"latitude": "48.85", "longitude": 2.35}, {"latitude": None, "longitude": 2.35},
+                     {"latitude": 91, "longitude": 2.35}, {"latitude": True, "longitude": 2.35}):
+            response = client.patch(f'/deliveries/{delivery_id}/location', data=json.dumps(body),
+                                    content_type='application/json')
+            assert response.status_code == 400, body
+
+        data = json.loads(client.get(f'/deliveries/{delivery_id}/track').data)
+        assert data['points'] == []